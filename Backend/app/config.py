@@ -1,7 +1,144 @@
+import json
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 AZURE_OPENAI_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
\ No newline at end of file
+AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
+
+# Pooled async HTTP client used for Azure OpenAI calls
+AZURE_HTTP2 = os.getenv("AZURE_HTTP2", "true").lower() == "true"
+AZURE_MAX_CONNECTIONS = int(os.getenv("AZURE_MAX_CONNECTIONS", "50"))
+AZURE_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("AZURE_MAX_KEEPALIVE_CONNECTIONS", "20"))
+AZURE_KEEPALIVE_EXPIRY = float(os.getenv("AZURE_KEEPALIVE_EXPIRY", "60"))
+
+# Text-path prompt budgeting: repeated headers/footers and whitespace are stripped before the call,
+# tokens are counted with tiktoken when installed (len/4 otherwise) and max_tokens is sized from
+# the input: base + ratio * input tokens, clamped to [min, max]
+TEXT_BUDGET_ENABLED = os.getenv("TEXT_BUDGET_ENABLED", "true").lower() == "true"
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "o200k_base")
+TEXT_COMPLETION_TOKENS_BASE = int(os.getenv("TEXT_COMPLETION_TOKENS_BASE", "1500"))
+TEXT_COMPLETION_TOKENS_RATIO = float(os.getenv("TEXT_COMPLETION_TOKENS_RATIO", "1.3"))
+TEXT_MIN_COMPLETION_TOKENS = int(os.getenv("TEXT_MIN_COMPLETION_TOKENS", "3000"))
+TEXT_MAX_COMPLETION_TOKENS = int(os.getenv("TEXT_MAX_COMPLETION_TOKENS", "12000"))
+
+# Azure call resilience: client-side quota limiter (set to the deployment's RPM/TPM; 0 disables),
+# jittered retries for 429/5xx/timeouts, and a circuit breaker per deployment
+AZURE_REQUESTS_PER_MINUTE = int(os.getenv("AZURE_REQUESTS_PER_MINUTE", "0"))
+AZURE_TOKENS_PER_MINUTE = int(os.getenv("AZURE_TOKENS_PER_MINUTE", "0"))
+AZURE_IMAGE_TOKEN_ESTIMATE = int(os.getenv("AZURE_IMAGE_TOKEN_ESTIMATE", "1100"))  # high-detail image at budget size
+AZURE_MAX_RETRIES = int(os.getenv("AZURE_MAX_RETRIES", "4"))
+AZURE_BACKOFF_BASE_SECONDS = float(os.getenv("AZURE_BACKOFF_BASE_SECONDS", "1.0"))
+AZURE_BACKOFF_MAX_SECONDS = float(os.getenv("AZURE_BACKOFF_MAX_SECONDS", "30"))
+AZURE_BREAKER_FAILURES = int(os.getenv("AZURE_BREAKER_FAILURES", "5"))
+AZURE_BREAKER_COOLDOWN_SECONDS = float(os.getenv("AZURE_BREAKER_COOLDOWN_SECONDS", "30"))
+
+# Several Azure OpenAI deployments (other regions, or a mini model for text-only work) as a JSON list:
+# [{"name": "eastus", "endpoint": "https://.../chat/completions?api-version=...", "api_key": "...",
+#   "kinds": ["text", "vision"], "requests_per_minute": 0, "tokens_per_minute": 0}]
+# api_key, kinds and the per-minute quotas default to the single-deployment settings above.
+# Empty: one deployment from AZURE_OPENAI_ENDPOINT / AZURE_OPENAI_API_KEY
+AZURE_OPENAI_DEPLOYMENTS = json.loads(os.getenv("AZURE_OPENAI_DEPLOYMENTS", "") or "[]")
+AZURE_DEPLOYMENT_COUNT = max(1, len(AZURE_OPENAI_DEPLOYMENTS))
+# "least_tokens": fewest outstanding tokens relative to TPM quota; "latency": fastest recent responses
+AZURE_ROUTING_STRATEGY = os.getenv("AZURE_ROUTING_STRATEGY", "least_tokens")
+
+# Offline bulk imports through the Azure OpenAI Batch API (cli/batch_import.py). The endpoint is the
+# resource root (https://<resource>.openai.azure.com, empty: taken from AZURE_OPENAI_ENDPOINT) and the
+# deployment must be a Global-Batch one. Input files are capped by request count and size
+AZURE_BATCH_ENDPOINT = os.getenv("AZURE_BATCH_ENDPOINT", "")
+AZURE_BATCH_API_KEY = os.getenv("AZURE_BATCH_API_KEY", "") or AZURE_OPENAI_KEY
+AZURE_BATCH_DEPLOYMENT = os.getenv("AZURE_BATCH_DEPLOYMENT", "")
+AZURE_BATCH_API_VERSION = os.getenv("AZURE_BATCH_API_VERSION", "2024-10-21")
+AZURE_BATCH_POLL_SECONDS = float(os.getenv("AZURE_BATCH_POLL_SECONDS", "60"))
+AZURE_BATCH_MAX_REQUESTS = int(os.getenv("AZURE_BATCH_MAX_REQUESTS", "50000"))
+AZURE_BATCH_MAX_FILE_BYTES = int(os.getenv("AZURE_BATCH_MAX_FILE_BYTES", str(180 * 1024 * 1024)))
+
+# Parsed-result cache (re-uploads of the same file skip Azure entirely)
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "./result_cache.db")
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "5000"))
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# Job scheduler: bounded queue, worker pool and per-stage concurrency limits
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "100"))
+# Worker and Azure-call defaults scale with the number of deployments
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(8 * AZURE_DEPLOYMENT_COUNT)))
+JOB_CPU_CONCURRENCY = int(os.getenv("JOB_CPU_CONCURRENCY", "2"))
+JOB_IO_CONCURRENCY = int(os.getenv("JOB_IO_CONCURRENCY", str(8 * AZURE_DEPLOYMENT_COUNT)))
+
+# Task-state backend: "sqlite" (shared across uvicorn workers) or "memory" (tests)
+TASK_STORE_BACKEND = os.getenv("TASK_STORE_BACKEND", "sqlite")
+TASK_STORE_PATH = os.getenv("TASK_STORE_PATH", "./tasks.db")
+TASK_TTL_SECONDS = int(os.getenv("TASK_TTL_SECONDS", "3600"))
+TASK_MAX_AGE_SECONDS = int(os.getenv("TASK_MAX_AGE_SECONDS", str(24 * 3600)))
+TASK_EVICT_INTERVAL_SECONDS = int(os.getenv("TASK_EVICT_INTERVAL_SECONDS", "300"))
+
+# PDF page rendering process pool
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1)))
+RENDER_MAX_INFLIGHT = int(os.getenv("RENDER_MAX_INFLIGHT", str(2 * (os.cpu_count() or 1))))
+
+# Vision payload: "budget" renders at the largest size Azure's high-detail mode actually uses
+# (fit in VISION_MAX_LONG_SIDE, shortest side VISION_MAX_SHORT_SIDE); "fixed" keeps the DPI render
+VISION_RENDER_MODE = os.getenv("VISION_RENDER_MODE", "budget")
+VISION_MAX_SHORT_SIDE = int(os.getenv("VISION_MAX_SHORT_SIDE", "768"))
+VISION_MAX_LONG_SIDE = int(os.getenv("VISION_MAX_LONG_SIDE", "2048"))
+VISION_IMAGE_FORMAT = os.getenv("VISION_IMAGE_FORMAT", "jpeg").lower()  # jpeg, webp or png
+VISION_IMAGE_QUALITY = int(os.getenv("VISION_IMAGE_QUALITY", "85"))
+
+# Server-Sent Events progress stream: how often to re-read the task store and send keep-alives
+SSE_POLL_INTERVAL_SECONDS = float(os.getenv("SSE_POLL_INTERVAL_SECONDS", "1.0"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+# Map-reduce vision: resumes longer than one chunk are split into concurrent page-group requests
+VISION_MAP_REDUCE = os.getenv("VISION_MAP_REDUCE", "true").lower() == "true"
+VISION_PAGES_PER_CHUNK = int(os.getenv("VISION_PAGES_PER_CHUNK", "3"))
+VISION_MAX_PARALLEL_CHUNKS = int(os.getenv("VISION_MAX_PARALLEL_CHUNKS", "4"))
+# Extra attempts for a chunk whose completion is not valid JSON; Azure errors are retried by azure_guard
+VISION_CHUNK_RETRIES = int(os.getenv("VISION_CHUNK_RETRIES", "2"))
+
+# Text-first routing: PDFs go through the text path and only pages the text layer cannot
+# cover (scans, image-only pages, badge/logo images) are sent to vision. "vision" always renders every page
+ROUTING_MODE = os.getenv("ROUTING_MODE", "auto")
+ROUTING_MIN_CHAR_DENSITY = float(os.getenv("ROUTING_MIN_CHAR_DENSITY", "1.0"))  # characters per square inch
+ROUTING_IMAGE_COVERAGE = float(os.getenv("ROUTING_IMAGE_COVERAGE", "0.15"))  # fraction of the page
+ROUTING_MIN_IMAGE_AREA = float(os.getenv("ROUTING_MIN_IMAGE_AREA", "0.005"))  # smaller images are icons
+ROUTING_MAX_GARBLED_RATIO = float(os.getenv("ROUTING_MAX_GARBLED_RATIO", "0.1"))
+ROUTING_MAX_VISION_RATIO = float(os.getenv("ROUTING_MAX_VISION_RATIO", "0.5"))
+
+# Persistent LibreOffice DOCX->PDF conversion: each worker keeps its own profile (and, with the
+# UNO bindings installed, its own long-lived soffice listening on a local UNO socket)
+LIBREOFFICE_BINARY = os.getenv("LIBREOFFICE_BINARY", "")  # empty: soffice or libreoffice from PATH
+LIBREOFFICE_WORKERS = int(os.getenv("LIBREOFFICE_WORKERS", "2"))
+LIBREOFFICE_TIMEOUT_SECONDS = int(os.getenv("LIBREOFFICE_TIMEOUT_SECONDS", "60"))
+LIBREOFFICE_QUEUE_TIMEOUT_SECONDS = int(os.getenv("LIBREOFFICE_QUEUE_TIMEOUT_SECONDS", "120"))
+# DOCX->PDF converters to try, in order: "auto" (LibreOffice pool first when UNO keeps soffice
+# running, else Aspose.Words first) or a comma list of libreoffice, aspose, word
+DOCX_CONVERTER_ORDER = os.getenv("DOCX_CONVERTER_ORDER", "auto").lower()
+
+# DOCX vision input: "native" sends the document text plus its embedded images (word/media) in
+# one request; "pdf" converts the document to PDF and renders full pages as before
+DOCX_VISION_MODE = os.getenv("DOCX_VISION_MODE", "native")
+DOCX_MIN_IMAGE_SIDE = int(os.getenv("DOCX_MIN_IMAGE_SIDE", "48"))  # smaller images are bullets and icons
+DOCX_MAX_IMAGES = int(os.getenv("DOCX_MAX_IMAGES", "10"))
+
+# Uploads are streamed to disk in chunks; larger files are rejected with 413 while streaming
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+# History database; SQLite files get WAL, a busy timeout and a bounded connection pool.
+# Request handlers use the async driver for the same URL: aiosqlite, or asyncpg for postgresql:// URLs
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./resume.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Finished jobs' history rows are queued and committed together in groups
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "50"))
+HISTORY_FLUSH_INTERVAL_MS = int(os.getenv("HISTORY_FLUSH_INTERVAL_MS", "50"))
+
+# Largest page /history and /search return; bigger limits are rejected with 422
+HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", "100"))
+SEARCH_PAGE_MAX = int(os.getenv("SEARCH_PAGE_MAX", "100"))
@@ -1,21 +1,92 @@
 # app/database.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./resume.db"
+from app.config import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    SQLITE_BUSY_TIMEOUT_MS,
+)
+
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)"""
+    scheme, _, rest = url.partition("://")
+    if "+" in scheme and scheme.split("+", 1)[1] in ("aiosqlite", "asyncpg"):
+        return url
+    dialect = scheme.split("+", 1)[0]
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    raise ValueError(f"No async driver configured for {dialect} URLs")
+
 
+ASYNC_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+
+POOL_OPTIONS = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+    pool_pre_ping=not IS_SQLITE,
+)
+
+# Sync engine: start-up schema work and scripts
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000} if IS_SQLITE else {},
+    **POOL_OPTIONS
+)
+
+# Async engine: request handlers and the history writer
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000} if IS_SQLITE else {},
+    **POOL_OPTIONS
 )
 
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the writer; busy_timeout waits out the write lock instead of failing"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+if IS_SQLITE:
+    event.listen(engine, "connect", _configure_sqlite)
+    event.listen(async_engine.sync_engine, "connect", _configure_sqlite)
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
 Base = declarative_base()
 
 
 def init_db():
     from app import models
+    from app.services.history_counts import rebuild_history_counts
+    from app.services.resume_search import ensure_fts_table, rebuild_search_index
+    facets_existed = inspect(engine).has_table(models.ResumeFacet.__tablename__)
     Base.metadata.create_all(bind=engine)
+    models.add_processing_method_column()
+    with engine.begin() as conn:
+        # create_all skips indexes on tables that already exist
+        for index in models.ResumeHistory.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
+        if conn.execute(select(models.HistoryCount.scope).limit(1)).first() is None:
+            rebuild_history_counts(conn)
+        if ensure_fts_table(conn) or not facets_existed:
+            rebuild_search_index(conn)
 
 
 def get_db():
@@ -24,3 +95,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
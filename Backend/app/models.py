@@ -1,8 +1,112 @@
 #models
-from sqlalchemy import Column, Integer, String, Boolean
-from app.database import Base
+import os
+import sqlite3
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index, JSON, inspect, text
+from sqlalchemy.sql import func
+from app.database import IS_SQLITE, Base, engine
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
-    hashed_password = Column(String, nullable=False)
\ No newline at end of file
+    hashed_password = Column(String, nullable=False)
+
+
+# Check if processing_method column exists in resume_history table
+def column_exists(table_name, column_name):
+    inspector = inspect(engine)
+    columns = inspector.get_columns(table_name)
+    return any(col['name'] == column_name for col in columns)
+
+
+def processing_method_column_ready() -> bool:
+    """Read-only: True when resume_history has processing_method, or does not exist yet (create_all adds it)"""
+    if not IS_SQLITE:
+        if not inspect(engine).has_table('resume_history'):
+            return True
+        return column_exists('resume_history', 'processing_method')
+    # Bypass the engine: its connect hook switches the file to WAL, and connecting creates missing files
+    path = engine.url.database
+    if not path or path == ":memory:" or not os.path.exists(path):
+        return True
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(resume_history)")]
+    finally:
+        conn.close()
+    return not columns or 'processing_method' in columns
+
+
+# Flag to track if processing_method column exists; init_db() adds the column and flips it
+HAS_PROCESSING_METHOD_COLUMN = processing_method_column_ready()
+
+
+def add_processing_method_column() -> bool:
+    """Add processing_method to databases created before it existed; routing decisions are stored there"""
+    global HAS_PROCESSING_METHOD_COLUMN
+    if HAS_PROCESSING_METHOD_COLUMN:
+        return True
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE resume_history ADD COLUMN processing_method VARCHAR(64) DEFAULT 'text'"))
+    except Exception as e:
+        print(f"Could not add processing_method column: {e}")
+        return False
+    # The model was mapped without the column at import; map it now that the table has it
+    ResumeHistory.processing_method = Column(String(64), default="text")
+    HAS_PROCESSING_METHOD_COLUMN = True
+    print("Added processing_method column to resume_history")
+    return True
+
+
+# Database model for resume history
+class ResumeHistory(Base):
+    __tablename__ = "resume_history"
+    __table_args__ = (
+        # Keyset pagination walks these newest-first; id breaks processed_at ties
+        Index("ix_resume_history_processed_at_id", "processed_at", "id"),
+        Index("ix_resume_history_user_processed_at_id", "user_id", "processed_at", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String(255), nullable=False)
+    processed_at = Column(DateTime(timezone=True), server_default=func.now())
+    user_id = Column(String(255), nullable=True)  # Can be linked to user authentication
+    resume_data = Column(JSON, nullable=False)
+    file_size = Column(Integer, nullable=True)
+    status = Column(String(50), default="completed")
+    original_file_type = Column(String(10), nullable=True)
+    
+    # Only add this column to the model if it exists in the database
+    if HAS_PROCESSING_METHOD_COLUMN:
+        processing_method = Column(String(64), default="text")
+
+
+# Row counts per scope ("all", "user:<id>"), kept in step with resume_history inserts and deletes
+class HistoryCount(Base):
+    __tablename__ = "resume_history_counts"
+
+    scope = Column(String(300), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+# Normalized skills/certifications/companies/roles per history row, for search filters and facet counts
+class ResumeFacet(Base):
+    __tablename__ = "resume_facets"
+    __table_args__ = (
+        Index("ix_resume_facets_kind_value", "kind", "value", "history_id"),
+        Index("ix_resume_facets_history_id", "history_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    history_id = Column(Integer, nullable=False)
+    kind = Column(String(20), nullable=False)
+    value = Column(String(255), nullable=False)  # case-folded match key
+    label = Column(String(255), nullable=False)  # as written in the resume
+
+
+# Idempotency keys of rows saved by bulk imports: a rerun after a crash finds the row instead of inserting it again
+class ResumeImportKey(Base):
+    __tablename__ = "resume_import_keys"
+
+    key = Column(String(300), primary_key=True)
+    history_id = Column(Integer, nullable=False, index=True)
@@ -1,14 +1,36 @@
 import gc
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
-from sqlalchemy.orm import Session
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, inspect
-from sqlalchemy.sql import func
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+from sqlalchemy import String, and_, or_, select, type_coerce
+from sqlalchemy.orm import defer
+from sqlalchemy.ext.asyncio import AsyncSession
 from auth.auth import JWTBearer
-from app.services.azure_clients import extract_resume_details_with_azure, extract_resume_details_with_azure_vision
-from app.services.image_processors import convert_pdf_to_images
-from app.services.resume_parser import clean_json_string, convert_docx_to_pdf, extract_text_from_docx, extract_text_from_pdf
-from app.database import get_db, Base, engine
-import tempfile
+from app.services.azure_resilience import azure_guard
+from app.services.docx_conversion import docx_converter
+from app.services.result_cache import result_cache
+from app.services.job_scheduler import PRIORITIES, QueueFullError, scheduler
+from app.services.resume_pipeline import run_resume_pipeline
+from app.services.task_store import task_store
+from app.services.text_budget import text_budget
+from app.services.upload_storage import save_upload
+from app.services.task_events import format_sse, task_events
+from app.config import (
+    HISTORY_PAGE_MAX,
+    SEARCH_PAGE_MAX,
+    SSE_HEARTBEAT_SECONDS,
+    SSE_POLL_INTERVAL_SECONDS,
+)
+from app.database import IS_SQLITE, get_async_db
+from app import models
+from app.models import ResumeHistory
+from app.services.history_counts import apply_count_deltas, count_deltas, get_history_count
+from app.services.history_writer import forget_imports, history_writer
+from app.services.resume_search import FACET_KINDS, remove_resumes, search_resumes
+from utils.memory import PeakRSSTracker
+import asyncio
+import base64
+import binascii
+import json
 import os
 import traceback
 import uuid
@@ -17,20 +39,8 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime
 from pydantic import BaseModel
 
-# Check if processing_method column exists in resume_history table
-def column_exists(table_name, column_name):
-    inspector = inspect(engine)
-    columns = inspector.get_columns(table_name)
-    return any(col['name'] == column_name for col in columns)
-
-# Flag to track if processing_method column exists
-HAS_PROCESSING_METHOD_COLUMN = column_exists('resume_history', 'processing_method')
-
 router = APIRouter(dependencies=[Depends(JWTBearer())])
 
-# In-memory task storage (replace with Redis or DB in production)
-TASKS = {}
-
 
 class TaskStatus:
     PENDING = "pending"
@@ -39,24 +49,6 @@ class TaskStatus:
     FAILED = "failed"
 
 
-# Database model for resume history
-class ResumeHistory(Base):
-    __tablename__ = "resume_history"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    filename = Column(String(255), nullable=False)
-    processed_at = Column(DateTime(timezone=True), server_default=func.now())
-    user_id = Column(String(255), nullable=True)  # Can be linked to user authentication
-    resume_data = Column(JSON, nullable=False)
-    file_size = Column(Integer, nullable=True)
-    status = Column(String(50), default="completed")
-    original_file_type = Column(String(10), nullable=True)
-    
-    # Only add this column to the model if it exists in the database
-    if HAS_PROCESSING_METHOD_COLUMN:
-        processing_method = Column(String(20), default="text")
-
-
 # Pydantic model for response
 class ResumeHistoryResponse(BaseModel):
     id: int
@@ -68,14 +60,46 @@ class ResumeHistoryResponse(BaseModel):
     processing_method: Optional[str] = "text"
 
 
+def queue_full_response(exc: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many resumes are being processed, please retry shortly.",
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+def discard_tasks(task_ids: List[str]):
+    """Remove tasks that were never queued, along with their temporary files"""
+    for task_id in task_ids:
+        task = task_store.get(task_id)
+        task_store.delete(task_id)
+        if task and os.path.exists(task["file_path"]):
+            os.remove(task["file_path"])
+
+
+def abandon_task(task_id: str):
+    """Fail a task the scheduler dropped at shutdown, so it does not stay pending or processing"""
+    task = task_store.get(task_id)
+    if task is None:
+        return
+    task_store.update(task_id, status=TaskStatus.FAILED, error="Server shut down before processing finished")
+    if os.path.exists(task["file_path"]):
+        os.remove(task["file_path"])
+
+
 @router.post("/upload")
 async def upload_resume(
     file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = None,
-    db: Session = Depends(get_db),
-    use_vision: bool = True  # New parameter to toggle between text and image processing
+    use_vision: bool = True,  # New parameter to toggle between text and image processing
+    priority: str = "normal"
 ):
     try:
+        if priority not in PRIORITIES:
+            raise HTTPException(status_code=400, detail=f"priority must be one of {', '.join(PRIORITIES)}")
+        
+        # Reject early, before reading the upload, when the job queue is full
+        scheduler.ensure_capacity()
+        
         # Generate a unique task ID
         task_id = str(uuid.uuid4())
         
@@ -90,17 +114,13 @@ async def upload_resume(
         if file_extension not in allowed_extensions or file.content_type not in allowed_mime_types:
             raise HTTPException(status_code=400, detail="Only PDF, DOC, or DOCX files are supported.")
 
-        # Create temporary file with appropriate suffix
-        suffix = file_extension
-        file_content = await file.read()
-        file_size = len(file_content)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(file_content)
-            tmp_path = tmp.name
+        # Stream to disk in chunks; size, content type and hash are checked on the way
+        upload = await save_upload(file, file_extension)
+        tmp_path = upload["path"]
+        file_size = upload["size"]
         
         # Initialize task status
-        TASKS[task_id] = {
+        await asyncio.to_thread(task_store.create, task_id, {
             "status": TaskStatus.PENDING,
             "stage": "upload",
             "progress": 0,
@@ -110,16 +130,23 @@ async def upload_resume(
             "file_extension": file_extension,
             "filename": file.filename,
             "file_size": file_size,
+            "content_hash": upload["sha256"],
             "user_id": None,  # Can be populated from auth
             "use_vision": use_vision  # Store whether to use vision-based processing
-        }
+        })
         
-        # Start processing in background
-        background_tasks.add_task(process_resume, task_id, db)
+        # Queue for processing
+        try:
+            scheduler.submit(process_resume, task_id, priority=priority, on_abandon=abandon_task)
+        except QueueFullError:
+            await asyncio.to_thread(discard_tasks, [task_id])
+            raise
         
         # Return the task ID immediately
         return {"task_id": task_id, "status": "processing", "method": "vision" if use_vision else "text"}
 
+    except QueueFullError as exc:
+        raise queue_full_response(exc)
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
@@ -129,15 +156,20 @@ async def upload_resume(
 @router.post("/upload-multiple")
 async def upload_multiple_resumes(
     files: List[UploadFile] = File(...),
-    background_tasks: BackgroundTasks = None,
-    db: Session = Depends(get_db),
-    use_vision: bool = True
+    use_vision: bool = True,
+    priority: str = "normal"
 ):
     """Upload and process multiple resume files"""
+    task_ids = []
     try:
         # Validate number of files
         if len(files) > 10:
             raise HTTPException(status_code=400, detail="Maximum 10 files allowed")
+        if priority not in PRIORITIES:
+            raise HTTPException(status_code=400, detail=f"priority must be one of {', '.join(PRIORITIES)}")
+        
+        # The whole batch must fit in the job queue
+        scheduler.ensure_capacity(len(files))
         
         # Validate file types
         allowed_extensions = ['.pdf', '.doc', '.docx']
@@ -148,9 +180,8 @@ async def upload_multiple_resumes(
         ]
         
         batch_id = str(uuid.uuid4())
-        task_ids = []
         
-        for file in files:
+        for batch_index, file in enumerate(files):
             # Validate each file
             file_extension = f".{file.filename.split('.')[-1].lower()}"
             if file_extension not in allowed_extensions or file.content_type not in allowed_mime_types:
@@ -163,17 +194,13 @@ async def upload_multiple_resumes(
             task_id = str(uuid.uuid4())
             task_ids.append(task_id)
             
-            # Read file content
-            file_content = await file.read()
-            file_size = len(file_content)
-            
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp:
-                tmp.write(file_content)
-                tmp_path = tmp.name
+            # Stream to disk one file at a time; only a chunk is ever held in memory
+            upload = await save_upload(file, file_extension)
+            tmp_path = upload["path"]
+            file_size = upload["size"]
             
             # Initialize task status
-            TASKS[task_id] = {
+            await asyncio.to_thread(task_store.create, task_id, {
                 "status": TaskStatus.PENDING,
                 "stage": "upload",
                 "progress": 0,
@@ -183,13 +210,17 @@ async def upload_multiple_resumes(
                 "file_extension": file_extension,
                 "filename": file.filename,
                 "file_size": file_size,
+                "content_hash": upload["sha256"],
                 "user_id": None,
                 "use_vision": use_vision,
-                "batch_id": batch_id
-            }
-            
-            # Start processing in background
-            background_tasks.add_task(process_resume, task_id, db)
+                "batch_id": batch_id,
+                "batch_index": batch_index
+            })
+        
+        # Queue the batch only once every file is stored; no await between the check and the submits
+        scheduler.ensure_capacity(len(task_ids))
+        for task_id in task_ids:
+            scheduler.submit(process_resume, task_id, priority=priority, on_abandon=abandon_task)
         
         return {
             "batch_id": batch_id,
@@ -199,54 +230,83 @@ async def upload_multiple_resumes(
             "method": "vision" if use_vision else "text"
         }
 
+    except QueueFullError as exc:
+        await asyncio.to_thread(discard_tasks, task_ids)
+        raise queue_full_response(exc)
     except HTTPException as http_exc:
+        await asyncio.to_thread(discard_tasks, task_ids)
         raise http_exc
     except Exception as e:
+        await asyncio.to_thread(discard_tasks, task_ids)
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Unexpected error occurred: {str(e)}")
 
+def build_batch_progress(batch_id: str) -> Optional[dict]:
+    """Summarise every task in a batch, or None if the batch is unknown or expired"""
+    batch_tasks = dict(sorted(
+        task_store.batch(batch_id).items(),
+        key=lambda item: item[1].get("batch_index", 0)
+    ))
+    
+    if not batch_tasks:
+        return None
+    
+    total_files = len(batch_tasks)
+    completed_files = sum(1 for task in batch_tasks.values() 
+                        if task["status"] == TaskStatus.COMPLETED)
+    failed_files = sum(1 for task in batch_tasks.values() 
+                     if task["status"] == TaskStatus.FAILED)
+    
+    overall_progress = sum(task["progress"] for task in batch_tasks.values()) / total_files
+    
+    # A finished batch with any failures reports "failed"; files that did complete still carry data
+    batch_status = "completed" if completed_files == total_files else \
+                  "failed" if completed_files + failed_files == total_files else \
+                  "processing"
+    
+    return {
+        "batch_id": batch_id,
+        "status": batch_status,
+        "overall_progress": overall_progress,
+        "total_files": total_files,
+        "completed_files": completed_files,
+        "failed_files": failed_files,
+        "files": [
+            {
+                "task_id": task_id,
+                "filename": task["filename"],
+                "status": task["status"],
+                "progress": task["progress"],
+                "stage": task.get("stage", ""),
+                "error": task.get("error"),
+                "data": task.get("data"),
+                "partial_data": task.get("partial_data") if task["status"] == TaskStatus.PROCESSING else None
+            }
+            for task_id, task in batch_tasks.items()
+        ]
+    }
+
+
+def build_task_progress(task: dict) -> dict:
+    return {
+        "status": task["status"],
+        "stage": task["stage"],
+        "progress": task["progress"],
+        "data": task["data"] if task["status"] == TaskStatus.COMPLETED else None,
+        "partial_data": task.get("partial_data") if task["status"] == TaskStatus.PROCESSING else None,
+        "error": task["error"] if task["status"] == TaskStatus.FAILED else None,
+        "metrics": task.get("metrics")
+    }
+
+
 @router.get("/batch-progress/{batch_id}")
 async def get_batch_progress(batch_id: str):
     """Get progress for all files in a batch"""
     try:
-        batch_tasks = {task_id: task for task_id, task in TASKS.items() 
-                      if task.get("batch_id") == batch_id}
-        
-        if not batch_tasks:
+        batch_progress = await asyncio.to_thread(build_batch_progress, batch_id)
+        if batch_progress is None:
             raise HTTPException(status_code=404, detail="Batch not found")
-        
-        total_files = len(batch_tasks)
-        completed_files = sum(1 for task in batch_tasks.values() 
-                            if task["status"] == TaskStatus.COMPLETED)
-        failed_files = sum(1 for task in batch_tasks.values() 
-                         if task["status"] == TaskStatus.FAILED)
-        
-        overall_progress = sum(task["progress"] for task in batch_tasks.values()) / total_files
-        
-        batch_status = "completed" if completed_files == total_files else \
-                      "failed" if failed_files == total_files else \
-                      "processing"
-        
-        return {
-            "batch_id": batch_id,
-            "status": batch_status,
-            "overall_progress": overall_progress,
-            "total_files": total_files,
-            "completed_files": completed_files,
-            "failed_files": failed_files,
-            "files": [
-                {
-                    "task_id": task_id,
-                    "filename": task["filename"],
-                    "status": task["status"],
-                    "progress": task["progress"],
-                    "stage": task.get("stage", ""),
-                    "error": task.get("error"),
-                    "data": task.get("data")
-                }
-                for task_id, task in batch_tasks.items()
-            ]
-        }
+        return batch_progress
         
     except HTTPException as http_exc:
         raise http_exc
@@ -256,39 +316,213 @@ async def get_batch_progress(batch_id: str):
 
 @router.get("/progress/{task_id}")
 async def get_progress(task_id: str):
-    if task_id not in TASKS:
+    task = await asyncio.to_thread(task_store.get, task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task = TASKS[task_id]
-    
-    # Clean up completed tasks after some time (optional)
-    if task["status"] in [TaskStatus.COMPLETED, TaskStatus.FAILED] and "cleanup_time" not in task:
-        task["cleanup_time"] = time.time() + 3600  # Clean up after 1 hour
-    
+    return build_task_progress(task)
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@router.get("/events/{task_id}")
+async def stream_task_events(task_id: str, request: Request):
+    """Push stage, progress, partial-data and final events for a task as Server-Sent Events.
+
+    The connection closes after a "completed" or "failed" event. /progress/{task_id}
+    remains available for clients that cannot consume a stream.
+    """
+    # Store reads block on SQLite and the store's lock: keep them off the event loop
+    if await asyncio.to_thread(task_store.get, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    async def event_stream():
+        last = {}
+        last_sent = time.monotonic()
+        while not await request.is_disconnected():
+            task = await asyncio.to_thread(task_store.get, task_id)
+            if task is None:
+                yield format_sse("failed", json.dumps({"error": "Task expired"}))
+                return
+            
+            events = []
+            if task["stage"] != last.get("stage"):
+                events.append(("stage", {"stage": task["stage"]}))
+            if (task["stage"], task["progress"]) != (last.get("stage"), last.get("progress")):
+                events.append(("progress", {"stage": task["stage"], "progress": task["progress"]}))
+            if task.get("partial_data") and task.get("partial_data") != last.get("partial_data"):
+                events.append(("partial", {"partial_data": task["partial_data"]}))
+            if task["status"] in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+                events.append((task["status"], build_task_progress(task)))
+            last = task
+            
+            for event, payload in events:
+                yield format_sse(event, json.dumps(payload, default=str))
+            if events:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= SSE_HEARTBEAT_SECONDS:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            if task["status"] in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+                return
+            
+            await task_events.wait(task_id, SSE_POLL_INTERVAL_SECONDS)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/batch-events/{batch_id}")
+async def stream_batch_events(batch_id: str, request: Request):
+    """Push a "batch" event (same shape as /batch-progress) whenever any file in the batch changes"""
+    if await asyncio.to_thread(build_batch_progress, batch_id) is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    async def event_stream():
+        last = None
+        last_sent = time.monotonic()
+        while not await request.is_disconnected():
+            batch_progress = await asyncio.to_thread(build_batch_progress, batch_id)
+            if batch_progress is None:
+                yield format_sse("failed", json.dumps({"error": "Batch expired"}))
+                return
+            
+            if batch_progress != last:
+                yield format_sse("batch", json.dumps(batch_progress, default=str))
+                last = batch_progress
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= SSE_HEARTBEAT_SECONDS:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            
+            finished = all(
+                f["status"] in (TaskStatus.COMPLETED, TaskStatus.FAILED) for f in batch_progress["files"]
+            )
+            if finished:
+                yield format_sse("done", json.dumps({"status": batch_progress["status"]}))
+                return
+            
+            await task_events.wait(batch_id, SSE_POLL_INTERVAL_SECONDS)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/queue-stats")
+async def get_queue_stats():
+    """Get job queue depth, worker usage and per-stage concurrency"""
     return {
-        "status": task["status"],
-        "stage": task["stage"],
-        "progress": task["progress"],
-        "data": task["data"] if task["status"] == TaskStatus.COMPLETED else None,
-        "error": task["error"] if task["status"] == TaskStatus.FAILED else None
+        **scheduler.stats(),
+        "docx_conversion": docx_converter.stats(),
+        "history_writer": history_writer.stats(),
     }
 
 
+@router.get("/azure-stats")
+async def get_azure_stats():
+    """Get per-deployment load, latency, error and circuit-breaker figures for Azure OpenAI calls,
+    plus text-path prompt token totals"""
+    return {**azure_guard.stats(), "text_budget": text_budget.stats()}
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Get hit/miss counters and size of the parsed-result cache"""
+    return await asyncio.to_thread(result_cache.stats)
+
+
+def _encode_history_cursor(sort_value, history_id: int) -> str:
+    """Opaque cursor holding the (processed_at, id) position of a page's last row"""
+    if not isinstance(sort_value, str):
+        sort_value = sort_value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([sort_value, history_id]).encode()).decode()
+
+
+def _decode_history_cursor(cursor: str):
+    try:
+        sort_value, history_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not IS_SQLITE:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(history_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/history", response_model=List[ResumeHistoryResponse])
-async def get_resume_history(db: Session = Depends(get_db), limit: int = 10, skip: int = 0):
-    """Get the resume processing history"""
-    # Optionally filter by user_id if authentication is implemented
-    history = db.query(ResumeHistory).order_by(
-        ResumeHistory.processed_at.desc()
-    ).offset(skip).limit(limit).all()
+async def get_resume_history(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(10, ge=1, le=HISTORY_PAGE_MAX),
+    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    user_id: Optional[str] = None
+):
+    """Get the resume processing history, newest first.
+
+    Pass the X-Next-Cursor header of one page as ?cursor= to get the next; unlike skip, a
+    cursor seeks straight to its position in the (processed_at, id) index, so every page
+    costs the same however deep it is, and deleting the row it came from does not move it.
+    resume_data is never loaded here.
+    """
+    # SQLite stores processed_at as CURRENT_TIMESTAMP text and orders by that text; the
+    # cursor keeps it verbatim, since a round-tripped datetime would not compare equal
+    sort_value = type_coerce(ResumeHistory.processed_at, String) if IS_SQLITE else ResumeHistory.processed_at
+    query = select(ResumeHistory, sort_value.label("sort_value")).options(defer(ResumeHistory.resume_data, raiseload=True))
+    if user_id:
+        query = query.where(ResumeHistory.user_id == user_id)
+    if cursor is not None:
+        anchor, anchor_id = _decode_history_cursor(cursor)
+        query = query.where(or_(
+            sort_value < anchor,
+            and_(sort_value == anchor, ResumeHistory.id < anchor_id)
+        ))
+    elif skip:
+        query = query.offset(skip)
     
-    return history
+    result = await db.execute(
+        query.order_by(ResumeHistory.processed_at.desc(), ResumeHistory.id.desc()).limit(limit)
+    )
+    rows = result.all()
+    if len(rows) == limit and rows:
+        last, last_sort_value = rows[-1]
+        response.headers["X-Next-Cursor"] = _encode_history_cursor(last_sort_value, last.id)
+    return [row for row, _ in rows]
+
+
+@router.get("/history/count")
+async def get_resume_history_count(db: AsyncSession = Depends(get_async_db), user_id: Optional[str] = None):
+    """Total history rows, read from the counter table instead of COUNT(*)"""
+    return {"total": await get_history_count(db, user_id)}
+
+
+@router.get("/search")
+async def search_resume_history(
+    db: AsyncSession = Depends(get_async_db),
+    q: Optional[str] = None,
+    skill: Optional[str] = None,
+    certification: Optional[str] = None,
+    company: Optional[str] = None,
+    role: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=SEARCH_PAGE_MAX),
+    offset: int = Query(0, ge=0),
+    facet_limit: int = Query(10, ge=0, le=50)
+):
+    """Search stored resumes by free text plus exact skill/certification/company/role filters.
+
+    Returns {"has_more", "results", "facets"}: results ranked best match first, whether a
+    next page exists, and the most common values of each facet kind among the top matches.
+    """
+    filters = {
+        kind: value
+        for kind, value in zip(FACET_KINDS, (skill, certification, company, role))
+        if value
+    }
+    return await search_resumes(db, q, filters, limit=limit, offset=offset, facet_limit=facet_limit)
 
 
 @router.get("/history/{resume_id}", response_model=dict)
-async def get_resume_details(resume_id: int, db: Session = Depends(get_db)):
+async def get_resume_details(resume_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific resume from history by ID"""
-    resume = db.query(ResumeHistory).filter(ResumeHistory.id == resume_id).first()
+    resume = await db.get(ResumeHistory, resume_id)
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
     
@@ -304,7 +538,7 @@ async def get_resume_details(resume_id: int, db: Session = Depends(get_db)):
     }
     
     # Only add processing_method if the column exists
-    if HAS_PROCESSING_METHOD_COLUMN:
+    if models.HAS_PROCESSING_METHOD_COLUMN:
         result["processing_method"] = getattr(resume, "processing_method", "text")
     else:
         result["processing_method"] = "text"  # Default value
@@ -313,224 +547,97 @@ async def get_resume_details(resume_id: int, db: Session = Depends(get_db)):
 
 
 @router.delete("/history/{resume_id}")
-async def delete_resume(resume_id: int, db: Session = Depends(get_db)):
+async def delete_resume(resume_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a resume from history"""
-    resume = db.query(ResumeHistory).filter(ResumeHistory.id == resume_id).first()
+    resume = await db.get(ResumeHistory, resume_id, options=[defer(ResumeHistory.resume_data)])
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
     
-    db.delete(resume)
-    db.commit()
+    await db.delete(resume)
+    await apply_count_deltas(db, count_deltas([resume.user_id], sign=-1))
+    await remove_resumes(db, [resume_id])
+    await forget_imports(db, [resume_id])
+    await db.commit()
     
     return {"message": "Resume deleted successfully"}
 
 
-async def process_resume(task_id: str, db: Session):
-    task = TASKS[task_id]
-    tmp_path = task["file_path"]
-    file_extension = task["file_extension"]
+async def save_resume_history(task: dict, resume_data: dict, processing_method: str, status: str = "completed") -> int:
+    """Persist a ResumeHistory row for a finished task through the group-commit writer"""
+    fields = dict(
+        filename=task["filename"],
+        resume_data=resume_data,
+        file_size=task["file_size"],
+        original_file_type=task["file_extension"].lstrip('.'),
+        user_id=task["user_id"],
+        status=status
+    )
+    
+    if models.HAS_PROCESSING_METHOD_COLUMN:
+        fields["processing_method"] = processing_method
+    
+    return await history_writer.save(fields)
+
+
+async def process_resume(task_id: str):
+    task = await asyncio.to_thread(task_store.get, task_id)
+    if task is None:
+        print(f"Task {task_id} expired before processing started")
+        return
+    
+    def update_task(**fields):
+        task.update(fields)
+        task_store.update(task_id, **fields)
+    
     use_vision = task.get("use_vision", True)
-    converted_pdf_path = None
+    memory = PeakRSSTracker()
     
     try:
-        task["status"] = TaskStatus.PROCESSING
-        
-        # For DOC/DOCX files, try conversion to PDF for vision processing with enhanced error handling
-        if file_extension in ['.doc', '.docx'] and use_vision:
-            try:
-                task["stage"] = "converting_docx_to_pdf_with_aspose"
-                task["progress"] = 20
-                
-                print(f"Attempting to convert {file_extension} to PDF using Aspose.Words for enhanced vision processing...")
-                
-                # Force garbage collection before conversion to free memory
-                gc.collect()
-                
-                converted_pdf_path = convert_docx_to_pdf(tmp_path)
-                
-                if os.path.exists(converted_pdf_path):
-                    file_extension = '.pdf'
-                    tmp_path = converted_pdf_path
-                    task["progress"] = 100
-                    print(f"Successfully converted to PDF using Aspose.Words for certification detection: {converted_pdf_path}")
-                else:
-                    raise Exception("PDF file was not created")
-                
-            except Exception as e:
-                print(f"DOCX to PDF conversion with Aspose.Words failed: {str(e)}")
-                print("Falling back to enhanced text-based processing for certification extraction...")
-                use_vision = False
-                task["progress"] = 0
-                
-                # Force cleanup of any partial conversion attempts
-                if converted_pdf_path and os.path.exists(converted_pdf_path):
-                    try:
-                        os.remove(converted_pdf_path)
-                        converted_pdf_path = None
-                    except:
-                        pass
-                
-                # Force garbage collection after failed conversion
-                gc.collect()
-        
-        # Process using enhanced vision-based approach for PDFs
-        processing_method = "text"
+        update_task(status=TaskStatus.PROCESSING)
         
-        if use_vision and file_extension == '.pdf':
-            try:
-                task["stage"] = "high_quality_image_conversion"
-                task["progress"] = 0
-                
-                print("Converting ALL pages to high-quality images for certification logo detection...")
-                
-                for i in range(1, 6):
-                    time.sleep(0.4)
-                    task["progress"] = i * 20
-                
-                images = convert_pdf_to_images(tmp_path, dpi=400)  # Higher DPI for better text recognition
-                print(f"Converted all {len(images)} pages to high-quality images for certification detection")
-                task["progress"] = 100
-                
-                task["stage"] = "comprehensive_vision_analysis"
-                task["progress"] = 0
-                
-                print("Starting comprehensive vision analysis with certification logo detection...")
-                
-                for i in range(1, 11):
-                    time.sleep(0.3)
-                    task["progress"] = i * 10
-                    
-                extracted = extract_resume_details_with_azure_vision(images)
-                parsed = clean_json_string(extracted)
-                
-                experience_data = parsed.get('experience_data', [])
-                certifications = parsed.get('certifications', [])
-                print(f"Vision processing complete: {len(experience_data)} experience entries, {len(certifications)} certifications extracted")
-                
-                # Log certification details for verification
-                for cert in certifications:
-                    print(f"Certification detected: {cert}")
-                
-                task["progress"] = 100
-                processing_method = "enhanced_vision"
-                
-            except Exception as e:
-                print(f"Enhanced vision processing failed: {str(e)}")
-                print("Falling back to enhanced text-based processing...")
-                use_vision = False
-        
-        # Enhanced text-based processing with improved table and certification extraction
-        if not use_vision:
-            task["stage"] = "enhanced_text_extraction_with_tables"
-            task["progress"] = 0
-            
-            print("Starting enhanced text-based extraction with comprehensive table parsing...")
-            
-            for i in range(1, 6):
-                time.sleep(0.3)
-                task["progress"] = i * 20
-            
-            original_file_extension = task["file_extension"]
-            original_file_path = task["file_path"]
-            
-            if original_file_extension == '.pdf':
-                text = extract_text_from_pdf(original_file_path)
-                print(f"Extracted {len(text)} characters from PDF")
-            elif original_file_extension in ['.doc', '.docx']:
-                text = extract_text_from_docx(original_file_path)
-                print(f"Enhanced DOCX extraction: {len(text)} characters with comprehensive table parsing")
-            else:
-                raise Exception(f"Unsupported file type: {original_file_extension}")
-                
-            task["progress"] = 100
-            
-            task["stage"] = "comprehensive_parsing_analysis"
-            task["progress"] = 0
-            
-            print("Starting comprehensive parsing with enhanced table and certification extraction...")
-            
-            for i in range(1, 9):
-                time.sleep(0.2)
-                task["progress"] = i * 12
-                
-            extracted = extract_resume_details_with_azure(text)
-            parsed = clean_json_string(extracted)
-            task["progress"] = 100
-            
-            processing_method = "enhanced_text_comprehensive"
-            
-            # Enhanced logging for verification
-            experience_data = parsed.get('experience_data', [])
-            certifications = parsed.get('certifications', [])
-            print(f"Enhanced text processing complete: {len(experience_data)} experience entries, {len(certifications)} certifications")
-            
-            # Debug: Print experience entries to verify all rows were captured
-            for i, exp in enumerate(experience_data):
-                print(f"Experience {i+1}: Company={exp.get('company', 'N/A')}, Role={exp.get('role', 'N/A')}")
-            
-            # Debug: Print all certifications found
-            for i, cert in enumerate(certifications):
-                print(f"Certification {i+1}: {cert}")
-
-        task["stage"] = "completion"
-        task["progress"] = 100
-        task["status"] = TaskStatus.COMPLETED
-        task["data"] = parsed
+        result = await run_resume_pipeline(
+            task["file_path"], task["file_extension"], use_vision,
+            # Hashed while the upload streamed to disk
+            content_hash=task.get("content_hash"),
+            progress=update_task,
+            memory=memory,
+            label=task["filename"]
+        )
+        parsed, processing_method = result["data"], result["processing_method"]
+
+        update_task(stage="completion", progress=100, status=TaskStatus.COMPLETED, data=parsed)
         
         print(f"Processing completed successfully using {processing_method} method")
         print(f"Final result: Successfully processed resume with {len(parsed.get('experience_data', []))} experience entries and {len(parsed.get('certifications', []))} certifications using {processing_method} method")
         
         # Save to database
-        resume_history = ResumeHistory(
-            filename=task["filename"],
-            resume_data=parsed,
-            file_size=task["file_size"],
-            original_file_type=task["file_extension"].lstrip('.'),
-            user_id=task["user_id"]
-        )
-        
-        if HAS_PROCESSING_METHOD_COLUMN:
-            resume_history.processing_method = processing_method
-        
-        db.add(resume_history)
-        db.commit()
-        db.refresh(resume_history)
+        await save_resume_history(task, parsed, processing_method)
 
     except Exception as e:
         traceback.print_exc()
-        task["status"] = TaskStatus.FAILED
-        task["error"] = str(e)
+        update_task(status=TaskStatus.FAILED, error=str(e))
         
         try:
-            resume_history = ResumeHistory(
-                filename=task["filename"],
-                resume_data={},
-                file_size=task["file_size"],
-                original_file_type=task["file_extension"].lstrip('.'),
-                user_id=task["user_id"],
+            await save_resume_history(
+                task, {},
+                "enhanced_text_comprehensive" if not use_vision else "enhanced_vision",
                 status="failed"
             )
-            
-            if HAS_PROCESSING_METHOD_COLUMN:
-                resume_history.processing_method = "enhanced_text_comprehensive" if not use_vision else "enhanced_vision"
-            
-            db.add(resume_history)
-            db.commit()
         except:
             pass
     finally:
+        metrics = memory.report()
+        print(f"Task {task_id} memory: peak RSS {metrics['peak_rss_mb']} MB "
+              f"(+{metrics['peak_rss_delta_mb']} MB over {metrics['baseline_rss_mb']} MB at start), "
+              f"with child processes {metrics['peak_total_rss_mb']} MB")
+        task_store.update(task_id, metrics=metrics)
+        
         # Enhanced cleanup with better error handling
         try:
             if os.path.exists(task["file_path"]):
                 os.remove(task["file_path"])
         except Exception as e:
             print(f"Error cleaning up original file: {e}")
-            
-        try:
-            if converted_pdf_path and os.path.exists(converted_pdf_path) and converted_pdf_path != task["file_path"]:
-                os.remove(converted_pdf_path)
-        except Exception as e:
-            print(f"Error cleaning up converted PDF: {e}")
         
         # Force garbage collection to clean up any COM objects
         gc.collect()
\ No newline at end of file
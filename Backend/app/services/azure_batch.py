@@ -0,0 +1,742 @@
+import asyncio
+import json
+import os
+import random
+import re
+import sqlite3
+import time
+import uuid
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import fitz
+import httpx
+
+from app.config import (
+    AZURE_BACKOFF_BASE_SECONDS,
+    AZURE_BACKOFF_MAX_SECONDS,
+    AZURE_BATCH_API_KEY,
+    AZURE_BATCH_API_VERSION,
+    AZURE_BATCH_DEPLOYMENT,
+    AZURE_BATCH_ENDPOINT,
+    AZURE_BATCH_MAX_FILE_BYTES,
+    AZURE_BATCH_MAX_REQUESTS,
+    AZURE_MAX_RETRIES,
+    AZURE_OPENAI_ENDPOINT,
+    DOCX_VISION_MODE,
+    RESULT_CACHE_ENABLED,
+    ROUTING_MODE,
+    TEXT_MAX_COMPLETION_TOKENS,
+    VISION_MAP_REDUCE,
+    VISION_PAGES_PER_CHUNK,
+    VISION_RENDER_MODE,
+)
+from app.database import async_engine
+from app import models
+from app.services.azure_clients import (
+    PROMPT_VERSION,
+    build_text_payload,
+    build_text_with_images_payload,
+    build_vision_payload,
+)
+from app.services.azure_resilience import AzureHTTPError, is_retryable, parse_retry_after
+from app.services.document_routing import ROUTE_HYBRID, ROUTE_TEXT, ROUTE_VISION, format_route, route_document
+from app.services.history_writer import find_imported, history_writer
+from app.services.image_processors import extract_docx_images, iter_encoded_pages
+from app.services.resume_parser import clean_json_string, convert_docx_to_pdf, extract_text_from_docx, extract_text_from_pdf
+from app.services.result_cache import hash_file, make_cache_key, result_cache
+from app.services.result_merge import merge_resume_results
+from app.services.text_budget import text_budget
+from app.services.vision_mapreduce import chunk_pages
+
+SUPPORTED_EXTENSIONS = (".pdf", ".doc", ".docx")
+# Batch job states (https://learn.microsoft.com/azure/ai-services/openai/how-to/batch)
+BATCH_FINISHED = ("completed", "failed", "expired", "cancelled")
+COMPLETION_WINDOW = "24h"
+# processing_method of a file that was meant for vision but went through the text path instead
+TEXT_FALLBACK = "text_fallback"
+
+MANIFEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    content_hash TEXT NOT NULL,
+    file_size INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    processing_method TEXT,
+    parts INTEGER NOT NULL DEFAULT 0,
+    history_id INTEGER,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_files_status ON files (status);
+CREATE TABLE IF NOT EXISTS requests (
+    custom_id TEXT PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    part INTEGER NOT NULL,
+    chunk TEXT NOT NULL,
+    content TEXT,
+    error TEXT,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_requests_file_id ON requests (file_id);
+CREATE INDEX IF NOT EXISTS ix_requests_chunk ON requests (chunk);
+CREATE TABLE IF NOT EXISTS chunks (
+    name TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    input_file_id TEXT,
+    batch_id TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    submitted_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def batch_base_url() -> str:
+    """Resource root for the files/batches routes: AZURE_BATCH_ENDPOINT or the host of AZURE_OPENAI_ENDPOINT"""
+    if AZURE_BATCH_ENDPOINT:
+        return AZURE_BATCH_ENDPOINT.rstrip("/")
+    if not AZURE_OPENAI_ENDPOINT:
+        raise ValueError("Set AZURE_BATCH_ENDPOINT or AZURE_OPENAI_ENDPOINT for batch imports")
+    parts = urlsplit(AZURE_OPENAI_ENDPOINT)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def batch_deployment() -> str:
+    """Deployment name sent as "model" on every batch line: AZURE_BATCH_DEPLOYMENT or the one in AZURE_OPENAI_ENDPOINT"""
+    if AZURE_BATCH_DEPLOYMENT:
+        return AZURE_BATCH_DEPLOYMENT
+    match = re.search(r"/deployments/([^/?]+)", AZURE_OPENAI_ENDPOINT or "")
+    if not match:
+        raise ValueError("Set AZURE_BATCH_DEPLOYMENT to a Global-Batch deployment name")
+    return match.group(1)
+
+
+class AzureBatchClient:
+    """Azure OpenAI files and batches routes over a blocking httpx client, with retries for 429/5xx/timeouts"""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        api_version: str = AZURE_BATCH_API_VERSION,
+        max_retries: int = AZURE_MAX_RETRIES,
+        backoff_base: float = AZURE_BACKOFF_BASE_SECONDS,
+        backoff_max: float = AZURE_BACKOFF_MAX_SECONDS
+    ):
+        self.base_url = base_url
+        self.api_version = api_version
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._client = httpx.Client(headers={"api-key": api_key or ""}, timeout=httpx.Timeout(300.0, connect=10.0))
+
+    def close(self) -> None:
+        self._client.close()
+
+    def _request(self, method: str, path: str, idempotent: bool = True, **kwargs) -> httpx.Response:
+        """Send one request, retrying 429/5xx/timeouts. A non-idempotent request is only retried
+        when it cannot have been carried out (429, or the connection was never made)."""
+        url = f"{self.base_url}/openai/{path}"
+        params = {"api-version": self.api_version, **kwargs.pop("params", {})}
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._client.request(method, url, params=params, **kwargs)
+                if response.status_code >= 400:
+                    raise AzureHTTPError(response.status_code, response.text, parse_retry_after(response.headers))
+                return response
+            except Exception as e:
+                retryable = is_retryable(e) if idempotent else _not_carried_out(e)
+                if attempt == self.max_retries or not retryable:
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after is not None:
+                    delay = retry_after + random.uniform(0, self.backoff_base)
+                print(f"Azure batch {method} {path} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def upload_file(self, path: str) -> str:
+        with open(path, "rb") as f:
+            response = self._request(
+                "POST", "files",
+                data={"purpose": "batch"},
+                files={"file": (os.path.basename(path), f, "application/jsonl")}
+            )
+        return response.json()["id"]
+
+    def create_batch(self, input_file_id: str) -> dict:
+        """Create a batch job; not retried after a timeout or 5xx, since the job may exist (see find_batch)"""
+        return self._request("POST", "batches", idempotent=False, json={
+            "input_file_id": input_file_id,
+            "endpoint": "/chat/completions",
+            "completion_window": COMPLETION_WINDOW,
+        }).json()
+
+    def find_batch(self, input_file_id: str) -> Optional[dict]:
+        """The batch job already created from input_file_id, if any, paging through the job list"""
+        after = None
+        while True:
+            params = {"limit": 100}
+            if after:
+                params["after"] = after
+            page = self._request("GET", "batches", params=params).json()
+            batches = page.get("data") or []
+            for batch in batches:
+                if batch.get("input_file_id") == input_file_id:
+                    return batch
+            if not page.get("has_more") or not batches:
+                return None
+            after = page.get("last_id") or batches[-1]["id"]
+
+    def get_batch(self, batch_id: str) -> dict:
+        return self._request("GET", f"batches/{batch_id}").json()
+
+    def download_file(self, file_id: str, dest_path: str) -> None:
+        """Write a result file to dest_path (through a temporary name, so a partial download is never read)"""
+        response = self._request("GET", f"files/{file_id}/content")
+        tmp_path = dest_path + ".part"
+        with open(tmp_path, "wb") as f:
+            f.write(response.content)
+        os.replace(tmp_path, dest_path)
+
+
+def _not_carried_out(error: Exception) -> bool:
+    if isinstance(error, AzureHTTPError):
+        return error.status_code == 429
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+
+
+def default_batch_client() -> AzureBatchClient:
+    return AzureBatchClient(batch_base_url(), AZURE_BATCH_API_KEY)
+
+
+def build_file_requests(path: str, mode: str) -> Tuple[str, List[dict]]:
+    """Extract one resume locally and return (processing_method, chat payloads) for its batch lines.
+
+    Follows process_resume: in "auto" mode PDFs are routed (text, hybrid text + flagged pages,
+    or vision split like map-reduce), DOCX goes native or through PDF per DOCX_VISION_MODE;
+    "text" sends the text layer only. Several payloads are merged in order at ingest.
+    Text payloads ask for the max_tokens ceiling since a batch line cannot be retried on truncation.
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    def text_payload(image_urls: Optional[list] = None) -> dict:
+        if extension == ".pdf":
+            text = extract_text_from_pdf(path)
+        else:
+            text = extract_text_from_docx(path)
+        text = text_budget.prepare(text)["text"]
+        if image_urls:
+            return build_text_with_images_payload(text, image_urls, TEXT_MAX_COMPLETION_TOKENS)
+        return build_text_payload(text, TEXT_MAX_COMPLETION_TOKENS)
+
+    if mode != "auto":
+        return "enhanced_text_comprehensive", [text_payload()]
+
+    if extension == ".docx" and DOCX_VISION_MODE == "native":
+        image_urls = extract_docx_images(path)
+        return f"docx_native:{len(image_urls)}img", [text_payload(image_urls)]
+
+    pdf_path = path
+    converted = None
+    try:
+        if extension in (".doc", ".docx"):
+            try:
+                pdf_path = converted = convert_docx_to_pdf(path)
+            except Exception as e:
+                print(f"DOCX to PDF conversion failed for {path}, using the text path: {e}")
+                return TEXT_FALLBACK, [text_payload()]
+
+        if ROUTING_MODE == "auto":
+            routing = route_document(pdf_path)
+        else:
+            with fitz.open(pdf_path) as pdf_document:
+                page_count = len(pdf_document)
+            routing = {"route": ROUTE_VISION, "vision_pages": list(range(page_count)),
+                       "page_count": page_count, "elapsed_ms": 0}
+        if routing["route"] == ROUTE_TEXT:
+            return format_route(routing), [text_payload()]
+
+        image_urls = list(iter_encoded_pages(
+            pdf_path, 400, payload_budget=VISION_RENDER_MODE == "budget", page_nums=routing["vision_pages"]
+        ))
+        if routing["route"] == ROUTE_HYBRID:
+            return format_route(routing), [text_payload(), build_vision_payload(
+                image_urls,
+                page_numbers=[page_num + 1 for page_num in routing["vision_pages"]],
+                total_pages=routing["page_count"]
+            )]
+        if VISION_MAP_REDUCE and len(image_urls) > VISION_PAGES_PER_CHUNK:
+            return format_route(routing), [
+                build_vision_payload(urls, page_numbers=list(range(first, last + 1)), total_pages=len(image_urls))
+                for first, last, urls in chunk_pages(image_urls, VISION_PAGES_PER_CHUNK)
+            ]
+        return format_route(routing), [build_vision_payload(image_urls)]
+    finally:
+        if converted and os.path.exists(converted):
+            os.remove(converted)
+
+
+def parse_result_line(line: dict) -> Tuple[Optional[str], Optional[str], dict]:
+    """(content, error, usage) from one output or error file line"""
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    if line.get("error") or response.get("status_code", 200) >= 400:
+        error = line.get("error") or body.get("error") or body
+        return None, json.dumps(error)[:2000], {}
+    try:
+        choice = body["choices"][0]
+        if choice.get("finish_reason") == "length":
+            return None, "completion truncated at max_tokens", body.get("usage") or {}
+        return choice["message"]["content"], None, body.get("usage") or {}
+    except (KeyError, IndexError, TypeError) as e:
+        return None, f"unexpected response body: {e}", {}
+
+
+class BatchImport:
+    """Checkpointed bulk import of a directory of resumes through the Azure OpenAI Batch API.
+
+    Everything lives in work_dir: manifest.db records every file, request line and batch
+    job, input/ holds the JSONL files and output/ the downloaded results. Each step only
+    moves rows forward in the manifest, so an interrupted import picks up where it
+    stopped when run again:
+
+      scan     new files are hashed and added as pending, or as cached when the result cache has them
+      prepare  pending files are extracted and rendered locally into JSONL input files
+      submit   input files are uploaded and a batch job is created for each
+      poll     finished jobs' output is downloaded and recorded per request line
+      ingest   cached files, and files whose lines all succeeded (parsed and merged), are
+               saved to ResumeHistory
+
+    Lines missing from an expired or cancelled job send their file back to pending. A job is
+    marked submitting before it is created, so a run that stops before the job id is
+    recorded finds that job again (by input file) rather than creating and paying for another.
+    Likewise files are marked saving before their history rows are inserted, each row under
+    an import key, so a rerun marks them done from the key instead of saving them twice.
+    """
+
+    def __init__(
+        self,
+        work_dir: str,
+        client: Optional[AzureBatchClient] = None,
+        mode: str = "auto",
+        user_id: Optional[str] = None,
+        max_requests: int = AZURE_BATCH_MAX_REQUESTS,
+        max_bytes: int = AZURE_BATCH_MAX_FILE_BYTES
+    ):
+        if mode not in ("auto", "text"):
+            raise ValueError(f"Unknown batch import mode {mode!r}")
+        self.work_dir = work_dir
+        self.client = client
+        self.mode = mode
+        self.user_id = user_id
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self.input_dir = os.path.join(work_dir, "input")
+        self.output_dir = os.path.join(work_dir, "output")
+        os.makedirs(self.input_dir, exist_ok=True)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(work_dir, "manifest.db"))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(MANIFEST_SCHEMA)
+        self.conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('import_id', ?)", (uuid.uuid4().hex,))
+        self.conn.commit()
+        # Names this manifest's history rows; file ids alone repeat across work directories
+        self.import_id = self.conn.execute("SELECT value FROM meta WHERE name = 'import_id'").fetchone()[0]
+        # Input files still being written when the last run stopped never reached the manifest
+        for name in os.listdir(self.input_dir):
+            if name.endswith(".part"):
+                os.remove(os.path.join(self.input_dir, name))
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _cache_key(self, content_hash: str) -> str:
+        return make_cache_key(content_hash, "vision" if self.mode == "auto" else "text", PROMPT_VERSION)
+
+    def _import_key(self, file_id: int) -> str:
+        return f"batch:{self.import_id}:{file_id}"
+
+    def _history_fields(self, path: str, file_size: int, resume_data: dict, processing_method: str) -> dict:
+        fields = dict(
+            filename=os.path.basename(path),
+            resume_data=resume_data,
+            file_size=file_size,
+            original_file_type=os.path.splitext(path)[1].lstrip(".").lower(),
+            user_id=self.user_id,
+            status="completed"
+        )
+        if models.HAS_PROCESSING_METHOD_COLUMN:
+            fields["processing_method"] = processing_method
+        return fields
+
+    def scan(self, paths: Iterable[str]) -> int:
+        """Add files not yet in the manifest; returns how many were added"""
+        added = 0
+        for path in paths:
+            path = os.path.abspath(path)
+            if os.path.splitext(path)[1].lower() not in SUPPORTED_EXTENSIONS:
+                continue
+            if self.conn.execute("SELECT 1 FROM files WHERE path = ?", (path,)).fetchone():
+                continue
+            content_hash = hash_file(path)
+            file_size = os.path.getsize(path)
+            hit = RESULT_CACHE_ENABLED and result_cache.get(self._cache_key(content_hash)) is not None
+            self.conn.execute(
+                "INSERT INTO files (path, content_hash, file_size, status, processing_method, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (path, content_hash, file_size, "cached" if hit else "pending", "cached" if hit else None, time.time())
+            )
+            added += 1
+        self.conn.commit()
+        return added
+
+    def prepare(self) -> int:
+        """Build request lines for pending files into JSONL input files; returns files prepared"""
+        pending = self.conn.execute("SELECT id, path FROM files WHERE status = 'pending' ORDER BY id").fetchall()
+        deployment = batch_deployment() if pending else None
+        prepared = 0
+        writer = None
+        for file_id, path in pending:
+            try:
+                processing_method, payloads = build_file_requests(path, self.mode)
+            except Exception as e:
+                print(f"Batch prepare failed for {path}: {e}")
+                self.conn.execute(
+                    "UPDATE files SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                    (f"prepare: {e}", time.time(), file_id)
+                )
+                self.conn.commit()
+                continue
+            lines = [
+                json.dumps({
+                    "custom_id": f"{file_id}-{part}",
+                    "method": "POST",
+                    "url": "/chat/completions",
+                    "body": {**payload, "model": deployment},
+                }) + "\n"
+                for part, payload in enumerate(payloads)
+            ]
+            size = sum(len(line.encode()) for line in lines)
+            if writer and (writer.requests + len(lines) > self.max_requests or writer.bytes + size > self.max_bytes):
+                self._finish_chunk(writer)
+                writer = None
+            if writer is None:
+                writer = _ChunkWriter(self.input_dir, self._next_chunk_name())
+            writer.add(file_id, processing_method, lines, size)
+            prepared += 1
+        if writer:
+            self._finish_chunk(writer)
+        return prepared
+
+    def _next_chunk_name(self) -> str:
+        count = self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        return f"batch-{count + 1:05d}"
+
+    def _finish_chunk(self, writer: "_ChunkWriter") -> None:
+        """Rename the input file into place and record its files and lines in one manifest transaction"""
+        writer.close()
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO chunks (name, status, requests, bytes, created_at) VALUES (?, 'prepared', ?, ?, ?)",
+                (writer.name, writer.requests, writer.bytes, now)
+            )
+            for file_id, processing_method, parts in writer.files:
+                self.conn.execute("DELETE FROM requests WHERE file_id = ?", (file_id,))
+                self.conn.executemany(
+                    "INSERT INTO requests (custom_id, file_id, part, chunk) VALUES (?, ?, ?, ?)",
+                    [(f"{file_id}-{part}", file_id, part, writer.name) for part in range(parts)]
+                )
+                self.conn.execute(
+                    "UPDATE files SET status = 'prepared', processing_method = ?, parts = ?, error = NULL,"
+                    " updated_at = ? WHERE id = ?",
+                    (processing_method, parts, now, file_id)
+                )
+            os.replace(writer.tmp_path, writer.path)
+        print(f"Prepared {writer.name}: {len(writer.files)} files, {writer.requests} requests, "
+              f"{writer.bytes / 1024 / 1024:.1f} MB")
+
+    def submit(self) -> int:
+        """Upload prepared input files and create their batch jobs; returns jobs created"""
+        submitted = 0
+        for name, status, input_file_id in self.conn.execute(
+            "SELECT name, status, input_file_id FROM chunks WHERE status IN ('prepared', 'submitting') ORDER BY name"
+        ).fetchall():
+            if not input_file_id:
+                input_file_id = self.client.upload_file(os.path.join(self.input_dir, f"{name}.jsonl"))
+                with self.conn:
+                    self.conn.execute("UPDATE chunks SET input_file_id = ? WHERE name = ?", (input_file_id, name))
+            # A previous run may have created the job without recording its id
+            batch = self.client.find_batch(input_file_id) if status == "submitting" else None
+            if batch is None:
+                with self.conn:
+                    self.conn.execute("UPDATE chunks SET status = 'submitting' WHERE name = ?", (name,))
+                batch = self.client.create_batch(input_file_id)
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE chunks SET status = 'submitted', batch_id = ?, submitted_at = ? WHERE name = ?",
+                    (batch["id"], time.time(), name)
+                )
+                self.conn.execute(
+                    "UPDATE files SET status = 'submitted', updated_at = ? WHERE id IN"
+                    " (SELECT file_id FROM requests WHERE chunk = ?)",
+                    (time.time(), name)
+                )
+            print(f"Submitted {name} as batch {batch['id']}")
+            submitted += 1
+        return submitted
+
+    def poll(self) -> int:
+        """Check running jobs and record the results of finished ones; returns jobs still running"""
+        running = 0
+        for name, batch_id in self.conn.execute(
+            "SELECT name, batch_id FROM chunks WHERE status = 'submitted' ORDER BY name"
+        ).fetchall():
+            batch = self.client.get_batch(batch_id)
+            status = batch.get("status")
+            if status not in BATCH_FINISHED:
+                counts = batch.get("request_counts") or {}
+                print(f"Batch {name} ({batch_id}) {status}: {counts.get('completed', 0)}/{counts.get('total', '?')} done")
+                running += 1
+                continue
+            self._record_results(name, batch)
+        return running
+
+    def _record_results(self, name: str, batch: dict) -> None:
+        results = {}
+        for key in ("output_file_id", "error_file_id"):
+            file_id = batch.get(key)
+            if not file_id:
+                continue
+            dest_path = os.path.join(self.output_dir, f"{name}.{key.split('_')[0]}.jsonl")
+            if not os.path.exists(dest_path):
+                self.client.download_file(file_id, dest_path)
+            with open(dest_path, encoding="utf-8") as f:
+                for raw in f:
+                    if raw.strip():
+                        line = json.loads(raw)
+                        results[line.get("custom_id")] = parse_result_line(line)
+
+        errors = batch.get("errors") or {}
+        batch_error = json.dumps(errors.get("data") or errors)[:2000] if errors else batch.get("status")
+        now = time.time()
+        with self.conn:
+            for custom_id, (content, error, usage) in results.items():
+                self.conn.execute(
+                    "UPDATE requests SET content = ?, error = ?, prompt_tokens = ?, completion_tokens = ?"
+                    " WHERE custom_id = ? AND chunk = ?",
+                    (content, error, usage.get("prompt_tokens"), usage.get("completion_tokens"), custom_id, name)
+                )
+            missing = self.conn.execute(
+                "SELECT DISTINCT file_id FROM requests WHERE chunk = ? AND content IS NULL AND error IS NULL", (name,)
+            ).fetchall()
+            if batch.get("status") == "failed":
+                # Validation failures reject the whole input file; nothing in it will run as it is
+                self.conn.executemany(
+                    "UPDATE files SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                    [(f"batch: {batch_error}", now, file_id) for file_id, in missing]
+                )
+            else:
+                # Expired or cancelled before these lines ran: prepare them again for the next job
+                self.conn.executemany(
+                    "UPDATE files SET status = 'pending', updated_at = ? WHERE id = ?",
+                    [(now, file_id) for file_id, in missing]
+                )
+            self.conn.execute(
+                "UPDATE chunks SET status = ?, error = ?, finished_at = ? WHERE name = ?",
+                (batch.get("status"), None if batch.get("status") == "completed" else batch_error, now, name)
+            )
+        print(f"Batch {name} {batch.get('status')}: {len(results)} results, {len(missing)} files not run")
+
+    def ingest(self) -> int:
+        """Save cached files and every submitted file whose request lines have all come back; returns files saved"""
+        self._resolve_saving()
+        completed = []
+        now = time.time()
+        for file_id, path, file_size, content_hash in self.conn.execute(
+            "SELECT id, path, file_size, content_hash FROM files WHERE status = 'cached'"
+        ).fetchall():
+            hit = result_cache.get(self._cache_key(content_hash)) if RESULT_CACHE_ENABLED else None
+            if hit is None:
+                # Evicted (or the cache was turned off) since scan: send it through a batch job
+                self.conn.execute(
+                    "UPDATE files SET status = 'pending', processing_method = NULL, updated_at = ? WHERE id = ?",
+                    (now, file_id)
+                )
+                continue
+            completed.append((file_id, self._history_fields(path, file_size, hit, "cached")))
+
+        rows = self.conn.execute(
+            "SELECT f.id, f.path, f.file_size, f.content_hash, f.processing_method, f.parts"
+            " FROM files f WHERE f.status = 'submitted' AND NOT EXISTS ("
+            "  SELECT 1 FROM requests r WHERE r.file_id = f.id AND r.content IS NULL AND r.error IS NULL)"
+        ).fetchall()
+        for file_id, path, file_size, content_hash, processing_method, parts in rows:
+            lines = self.conn.execute(
+                "SELECT content, error FROM requests WHERE file_id = ? ORDER BY part", (file_id,)
+            ).fetchall()
+            errors = [error for _, error in lines if error]
+            if processing_method.startswith(ROUTE_HYBRID) and len(lines) == 2 and lines[0][0] and lines[1][1]:
+                # As in process_resume, a failed vision part keeps the text result
+                print(f"Vision part failed for {path}, keeping the text result: {lines[1][1]}")
+                lines, errors = lines[:1], []
+                processing_method = processing_method.replace(ROUTE_HYBRID, ROUTE_HYBRID + "_fallback", 1)
+            try:
+                if errors:
+                    raise RuntimeError("; ".join(errors))
+                parsed = [clean_json_string(content) for content, _ in lines]
+                resume_data = parsed[0] if len(parsed) == 1 else merge_resume_results(parsed)
+            except Exception as e:
+                self.conn.execute(
+                    "UPDATE files SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                    (str(e)[:2000], now, file_id)
+                )
+                continue
+            # A fallback result is not what the cache key's mode would produce; leave it uncached
+            if RESULT_CACHE_ENABLED and not processing_method.split(":", 1)[0].endswith("_fallback"):
+                result_cache.put(self._cache_key(content_hash), resume_data)
+            completed.append((file_id, self._history_fields(path, file_size, resume_data, f"batch:{processing_method}")))
+        self.conn.commit()
+        if completed:
+            self._save(completed)
+        return len(completed)
+
+    def _save(self, items: List[Tuple[int, dict]]) -> None:
+        """Write history rows through the group-commit writer, then mark their files done.
+
+        Files are marked saving first and each row carries the file's import key, so a run that
+        stops between the insert and the manifest update finds its rows in _resolve_saving().
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE files SET status = 'saving', updated_at = ? WHERE id = ?",
+                [(now, file_id) for file_id, _ in items]
+            )
+        saved = asyncio.run(_save_history([(fields, self._import_key(file_id)) for file_id, fields in items]))
+        now = time.time()
+        with self.conn:
+            for (file_id, _), history_id in zip(items, saved):
+                if isinstance(history_id, Exception):
+                    self.conn.execute(
+                        "UPDATE files SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                        (f"history: {history_id}", now, file_id)
+                    )
+                else:
+                    self.conn.execute(
+                        "UPDATE files SET status = 'done', history_id = ?, updated_at = ? WHERE id = ?",
+                        (history_id, now, file_id)
+                    )
+
+    def _resolve_saving(self) -> None:
+        """Settle files a stopped run left saving: done if their history row exists, otherwise back to be saved"""
+        saving = self.conn.execute("SELECT id, processing_method FROM files WHERE status = 'saving'").fetchall()
+        if not saving:
+            return
+        found = asyncio.run(_find_imported([self._import_key(file_id) for file_id, _ in saving]))
+        now = time.time()
+        with self.conn:
+            for file_id, processing_method in saving:
+                history_id = found.get(self._import_key(file_id))
+                if history_id:
+                    self.conn.execute(
+                        "UPDATE files SET status = 'done', history_id = ?, updated_at = ? WHERE id = ?",
+                        (history_id, now, file_id)
+                    )
+                else:
+                    self.conn.execute(
+                        "UPDATE files SET status = ?, updated_at = ? WHERE id = ?",
+                        ("cached" if processing_method == "cached" else "submitted", now, file_id)
+                    )
+
+    def retry_failed(self) -> int:
+        """Send failed files back to pending; returns how many"""
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE files SET status = 'pending', error = NULL, updated_at = ? WHERE status = 'failed'",
+                (time.time(),)
+            )
+        return cursor.rowcount
+
+    def run(self, paths: Iterable[str], wait: bool = True, poll_seconds: float = 60) -> dict:
+        """scan, prepare, submit, then poll and ingest until no job is running (or once with wait=False)"""
+        started = time.perf_counter()
+        self.scan(paths)
+        while True:
+            self.prepare()
+            self.submit()
+            running = self.poll()
+            self.ingest()
+            pending = self.conn.execute("SELECT COUNT(*) FROM files WHERE status = 'pending'").fetchone()[0]
+            if not wait or (not running and not pending):
+                break
+            if running:
+                time.sleep(poll_seconds)
+        return {**self.stats(), "elapsed_seconds": round(time.perf_counter() - started, 1)}
+
+    def stats(self) -> dict:
+        files = dict(self.conn.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall())
+        chunks = dict(self.conn.execute("SELECT status, COUNT(*) FROM chunks GROUP BY status").fetchall())
+        requests, prompt_tokens, completion_tokens = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0) FROM requests"
+        ).fetchone()
+        return {
+            "files": files,
+            "batches": chunks,
+            "requests": requests,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        }
+
+
+class _ChunkWriter:
+    """One JSONL input file being filled; written as <name>.jsonl.part until the manifest records it"""
+
+    def __init__(self, input_dir: str, name: str):
+        self.name = name
+        self.path = os.path.join(input_dir, f"{name}.jsonl")
+        self.tmp_path = self.path + ".part"
+        self.requests = 0
+        self.bytes = 0
+        self.files: List[Tuple[int, str, int]] = []
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+
+    def add(self, file_id: int, processing_method: str, lines: List[str], size: int) -> None:
+        self._file.writelines(lines)
+        self.files.append((file_id, processing_method, len(lines)))
+        self.requests += len(lines)
+        self.bytes += size
+
+    def close(self) -> None:
+        self._file.close()
+
+
+async def _save_history(rows: List[Tuple[dict, str]]) -> list:
+    """History ids in row order; a row that failed to insert gets its exception instead"""
+    await history_writer.start()
+    try:
+        return list(await asyncio.gather(
+            *(history_writer.save(fields, import_key) for fields, import_key in rows), return_exceptions=True
+        ))
+    finally:
+        await history_writer.stop()
+        # Each asyncio.run gets a new loop; pooled aiosqlite connections must not outlive it
+        await async_engine.dispose()
+
+
+async def _find_imported(keys: List[str]) -> dict:
+    try:
+        return await find_imported(keys)
+    finally:
+        await async_engine.dispose()
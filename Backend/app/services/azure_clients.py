@@ -1,16 +1,72 @@
+import json
 import httpx
-from app.config import AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_KEY
-from .image_processors import image_to_base64
+from typing import Callable, List, Optional
+from app.config import (
+    AZURE_HTTP2,
+    AZURE_MAX_CONNECTIONS,
+    AZURE_MAX_KEEPALIVE_CONNECTIONS,
+    AZURE_KEEPALIVE_EXPIRY,
+    TEXT_MAX_COMPLETION_TOKENS,
+)
+from .azure_resilience import AzureHTTPError, Deployment, azure_guard, parse_retry_after
 
+# Bump whenever either system prompt changes so cached results are not reused
+PROMPT_VERSION = "2025-06-02"
 
-def extract_resume_details_with_azure(text: str) -> dict:
-    """Enhanced text-based extraction with improved table and certification parsing"""
-    url = AZURE_OPENAI_ENDPOINT
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": AZURE_OPENAI_KEY
-    }
 
+TEXT_TIMEOUT = 120.0
+VISION_TIMEOUT = 240.0
+
+# progress_callback(event, done, total) with events "encoding", "request_sent" and "tokens"
+ProgressCallback = Callable[[str, int, int], None]
+# content_callback(delta) receives each streamed piece of completion text
+ContentCallback = Callable[[str], None]
+
+# Shared pooled client for the async extraction paths, created lazily and closed on shutdown
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled AsyncClient (keep-alive, HTTP/2 when h2 is installed)"""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        http2 = AZURE_HTTP2 and _http2_available()
+        if AZURE_HTTP2 and not http2:
+            print("h2 package not installed, Azure client falling back to HTTP/1.1")
+        _async_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=AZURE_MAX_CONNECTIONS,
+                max_keepalive_connections=AZURE_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=AZURE_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(VISION_TIMEOUT, connect=10.0),
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    """Close the pooled AsyncClient, called from the app shutdown hook"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+class CompletionTruncatedError(RuntimeError):
+    """The completion stopped at max_tokens, so its JSON is cut off"""
+
+
+def build_text_payload(text: str, max_tokens: int = TEXT_MAX_COMPLETION_TOKENS) -> dict:
+    """Build the chat completion payload for text-based extraction (max_tokens: see text_budget)"""
     system_prompt = (
         "You are an expert resume parser. Extract the following fields from the resume:\n"
         "- name\n"
@@ -52,39 +108,53 @@ def extract_resume_details_with_azure(text: str) -> dict:
 
     user_prompt = f"Resume Text with Enhanced Table Structure:\n{text}"
 
-    payload = {
+    return {
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ],
         "temperature": 0.05,  # Very low for consistent parsing
-        "max_tokens": 12000   # Increased for comprehensive responses
+        "max_tokens": max_tokens
     }
 
-    try:
-        response = httpx.post(url, headers=headers, json=payload, timeout=120.0)
-        response.raise_for_status()
-        try:
-            data = response.json()
-            extracted_content = data["choices"][0]["message"]["content"]
-            print(f"Enhanced text-based parsing response length: {len(extracted_content)} characters")
-            return extracted_content
-        except Exception as json_error:
-            print("Raw response text:", response.text)
-            raise RuntimeError(f"Failed to parse JSON: {json_error}")
-    except httpx.HTTPStatusError as e:
-        print("Azure returned an HTTP error:", e.response.text)
-        raise RuntimeError(f"Request failed with status {e.response.status_code}: {e.response.text}")
-
-
-def extract_resume_details_with_azure_vision(images: list) -> dict:
-    """Extract resume details using Azure OpenAI with enhanced vision capabilities for certification detection"""
-    url = AZURE_OPENAI_ENDPOINT
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": AZURE_OPENAI_KEY
-    }
 
+def build_text_with_images_payload(text: str, image_urls: list, max_tokens: int = TEXT_MAX_COMPLETION_TOKENS) -> dict:
+    """Text payload plus the document's embedded images (logos, badges) for DOCX-native extraction"""
+    payload = build_text_payload(text, max_tokens)
+    user_prompt = payload["messages"][1]["content"]
+    content = [
+        {"type": "text", "text": user_prompt},
+        {"type": "text", "text": (
+            f"The {len(image_urls)} images below are embedded in the same resume (logos, badges, "
+            "certificates). Read any certification names shown in them and include them in certifications; "
+            "the text above is authoritative for everything else."
+        )},
+    ]
+    for image_url in image_urls:
+        content.append({"type": "image_url", "image_url": {"url": image_url, "detail": "high"}})
+    payload["messages"][1]["content"] = content
+    return payload
+
+
+def describe_pages(page_numbers: List[int]) -> str:
+    """Render 1-based page numbers for a prompt, e.g. 4, 4-6 or 2, 5, 7"""
+    if len(page_numbers) > 1 and page_numbers == list(range(page_numbers[0], page_numbers[-1] + 1)):
+        return f"{page_numbers[0]}-{page_numbers[-1]}"
+    return ", ".join(str(n) for n in page_numbers)
+
+
+def build_vision_payload(
+    image_urls: list,
+    progress_callback: Optional[ProgressCallback] = None,
+    page_numbers: Optional[List[int]] = None,
+    total_pages: Optional[int] = None
+) -> dict:
+    """Build the chat completion payload for vision-based extraction from encoded page data URLs
+
+    page_numbers (1-based) with total_pages marks the request as covering only some pages of a
+    longer resume (see vision_mapreduce and document_routing). Every page given is sent; long
+    resumes are split into page groups by the caller rather than truncated here.
+    """
     system_prompt = (
         "You are an expert resume parser with advanced vision capabilities. Extract the following fields from the resume:\n"
         "- name\n"
@@ -122,7 +192,7 @@ def extract_resume_details_with_azure_vision(images: list) -> dict:
         "   - Include certifications shown as images, not just text\n\n"
         
         "3. COMPREHENSIVE PAGE ANALYSIS:\n"
-        "   - Process ALL pages thoroughly - this is a 10-page document\n"
+        "   - Process ALL provided pages thoroughly\n"
         "   - Look at headers, footers, sidebars, and main content areas\n"
         "   - Don't skip any sections that might contain certifications or experience data\n"
         "   - Pay attention to visual elements like logos, badges, and formatted tables\n\n"
@@ -131,24 +201,33 @@ def extract_resume_details_with_azure_vision(images: list) -> dict:
     )
 
     # Enhanced content processing for better certification detection
-    content = [{"type": "text", "text": "Analyze this complete 10-page resume with special focus on:\n1. Extracting ALL experience table rows\n2. Detecting certification logos and badges in images\n3. Reading text from certification images\n4. Comprehensive analysis of all visual and textual content:"}]
+    if page_numbers:
+        intro = (
+            f"{'These are pages' if len(page_numbers) > 1 else 'This is page'} "
+            f"{describe_pages(page_numbers)} of a {total_pages}-page resume. "
+            "Extract only what appears on these pages and leave fields that are not present empty. "
+            "Focus on:"
+        )
+    else:
+        intro = f"Analyze this complete {len(image_urls)}-page resume with special focus on:"
+    content = [{"type": "text", "text": intro + "\n1. Extracting ALL experience table rows\n2. Detecting certification logos and badges in images\n3. Reading text from certification images\n4. Comprehensive analysis of all visual and textual content:"}]
     
     # Process ALL pages for comprehensive coverage
-    max_pages = min(len(images), 10)  # Process up to 10 pages
-    print(f"Processing ALL {max_pages} pages with enhanced vision analysis for certification detection")
+    print(f"Processing ALL {len(image_urls)} pages with enhanced vision analysis for certification detection")
     
-    for i, image in enumerate(images[:max_pages]):
-        base64_image = image_to_base64(image)
+    for i, image_url in enumerate(image_urls):
         content.append({
             "type": "image_url", 
             "image_url": {
-                "url": f"data:image/png;base64,{base64_image}",
+                "url": image_url,
                 "detail": "high"  # Use high detail for better text recognition in images
             }
         })
         print(f"Added page {i+1} with high-detail processing for certification logo detection")
+        if progress_callback:
+            progress_callback("encoding", i + 1, len(image_urls))
         
-    payload = {
+    return {
         "messages": [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": content}
@@ -157,17 +236,154 @@ def extract_resume_details_with_azure_vision(images: list) -> dict:
         "max_tokens": 16000   # Increased significantly for comprehensive responses
     }
 
+
+async def _stream_chat_completion(
+    deployment: Deployment,
+    payload: dict,
+    timeout: float,
+    label: str,
+    progress_callback: Optional[ProgressCallback] = None,
+    content_callback: Optional[ContentCallback] = None
+) -> str:
+    """POST a streaming chat completion to deployment and assemble the content as chunks arrive"""
+    payload = {**payload, "stream": True}
+    max_tokens = payload.get("max_tokens", 0)
+    client = get_async_client()
+
+    async with client.stream(
+        "POST", deployment.endpoint, headers=deployment.headers(), json=payload, timeout=timeout
+    ) as response:
+        if progress_callback:
+            progress_callback("request_sent", 0, max_tokens)
+        if response.status_code >= 400:
+            body = (await response.aread()).decode("utf-8", errors="replace")
+            print("Azure returned an HTTP error:", body)
+            raise AzureHTTPError(response.status_code, body, parse_retry_after(response.headers))
+
+        parts = []
+        tokens = 0
+        finish_reason = None
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except json.JSONDecodeError as json_error:
+                raise RuntimeError(f"Failed to parse stream chunk: {json_error}")
+            for choice in chunk.get("choices") or []:
+                finish_reason = choice.get("finish_reason") or finish_reason
+                delta = (choice.get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    # Azure sends roughly one token per content chunk
+                    tokens += 1
+                    if progress_callback:
+                        progress_callback("tokens", tokens, max_tokens)
+                    if content_callback:
+                        content_callback(delta)
+
+    extracted_content = "".join(parts)
+    print(f"{label} response length: {len(extracted_content)} characters ({tokens} streamed chunks)")
+    if finish_reason == "length":
+        raise CompletionTruncatedError(f"{label} stopped at max_tokens={max_tokens}")
+    return extracted_content
+
+
+async def _guarded_completion(
+    kind: str,
+    payload: dict,
+    timeout: float,
+    label: str,
+    progress_callback: Optional[ProgressCallback] = None,
+    content_callback: Optional[ContentCallback] = None
+) -> str:
+    """Stream a completion through azure_guard (deployment routing, quota limiter, retries, failover).
+
+    Failures are retried only until the first content delta has been handed on.
+    """
+    streamed = False
+
+    def on_content(delta: str):
+        nonlocal streamed
+        streamed = True
+        if content_callback:
+            content_callback(delta)
+
+    return await azure_guard.call(
+        kind, payload,
+        lambda deployment: _stream_chat_completion(deployment, payload, timeout, label, progress_callback, on_content),
+        can_retry=lambda: not streamed
+    )
+
+
+async def _budgeted_completion(
+    build_payload: Callable[[int], dict],
+    max_tokens: int,
+    timeout: float,
+    label: str,
+    progress_callback: Optional[ProgressCallback] = None,
+    content_callback: Optional[ContentCallback] = None,
+    kind: str = "text"
+) -> str:
+    """Run a completion whose max_tokens was sized from its input; if the answer outgrows that
+    estimate, repeat it once at TEXT_MAX_COMPLETION_TOKENS"""
     try:
-        response = httpx.post(url, headers=headers, json=payload, timeout=240.0)  # Increased timeout
-        response.raise_for_status()
-        try:
-            data = response.json()
-            extracted_content = data["choices"][0]["message"]["content"]
-            print(f"Enhanced Azure Vision API response length: {len(extracted_content)} characters")
-            return extracted_content
-        except Exception as json_error:
-            print("Raw response text:", response.text)
-            raise RuntimeError(f"Failed to parse JSON: {json_error}")
-    except httpx.HTTPStatusError as e:
-        print("Azure returned an HTTP error:", e.response.text)
-        raise RuntimeError(f"Request failed with status {e.response.status_code}: {e.response.text}")
\ No newline at end of file
+        return await _guarded_completion(
+            kind, build_payload(max_tokens), timeout, label, progress_callback, content_callback
+        )
+    except CompletionTruncatedError:
+        if max_tokens >= TEXT_MAX_COMPLETION_TOKENS:
+            raise
+        print(f"{label} outgrew max_tokens={max_tokens}, retrying with {TEXT_MAX_COMPLETION_TOKENS}")
+        # The partial-result parser already saw the cut-off answer; the retry only reports progress
+        return await _guarded_completion(
+            kind, build_payload(TEXT_MAX_COMPLETION_TOKENS), timeout, label, progress_callback
+        )
+
+
+async def extract_resume_details_with_azure_async(
+    text: str,
+    progress_callback: Optional[ProgressCallback] = None,
+    content_callback: Optional[ContentCallback] = None,
+    max_tokens: int = TEXT_MAX_COMPLETION_TOKENS
+) -> dict:
+    """Async text-based extraction over the shared pooled client, streamed for live progress"""
+    return await _budgeted_completion(
+        lambda budget: build_text_payload(text, budget), max_tokens,
+        TEXT_TIMEOUT, "Enhanced text-based parsing", progress_callback, content_callback
+    )
+
+
+async def extract_resume_details_with_azure_images_async(
+    text: str,
+    image_urls: list,
+    progress_callback: Optional[ProgressCallback] = None,
+    content_callback: Optional[ContentCallback] = None,
+    max_tokens: int = TEXT_MAX_COMPLETION_TOKENS
+) -> dict:
+    """Async extraction from document text plus embedded images (see extract_docx_images)"""
+    return await _budgeted_completion(
+        lambda budget: build_text_with_images_payload(text, image_urls, budget), max_tokens,
+        VISION_TIMEOUT, "Text with embedded images", progress_callback, content_callback, kind="vision"
+    )
+
+
+async def extract_resume_details_with_azure_vision_async(
+    image_urls: list,
+    progress_callback: Optional[ProgressCallback] = None,
+    content_callback: Optional[ContentCallback] = None,
+    page_numbers: Optional[List[int]] = None,
+    total_pages: Optional[int] = None
+) -> dict:
+    """Async vision-based extraction from encoded page data URLs (see iter_encoded_pages)"""
+    payload = build_vision_payload(
+        image_urls, progress_callback,
+        page_numbers=page_numbers,
+        total_pages=total_pages
+    )
+    return await _guarded_completion(
+        "vision", payload, VISION_TIMEOUT, "Enhanced Azure Vision API", progress_callback, content_callback
+    )
@@ -0,0 +1,467 @@
+import asyncio
+import random
+import statistics
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Iterable, List, Optional, Set
+
+import httpx
+
+from app.config import (
+    AZURE_BACKOFF_BASE_SECONDS,
+    AZURE_BACKOFF_MAX_SECONDS,
+    AZURE_BREAKER_COOLDOWN_SECONDS,
+    AZURE_BREAKER_FAILURES,
+    AZURE_IMAGE_TOKEN_ESTIMATE,
+    AZURE_MAX_RETRIES,
+    AZURE_OPENAI_DEPLOYMENTS,
+    AZURE_OPENAI_ENDPOINT,
+    AZURE_OPENAI_KEY,
+    AZURE_REQUESTS_PER_MINUTE,
+    AZURE_ROUTING_STRATEGY,
+    AZURE_TOKENS_PER_MINUTE,
+)
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class AzureHTTPError(RuntimeError):
+    """Azure answered with an error status; retry_after is the delay it asked for, in seconds"""
+
+    def __init__(self, status_code: int, body: str, retry_after: Optional[float] = None):
+        super().__init__(f"Request failed with status {status_code}: {body}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AzureUnavailableError(RuntimeError):
+    """Raised without calling Azure while every deployment serving that kind of request has its circuit open"""
+
+    def __init__(self, kind: str, retry_in: float):
+        super().__init__(f"Azure {kind} deployments are failing, circuits open for another {retry_in:.0f}s")
+        self.kind = kind
+        self.retry_in = retry_in
+
+
+def parse_retry_after(headers: httpx.Headers) -> Optional[float]:
+    """Delay from retry-after-ms (sent by Azure OpenAI) or Retry-After (seconds or an HTTP date)"""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(float(value) / 1000, 0.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_request_tokens(payload: dict) -> int:
+    """Tokens Azure's quota will charge for a chat payload: prompt text/4, a flat cost per
+    image, plus max_tokens, which Azure reserves against TPM up front"""
+    chars = 0
+    images = 0
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "image_url":
+                images += 1
+            else:
+                chars += len(part.get("text") or "")
+    return chars // 4 + images * AZURE_IMAGE_TOKEN_ESTIMATE + payload.get("max_tokens", 0)
+
+
+class TokenBucket:
+    """Refills at per_minute/60 per second up to one minute's worth; per_minute <= 0 disables it.
+
+    Waiters queue on a lock, so requests are admitted in arrival order and a large request is
+    not starved by a stream of small ones.
+    """
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller back, e.g. for a Retry-After that applies to the whole deployment"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def paused(self) -> bool:
+        return self._paused_until > time.monotonic()
+
+    async def acquire(self, amount: float) -> float:
+        """Wait until amount is available (capped at capacity) and take it; returns seconds waited"""
+        if self.per_minute <= 0:
+            return 0.0
+        amount = min(amount, self.capacity)
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                delay = self._paused_until - now
+                if delay <= 0 and self.tokens >= amount:
+                    self.tokens -= amount
+                    break
+                if delay <= 0:
+                    delay = (amount - self.tokens) * 60 / self.per_minute
+                await asyncio.sleep(delay)
+        waited = time.monotonic() - started
+        self.waited_seconds += waited
+        return waited
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures; after cooldown one probe is let through
+    (half-open) and its outcome closes or re-opens the circuit"""
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(self.cooldown - (time.monotonic() - self.opened_at), 0.0)
+
+    def available(self) -> bool:
+        """Whether a request would be let through right now (does not claim the probe)"""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._probing)
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        raise AzureUnavailableError(self.name, self.retry_in())
+
+    def release_probe(self) -> None:
+        """The probe ended without a verdict (cancelled); let the next call probe instead"""
+        self._probing = False
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            print(f"Azure {self.name} circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._probing:
+                self.times_opened += 1
+                print(f"Azure {self.name} circuit opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "retry_in_seconds": round(self.retry_in(), 1),
+        }
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, AzureHTTPError):
+        return error.status_code in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+
+# Weight of the newest response in a deployment's moving-average latency
+LATENCY_SMOOTHING = 0.2
+ROUTING_STRATEGIES = ("least_tokens", "latency")
+
+
+class Deployment:
+    """One Azure OpenAI deployment: its own quota buckets, a circuit breaker per request kind and load/latency figures"""
+
+    def __init__(
+        self,
+        name: str,
+        endpoint: str,
+        api_key: str,
+        kinds: Iterable[str],
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        breaker_failures: int,
+        breaker_cooldown: float
+    ):
+        self.name = name
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.kinds = tuple(kinds)
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        # Vision failures (large image payloads timing out) must not stop text requests
+        self.breakers = {
+            kind: CircuitBreaker(f"{name}/{kind}", breaker_failures, breaker_cooldown) for kind in self.kinds
+        }
+        self.outstanding_requests = 0
+        self.outstanding_tokens = 0
+        self.latency_ewma: Optional[float] = None
+        self._latencies = deque(maxlen=200)
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def headers(self) -> dict:
+        return {"Content-Type": "application/json", "api-key": self.api_key}
+
+    def serves(self, kind: str) -> bool:
+        return kind in self.kinds
+
+    def breaker(self, kind: str) -> CircuitBreaker:
+        return self.breakers[kind]
+
+    def paused(self) -> bool:
+        return self.requests.paused() or self.tokens.paused()
+
+    def load(self) -> float:
+        """Outstanding tokens as a share of the TPM quota (raw tokens when no quota is set)"""
+        return self.outstanding_tokens / (self.tokens.per_minute or 1)
+
+    def record_latency(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma += LATENCY_SMOOTHING * (seconds - self.latency_ewma)
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        return {
+            "kinds": list(self.kinds),
+            "circuits": {kind: breaker.stats() for kind, breaker in self.breakers.items()},
+            "outstanding_requests": self.outstanding_requests,
+            "outstanding_tokens": self.outstanding_tokens,
+            "calls": self.calls,
+            "errors": self.errors,
+            "throttled_429": self.throttled,
+            "latency_ms": {
+                "avg": round(self.latency_ewma * 1000) if self.latency_ewma is not None else None,
+                "p50": round(statistics.median(latencies) * 1000) if latencies else None,
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000) if latencies else None,
+            },
+            "limiter_wait_seconds": round(self.requests.waited_seconds + self.tokens.waited_seconds, 1),
+        }
+
+
+def load_deployments(breaker_failures: int, breaker_cooldown: float) -> List[Deployment]:
+    """Deployments from AZURE_OPENAI_DEPLOYMENTS, or the single AZURE_OPENAI_ENDPOINT one"""
+    specs = AZURE_OPENAI_DEPLOYMENTS or [{"name": "default", "endpoint": AZURE_OPENAI_ENDPOINT}]
+    deployments = []
+    for index, spec in enumerate(specs):
+        # The single-deployment fallback may be unconfigured in scripts; its calls fail on use instead
+        if AZURE_OPENAI_DEPLOYMENTS and not spec.get("endpoint"):
+            raise ValueError(f"Azure deployment {spec.get('name', index)} has no endpoint")
+        deployments.append(Deployment(
+            spec.get("name") or f"deployment-{index}",
+            spec.get("endpoint"),
+            spec.get("api_key") or AZURE_OPENAI_KEY,
+            spec.get("kinds") or ("text", "vision"),
+            int(spec.get("requests_per_minute", AZURE_REQUESTS_PER_MINUTE)),
+            int(spec.get("tokens_per_minute", AZURE_TOKENS_PER_MINUTE)),
+            breaker_failures,
+            breaker_cooldown,
+        ))
+    return deployments
+
+
+class AzureGuard:
+    """Routes every async Azure completion to a deployment, with quota limiting, retries and failover.
+
+    Each request kind ("text", "vision") goes to a deployment that serves it and whose
+    circuit is closed: the least loaded by outstanding tokens, or the fastest recently,
+    depending on strategy. A retryable failure moves the retry to another healthy
+    deployment when there is one, otherwise it backs off on the same one. Circuits are
+    kept per deployment and kind; a kind is unavailable only when every deployment
+    serving it has that kind's circuit open.
+    """
+
+    def __init__(
+        self,
+        deployments: List[Deployment],
+        strategy: str,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float
+    ):
+        if strategy not in ROUTING_STRATEGIES:
+            raise ValueError(f"Unknown Azure routing strategy {strategy!r}, expected one of {ROUTING_STRATEGIES}")
+        self.deployments = deployments
+        self.strategy = strategy
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.calls = 0
+        self.retries = 0
+        self.failovers = 0
+        self.throttled = 0
+        self.failed = 0
+
+    def _serving(self, kind: str) -> List[Deployment]:
+        serving = [deployment for deployment in self.deployments if deployment.serves(kind)]
+        if not serving:
+            raise RuntimeError(f"No Azure deployment is configured for {kind} requests")
+        return serving
+
+    def available(self, kind: str) -> bool:
+        return any(deployment.breaker(kind).available() for deployment in self._serving(kind))
+
+    def _rank(self, deployment: Deployment) -> tuple:
+        # Deployments that have never answered sort as fastest so they get measured
+        latency = deployment.latency_ewma or 0.0
+        if self.strategy == "latency":
+            return (deployment.paused(), latency, deployment.load())
+        return (deployment.paused(), deployment.load(), latency)
+
+    def pick(self, kind: str, avoid: Set[str] = frozenset()) -> Deployment:
+        """Choose a deployment for kind and claim it (a half-open circuit lets only one probe through)"""
+        serving = self._serving(kind)
+        healthy = [deployment for deployment in serving if deployment.breaker(kind).available()]
+        if not healthy:
+            raise AzureUnavailableError(kind, min(deployment.breaker(kind).retry_in() for deployment in serving))
+        candidates = [deployment for deployment in healthy if deployment.name not in avoid] or healthy
+        deployment = min(candidates, key=self._rank)
+        deployment.breaker(kind).before_call()
+        return deployment
+
+    def backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Full-jitter exponential backoff; a server-given Retry-After is a floor, plus a little jitter"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, self.backoff_base)
+        return delay
+
+    async def call(
+        self,
+        kind: str,
+        payload: dict,
+        attempt: Callable[[Deployment], Awaitable[str]],
+        can_retry: Callable[[], bool] = lambda: True
+    ) -> str:
+        """Run attempt(deployment) on the chosen deployment, retrying retryable failures.
+
+        can_retry is checked before each retry; streaming callers return False once content
+        has been passed on, since a retry would deliver it twice.
+        """
+        self.calls += 1
+        cost = estimate_request_tokens(payload)
+        retry = 0
+        failed_on: Set[str] = set()
+        while True:
+            deployment = self.pick(kind, failed_on)
+            breaker = deployment.breaker(kind)
+            deployment.calls += 1
+            deployment.outstanding_requests += 1
+            deployment.outstanding_tokens += cost
+            try:
+                await deployment.requests.acquire(1)
+                await deployment.tokens.acquire(cost)
+                started = time.monotonic()
+                result = await attempt(deployment)
+                deployment.record_latency(time.monotonic() - started)
+            except asyncio.CancelledError:
+                breaker.release_probe()
+                raise
+            except Exception as e:
+                deployment.errors += 1
+                if not is_retryable(e):
+                    # The request itself was bad (400, content filter...): the deployment is answering
+                    breaker.record_success()
+                    raise
+                retry_after = getattr(e, "retry_after", None)
+                if getattr(e, "status_code", None) == 429:
+                    # Over quota, not unhealthy: hold this deployment back and let the others take the load
+                    self.throttled += 1
+                    deployment.throttled += 1
+                    deployment.requests.pause(retry_after or self.backoff_base)
+                    deployment.tokens.pause(retry_after or self.backoff_base)
+                    breaker.release_probe()
+                else:
+                    breaker.record_failure()
+                failed_on.add(deployment.name)
+                if retry >= self.max_retries or not can_retry():
+                    self.failed += 1
+                    raise
+                retry += 1
+                self.retries += 1
+                others = [
+                    other for other in self._serving(kind)
+                    if other.name not in failed_on and other.breaker(kind).available()
+                ]
+                if others:
+                    self.failovers += 1
+                    print(f"Azure {kind} request failed on {deployment.name} ({e}), retry {retry}/{self.max_retries} on another deployment")
+                    continue
+                delay = self.backoff(retry - 1, retry_after)
+                print(f"Azure {kind} request failed on {deployment.name} ({e}), retry {retry}/{self.max_retries} in {delay:.1f}s")
+                # Every deployment has failed once; start the rotation over after the backoff
+                failed_on.clear()
+                await asyncio.sleep(delay)
+                continue
+            finally:
+                deployment.outstanding_requests -= 1
+                deployment.outstanding_tokens -= cost
+            breaker.record_success()
+            return result
+
+    def stats(self) -> dict:
+        return {
+            "strategy": self.strategy,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failovers": self.failovers,
+            "throttled_429": self.throttled,
+            "failed": self.failed,
+            "deployments": {deployment.name: deployment.stats() for deployment in self.deployments},
+        }
+
+
+azure_guard = AzureGuard(
+    load_deployments(AZURE_BREAKER_FAILURES, AZURE_BREAKER_COOLDOWN_SECONDS),
+    AZURE_ROUTING_STRATEGY,
+    AZURE_MAX_RETRIES,
+    AZURE_BACKOFF_BASE_SECONDS,
+    AZURE_BACKOFF_MAX_SECONDS,
+)
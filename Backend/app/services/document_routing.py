@@ -0,0 +1,124 @@
+import time
+from collections import Counter
+from typing import List
+
+import fitz  # PyMuPDF
+
+from app.config import (
+    ROUTING_IMAGE_COVERAGE,
+    ROUTING_MAX_GARBLED_RATIO,
+    ROUTING_MAX_VISION_RATIO,
+    ROUTING_MIN_CHAR_DENSITY,
+    ROUTING_MIN_IMAGE_AREA,
+)
+
+ROUTE_TEXT = "text"
+ROUTE_HYBRID = "hybrid"
+ROUTE_VISION = "vision"
+
+
+def _garbled_ratio(text: str) -> float:
+    """Share of characters a broken font encoding produces: U+FFFD and private-use glyphs"""
+    if not text:
+        return 0.0
+    bad = sum(1 for c in text if c == "\ufffd" or "\ue000" <= c <= "\uf8ff")
+    return bad / len(text)
+
+
+def analyze_pdf_text_layer(file_path: str) -> List[dict]:
+    """Per-page text-layer statistics: character density, garbling and image placement"""
+    pages = []
+    with fitz.open(file_path) as pdf_document:
+        for page in pdf_document:
+            rect = page.rect
+            page_area = rect.width * rect.height or 1.0
+            text = "".join(page.get_text("text").split())
+
+            images = []
+            for info in page.get_image_info(xrefs=True):
+                bbox = fitz.Rect(info["bbox"]) & rect
+                if bbox.is_empty:
+                    continue
+                images.append({"xref": info.get("xref", 0), "area": bbox.width * bbox.height / page_area})
+
+            pages.append({
+                "page": page.number,
+                "chars": len(text),
+                "char_density": len(text) / (page_area / (72 * 72)),
+                "garbled_ratio": _garbled_ratio(text),
+                "image_coverage": min(sum(image["area"] for image in images), 1.0),
+                "images": images,
+            })
+    return pages
+
+
+def _vision_reasons(page: dict, repeated_xrefs: set) -> List[str]:
+    reasons = []
+    has_images = bool(page["images"])
+    if page["char_density"] < ROUTING_MIN_CHAR_DENSITY:
+        # A blank page has nothing to read; a near-empty page with pictures is a scan or badge page
+        if has_images:
+            reasons.append("image_only")
+    elif page["garbled_ratio"] > ROUTING_MAX_GARBLED_RATIO:
+        reasons.append("garbled_text")
+
+    if page["image_coverage"] >= ROUTING_IMAGE_COVERAGE:
+        reasons.append("image_coverage")
+    elif any(
+        image["area"] >= ROUTING_MIN_IMAGE_AREA and image["xref"] not in repeated_xrefs
+        for image in page["images"]
+    ):
+        # Certification badges and logos carry text the text layer does not have
+        reasons.append("logo_images")
+    return reasons
+
+
+def route_document(file_path: str) -> dict:
+    """Decide how a PDF should be extracted.
+
+    Returns {"route", "vision_pages", "page_count", "reasons", "elapsed_ms"} where route is
+    "text" (the text layer covers everything), "hybrid" (text path plus vision for
+    vision_pages, 0-based) or "vision" (too little usable text, render every page).
+    """
+    started = time.perf_counter()
+    pages = analyze_pdf_text_layer(file_path)
+    page_count = len(pages)
+
+    # The same image on most pages is a letterhead or footer logo, not a certification
+    xref_pages = Counter(xref for page in pages for xref in {image["xref"] for image in page["images"]})
+    repeated_xrefs = {
+        xref for xref, count in xref_pages.items()
+        if xref and page_count > 1 and count > page_count / 2
+    }
+
+    reasons = {}
+    for page in pages:
+        page_reasons = _vision_reasons(page, repeated_xrefs)
+        if page_reasons:
+            reasons[page["page"]] = page_reasons
+    vision_pages = sorted(reasons)
+    text_pages = [
+        page for page in pages
+        if page["char_density"] >= ROUTING_MIN_CHAR_DENSITY and page["garbled_ratio"] <= ROUTING_MAX_GARBLED_RATIO
+    ]
+
+    if not vision_pages:
+        route = ROUTE_TEXT
+    elif not text_pages or len(vision_pages) > page_count * ROUTING_MAX_VISION_RATIO:
+        route = ROUTE_VISION
+        vision_pages = list(range(page_count))
+    else:
+        route = ROUTE_HYBRID
+
+    return {
+        "route": route,
+        "vision_pages": vision_pages,
+        "page_count": page_count,
+        "reasons": reasons,
+        "elapsed_ms": int((time.perf_counter() - started) * 1000),
+    }
+
+
+def format_route(routing: dict) -> str:
+    """Compact routing summary appended to ResumeHistory.processing_method, e.g. hybrid:2/5p:14ms"""
+    return f"{routing['route']}:{len(routing['vision_pages'])}/{routing['page_count']}p:{routing['elapsed_ms']}ms"
@@ -0,0 +1,254 @@
+import os
+import pathlib
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from typing import Optional
+
+from app.config import (
+    LIBREOFFICE_BINARY,
+    LIBREOFFICE_QUEUE_TIMEOUT_SECONDS,
+    LIBREOFFICE_TIMEOUT_SECONDS,
+    LIBREOFFICE_WORKERS,
+)
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    HAS_UNO = True
+except ImportError:
+    HAS_UNO = False
+
+
+def unique_pdf_path(docx_path: str) -> str:
+    """Per-conversion output path; concurrent uploads of the same file name must not collide"""
+    base_name = os.path.splitext(os.path.basename(docx_path))[0]
+    return os.path.join(tempfile.gettempdir(), f"{base_name}_{uuid.uuid4().hex}_converted.pdf")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _property(name: str, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+class _OfficeWorker:
+    """One LibreOffice profile, plus a long-lived soffice process when UNO is available.
+
+    Without UNO every conversion is still a `soffice --convert-to` run, but against this
+    worker's own warm profile, so it skips first-run profile creation and never shares
+    the profile lock with a concurrent conversion.
+    """
+
+    def __init__(self, index: int, binary: str):
+        self.index = index
+        self.binary = binary
+        self.profile_dir = os.path.join(tempfile.gettempdir(), f"resume_lo_profile_{os.getpid()}_{index}")
+        self.process: Optional[subprocess.Popen] = None
+        self.desktop = None
+        self.port = None
+
+    @property
+    def profile_url(self) -> str:
+        return pathlib.Path(self.profile_dir).as_uri()
+
+    def start(self, timeout: float) -> None:
+        self.port = _free_port()
+        self.process = subprocess.Popen(
+            [
+                self.binary, "--headless", "--invisible", "--nologo", "--norestore", "--nodefault",
+                f"-env:UserInstallation={self.profile_url}",
+                f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                context = resolver.resolve(
+                    f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+                )
+                break
+            except Exception:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError("LibreOffice did not start listening in time")
+                time.sleep(0.25)
+        self.desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+        print(f"LibreOffice worker {self.index} listening on port {self.port}")
+
+    def convert(self, docx_path: str, pdf_path: str, timeout: float) -> None:
+        if HAS_UNO:
+            self._convert_uno(docx_path, pdf_path, timeout)
+        else:
+            self._convert_subprocess(docx_path, pdf_path, timeout)
+
+    def _convert_uno(self, docx_path: str, pdf_path: str, timeout: float) -> None:
+        if self.desktop is None or self.process is None or self.process.poll() is not None:
+            self.start(timeout)
+        # A hung document blocks the UNO call; killing soffice makes it raise
+        watchdog = threading.Timer(timeout, self.stop)
+        watchdog.start()
+        try:
+            document = self.desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(docx_path)), "_blank", 0,
+                (_property("Hidden", True), _property("ReadOnly", True)),
+            )
+            try:
+                document.storeToURL(
+                    uno.systemPathToFileUrl(os.path.abspath(pdf_path)),
+                    (_property("FilterName", "writer_pdf_Export"),),
+                )
+            finally:
+                document.close(True)
+        finally:
+            watchdog.cancel()
+
+    def _convert_subprocess(self, docx_path: str, pdf_path: str, timeout: float) -> None:
+        # --convert-to names its output after the input, so each run gets its own directory
+        out_dir = tempfile.mkdtemp(prefix="resume_lo_out_")
+        try:
+            result = subprocess.run(
+                [
+                    self.binary, "--headless", "--norestore",
+                    f"-env:UserInstallation={self.profile_url}",
+                    "--convert-to", "pdf", "--outdir", out_dir, docx_path,
+                ],
+                capture_output=True, text=True, timeout=timeout,
+            )
+            produced = os.path.join(out_dir, os.path.splitext(os.path.basename(docx_path))[0] + ".pdf")
+            if result.returncode != 0 or not os.path.exists(produced):
+                raise RuntimeError(f"LibreOffice conversion failed: {result.stderr.strip()}")
+            shutil.move(produced, pdf_path)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def stop(self) -> None:
+        self.desktop = None
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+        self.process = None
+
+
+class DocxConversionService:
+    """Pool of LibreOffice workers shared by every DOCX->PDF conversion in the process.
+
+    Callers block in convert() until a worker is free (up to queue_timeout); each conversion
+    writes to a unique path and is killed after `timeout`, after which its worker restarts.
+    """
+
+    def __init__(self, workers: int, binary: str, timeout: float, queue_timeout: float):
+        self.size = max(1, workers)
+        self.binary = binary or shutil.which("soffice") or shutil.which("libreoffice")
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self._idle: "queue.Queue[_OfficeWorker]" = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.conversions = 0
+        self.failures = 0
+        self._total_seconds = 0.0
+
+    def available(self) -> bool:
+        return bool(self.binary)
+
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            if self._workers:
+                return
+            for index in range(self.size):
+                worker = _OfficeWorker(index, self.binary)
+                self._workers.append(worker)
+                self._idle.put(worker)
+            print(f"DOCX conversion service: {self.size} LibreOffice workers "
+                  f"({'UNO' if HAS_UNO else 'per-call soffice with dedicated profiles'})")
+
+    def convert(self, docx_path: str) -> str:
+        """Convert docx_path to a PDF at a unique temp path and return that path"""
+        if not self.available():
+            raise RuntimeError("LibreOffice not found in system PATH")
+        self._ensure_workers()
+
+        with self._lock:
+            self.waiting += 1
+        try:
+            worker = self._idle.get(timeout=self.queue_timeout)
+        except queue.Empty:
+            raise RuntimeError(f"No LibreOffice worker free after {self.queue_timeout}s")
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        pdf_path = unique_pdf_path(docx_path)
+        started = time.perf_counter()
+        try:
+            worker.convert(docx_path, pdf_path, self.timeout)
+            if not os.path.exists(pdf_path) or os.path.getsize(pdf_path) == 0:
+                raise RuntimeError("PDF file was not created or is empty")
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.conversions += 1
+                self._total_seconds += elapsed
+            print(f"LibreOffice worker {worker.index} converted {os.path.basename(docx_path)} in {elapsed:.2f}s")
+            return pdf_path
+        except subprocess.TimeoutExpired:
+            self._record_failure(worker, pdf_path)
+            raise RuntimeError(f"LibreOffice conversion timed out after {self.timeout}s")
+        except Exception:
+            self._record_failure(worker, pdf_path)
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def _record_failure(self, worker: _OfficeWorker, pdf_path: str) -> None:
+        with self._lock:
+            self.failures += 1
+        worker.stop()  # restarted on its next conversion
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+
+    def stats(self) -> dict:
+        return {
+            "available": self.available(),
+            "mode": "uno" if HAS_UNO else "subprocess",
+            "workers": self.size,
+            "idle": self._idle.qsize() if self._workers else self.size,
+            "waiting": self.waiting,
+            "conversions": self.conversions,
+            "failures": self.failures,
+            "avg_seconds": self._total_seconds / self.conversions if self.conversions else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for worker in self._workers:
+                worker.stop()
+                shutil.rmtree(worker.profile_dir, ignore_errors=True)
+            self._workers = []
+            self._idle = queue.Queue()
+
+
+docx_converter = DocxConversionService(
+    LIBREOFFICE_WORKERS, LIBREOFFICE_BINARY, LIBREOFFICE_TIMEOUT_SECONDS, LIBREOFFICE_QUEUE_TIMEOUT_SECONDS
+)
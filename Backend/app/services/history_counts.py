@@ -0,0 +1,65 @@
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import HistoryCount, ResumeHistory
+
+ALL_SCOPE = "all"
+
+# INSERT ... ON CONFLICT DO UPDATE for each supported database (see database.to_async_url)
+UPSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+def user_scope(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def count_deltas(user_ids: Iterable[Optional[str]], sign: int = 1) -> Dict[str, int]:
+    """Counter changes for rows with these user_ids being inserted (sign=1) or deleted (sign=-1)"""
+    deltas = Counter()
+    for user_id in user_ids:
+        deltas[ALL_SCOPE] += sign
+        if user_id:
+            deltas[user_scope(user_id)] += sign
+    return dict(deltas)
+
+
+async def apply_count_deltas(db: AsyncSession, deltas: Dict[str, int]) -> None:
+    """Adjust the counters inside the caller's transaction, so they commit with the rows they count.
+
+    Each counter is one upsert, so concurrent writers creating the same scope cannot both
+    insert it. Scopes are taken in a fixed order so two transactions never lock them crosswise.
+    """
+    insert = UPSERTS[db.get_bind().dialect.name]
+    for scope, delta in sorted(deltas.items()):
+        statement = insert(HistoryCount).values(scope=scope, count=max(delta, 0))
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[HistoryCount.scope], set_={"count": HistoryCount.count + delta}
+        ))
+
+
+async def get_history_count(db: AsyncSession, user_id: Optional[str] = None) -> int:
+    scope = user_scope(user_id) if user_id else ALL_SCOPE
+    return await db.scalar(select(HistoryCount.count).where(HistoryCount.scope == scope)) or 0
+
+
+def rebuild_history_counts(connection) -> None:
+    """Recount resume_history into the counter table (one full scan); run at start-up when it is empty"""
+    rows = connection.execute(
+        select(ResumeHistory.user_id, func.count()).group_by(ResumeHistory.user_id)
+    ).all()
+    counts = Counter()
+    for user_id, count in rows:
+        counts[ALL_SCOPE] += count
+        if user_id:
+            counts[user_scope(user_id)] += count
+    counts.setdefault(ALL_SCOPE, 0)
+    connection.execute(HistoryCount.__table__.delete())
+    connection.execute(
+        HistoryCount.__table__.insert(),
+        [{"scope": scope, "count": count} for scope, count in counts.items()]
+    )
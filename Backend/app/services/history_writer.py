@@ -0,0 +1,146 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+
+from app.config import HISTORY_BATCH_SIZE, HISTORY_FLUSH_INTERVAL_MS
+from app.database import AsyncSessionLocal
+from app.models import ResumeHistory, ResumeImportKey
+from app.services.history_counts import apply_count_deltas, count_deltas
+from app.services.resume_search import index_resumes
+
+
+class HistoryWriter:
+    """Group-commits ResumeHistory inserts from background jobs.
+
+    Jobs never share a session: save() queues the row and waits, and a single writer task
+    inserts everything that arrived within flush_interval (up to batch_size rows) in one
+    short-lived session and one transaction. Batch uploads finishing together therefore
+    cost one SQLite write lock instead of one per file.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.rows_written = 0
+        self.commits = 0
+
+    async def start(self) -> None:
+        if self._task:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name="history-writer")
+
+    async def stop(self) -> None:
+        """Flush whatever is queued, then stop the writer task"""
+        if not self._task:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def save(self, fields: dict, import_key: Optional[str] = None) -> int:
+        """Insert one ResumeHistory row and return its id once the group holding it commits.
+
+        import_key is stored in the same transaction; find_imported() looks it up on a rerun.
+        """
+        if not self._task:
+            # Not running inside the app (scripts, tests): write directly
+            return (await _insert_rows([(fields, import_key)]))[0]
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(((fields, import_key), future))
+        return await future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            pending: List[Tuple[Tuple[dict, Optional[str]], asyncio.Future]] = [item]
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(pending) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                pending.append(item)
+            await self._flush(pending)
+
+    async def _flush(self, pending: List[Tuple[Tuple[dict, Optional[str]], asyncio.Future]]) -> None:
+        try:
+            ids = await _insert_rows([row for row, _ in pending])
+        except Exception as e:
+            if len(pending) == 1:
+                print(f"History insert failed: {e}")
+                if not pending[0][1].done():
+                    pending[0][1].set_exception(e)
+                return
+            # One bad row must not lose the rest of the group
+            print(f"History group commit of {len(pending)} rows failed, retrying one by one: {e}")
+            for item in pending:
+                await self._flush([item])
+            return
+        self.rows_written += len(ids)
+        self.commits += 1
+        for (_, future), row_id in zip(pending, ids):
+            if not future.done():
+                future.set_result(row_id)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "rows_written": self.rows_written,
+            "commits": self.commits,
+            "avg_rows_per_commit": self.rows_written / self.commits if self.commits else 0.0,
+        }
+
+
+async def _insert_rows(rows: List[Tuple[dict, Optional[str]]]) -> List[int]:
+    async with AsyncSessionLocal() as db:
+        records = [ResumeHistory(**fields) for fields, _ in rows]
+        db.add_all(records)
+        await db.flush()
+        ids = [record.id for record in records]
+        db.add_all([
+            ResumeImportKey(key=import_key, history_id=row_id)
+            for (_, import_key), row_id in zip(rows, ids)
+            if import_key
+        ])
+        await apply_count_deltas(db, count_deltas(fields.get("user_id") for fields, _ in rows))
+        await index_resumes(db, [
+            (record.id, fields["resume_data"])
+            for record, (fields, _) in zip(records, rows)
+            if fields.get("status", "completed") == "completed"
+        ])
+        await db.commit()
+        return ids
+
+
+async def find_imported(keys: List[str]) -> Dict[str, int]:
+    """History ids already saved under these import keys"""
+    found = {}
+    async with AsyncSessionLocal() as db:
+        for start in range(0, len(keys), 500):
+            result = await db.execute(
+                select(ResumeImportKey.key, ResumeImportKey.history_id)
+                .where(ResumeImportKey.key.in_(keys[start:start + 500]))
+            )
+            found.update(result.all())
+    return found
+
+
+async def forget_imports(db, history_ids: List[int]) -> None:
+    """Drop the import keys of deleted history rows, so a reused id is never mistaken for an import"""
+    await db.execute(delete(ResumeImportKey).where(ResumeImportKey.history_id.in_(history_ids)))
+
+
+history_writer = HistoryWriter(HISTORY_BATCH_SIZE, HISTORY_FLUSH_INTERVAL_MS / 1000)
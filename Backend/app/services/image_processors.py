@@ -2,53 +2,207 @@ import fitz  # PyMuPDF
 from PIL import Image
 import io
 import base64
+import hashlib
+import multiprocessing
+import re
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional
+from app.config import (
+    DOCX_MAX_IMAGES,
+    DOCX_MIN_IMAGE_SIDE,
+    RENDER_MAX_INFLIGHT,
+    RENDER_WORKERS,
+    VISION_IMAGE_FORMAT,
+    VISION_IMAGE_QUALITY,
+    VISION_MAX_LONG_SIDE,
+    VISION_MAX_SHORT_SIDE,
+)
 
+IMAGE_MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
 
-def convert_pdf_to_images(file_path: str, dpi: int = 300) -> list:
-    """Convert PDF to a list of PIL Images using PyMuPDF (fitz) with enhanced quality"""
+# Raster formats PIL can open from a DOCX package's word/media folder
+DOCX_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".webp")
+
+# Shared across jobs; created on first multi-page render and shut down with the app
+_render_pool: Optional[ProcessPoolExecutor] = None
+# First renders arrive together from asyncio.to_thread workers; only one of them may build the pool
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            # spawn: forking a process that runs the event loop and worker threads can copy held locks
+            _render_pool = ProcessPoolExecutor(
+                max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _render_pool
+
+
+def shutdown_render_pool() -> None:
+    global _render_pool
+    with _render_pool_lock:
+        pool, _render_pool = _render_pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def budget_zoom(width: float, height: float, max_short_side: int = VISION_MAX_SHORT_SIDE,
+                max_long_side: int = VISION_MAX_LONG_SIDE) -> float:
+    """Zoom that renders a page (in points) no larger than the vision model's high-detail input.
+
+    Azure fits high-detail images into a max_long_side square and then scales the shortest
+    side down to max_short_side, so pixels beyond that are discarded server-side.
+    """
+    return min(max_short_side / min(width, height), max_long_side / max(width, height))
+
+
+def _render_page(file_path: str, page_num: int, zoom: Optional[float]) -> tuple:
+    """Render one page in a pool worker; the worker opens the PDF itself so only raw pixels cross processes
+
+    A zoom of None renders at the payload-budget size for that page.
+    """
+    with fitz.open(file_path) as pdf_document:
+        page = pdf_document.load_page(page_num)
+        if zoom is None:
+            zoom = budget_zoom(page.rect.width, page.rect.height)
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return pixmap.width, pixmap.height, pixmap.samples
+
+
+def _render_encoded_page(file_path: str, page_num: int, zoom: Optional[float],
+                         image_format: str, quality: int) -> str:
+    """Render and encode one page in a pool worker, returning a data URL.
+
+    The pixmap and PIL image are freed before returning, so only the compressed
+    page crosses back to the parent process.
+    """
+    width, height, samples = _render_page(file_path, page_num, zoom)
+    img = Image.frombytes("RGB", [width, height], samples)
+    del samples
+    base64_image, mime_type = encode_image(img, image_format, quality)
+    img.close()
+    return f"data:{mime_type};base64,{base64_image}"
+
+
+def _iter_pages(render_fn: Callable, file_path: str, page_nums: List[int], *args) -> Iterator:
+    """Yield render_fn results in page order, rendering in parallel with a cap on in-flight pages"""
+    if len(page_nums) <= 1 or RENDER_WORKERS <= 1:
+        for page_num in page_nums:
+            yield render_fn(file_path, page_num, *args)
+        return
+
+    pool = get_render_pool()
+    in_flight = deque()
+    next_index = 0
     try:
-        # Open the PDF
-        pdf_document = fitz.open(file_path)
-        images = []
-        
-        # Get number of pages
-        page_count = len(pdf_document)
-        print(f"PDF has {page_count} pages - converting all pages to high-quality images for certification detection")
-        
-        # Convert each page to an image with higher quality for better text recognition
-        for page_num in range(page_count):
-            page = pdf_document.load_page(page_num)
-            
-            # Set the rendering matrix for higher quality - increased DPI for better logo/certification recognition
-            zoom = max(dpi / 72, 4.0)  # Minimum 4x zoom for better image quality
-            matrix = fitz.Matrix(zoom, zoom)
-            
-            # Render page to a pixmap (image) with enhanced settings
-            pixmap = page.get_pixmap(matrix=matrix, alpha=False)
-            
-            # Convert pixmap to PIL Image
-            img = Image.frombytes("RGB", [pixmap.width, pixmap.height], pixmap.samples)
-            
-            # Enhance image quality for better OCR
-            img = img.convert('RGB')
-            images.append(img)
-            
-            print(f"Converted page {page_num + 1}/{page_count} to high-quality image: {img.width}x{img.height}")
-        
-        # Close the document
-        pdf_document.close()
-        
-        print(f"Successfully converted all {page_count} pages to enhanced images for certification detection")
-        return images
-    except Exception as e:
-        print(f"Error converting PDF to images with PyMuPDF: {str(e)}")
-        raise
-
-
-def image_to_base64(image) -> str:
-    """Convert PIL Image to base64 string with optimized quality"""
+        while next_index < len(page_nums) or in_flight:
+            while next_index < len(page_nums) and len(in_flight) < RENDER_MAX_INFLIGHT:
+                in_flight.append(pool.submit(render_fn, file_path, page_nums[next_index], *args))
+                next_index += 1
+            yield in_flight.popleft().result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def iter_encoded_pages(
+    file_path: str,
+    dpi: int = 300,
+    payload_budget: bool = False,
+    image_format: str = VISION_IMAGE_FORMAT,
+    quality: int = VISION_IMAGE_QUALITY,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    page_nums: Optional[List[int]] = None
+) -> Iterator[str]:
+    """Yield each PDF page as an encoded image data URL, in page order.
+
+    No PIL images are kept: every page is rendered, encoded and freed before the next is
+    produced, so callers only ever hold the encoded payload.
+    page_nums (0-based) limits rendering to those pages.
+    """
+    if page_nums is None:
+        with fitz.open(file_path) as pdf_document:
+            page_nums = list(range(len(pdf_document)))
+    zoom = None if payload_budget else max(dpi / 72, 4.0)
+    print(f"Streaming {len(page_nums)} pages as {image_format} for vision analysis")
+    pages = _iter_pages(_render_encoded_page, file_path, page_nums, zoom, image_format, quality)
+    for done, image_url in enumerate(pages, 1):
+        if progress_callback:
+            progress_callback(done, len(page_nums))
+        yield image_url
+
+
+def extract_docx_images(
+    file_path: str,
+    min_side: int = DOCX_MIN_IMAGE_SIDE,
+    max_images: int = DOCX_MAX_IMAGES,
+    image_format: str = VISION_IMAGE_FORMAT,
+    quality: int = VISION_IMAGE_QUALITY
+) -> List[str]:
+    """Encode the raster images embedded in a DOCX package (word/media) as data URLs.
+
+    Icons below min_side and repeated copies of the same image are skipped; images are
+    scaled down to the vision input budget. Vector formats (EMF/WMF) are not decodable here.
+    """
+    image_urls = []
+    seen = set()
+    with zipfile.ZipFile(file_path) as package:
+        names = sorted(
+            (name for name in package.namelist()
+             if name.startswith("word/media/") and name.lower().endswith(DOCX_IMAGE_EXTENSIONS)),
+            key=lambda name: [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+        )
+        for name in names:
+            data = package.read(name)
+            digest = hashlib.sha1(data).hexdigest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            try:
+                image = Image.open(io.BytesIO(data))
+                image.load()
+            except Exception as e:
+                print(f"Skipping unreadable DOCX image {name}: {str(e)}")
+                continue
+            if min(image.size) < min_side:
+                continue
+
+            if image.mode in ("RGBA", "LA", "P"):
+                # Logos are often transparent; flatten onto white so JPEG keeps them legible
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, "white")
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+            scale = budget_zoom(image.width, image.height)
+            if scale < 1:
+                image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))), Image.LANCZOS)
+
+            img_str, mime = encode_image(image, image_format, quality)
+            image_urls.append(f"data:{mime};base64,{img_str}")
+            if len(image_urls) >= max_images:
+                print(f"DOCX has more than {max_images} images, sending the first {max_images}")
+                break
+    print(f"Extracted {len(image_urls)} embedded images from DOCX")
+    return image_urls
+
+
+def encode_image(image, image_format: str = VISION_IMAGE_FORMAT, quality: int = VISION_IMAGE_QUALITY) -> tuple:
+    """Encode a PIL Image for a vision payload; returns (base64 string, mime type)"""
     buffer = io.BytesIO()
-    # Save with high quality for better text recognition
-    image.save(buffer, format='PNG', optimize=True)
+    if image_format == "jpeg":
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    elif image_format == "webp":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    elif image_format == "png":
+        image.save(buffer, format="PNG", optimize=True)
+    else:
+        raise ValueError(f"Unsupported vision image format: {image_format}")
     img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    return img_str
\ No newline at end of file
+    return img_str, IMAGE_MIME_TYPES[image_format]
@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+import math
+import time
+import traceback
+from typing import Awaitable, Callable, Optional
+
+from app.config import (
+    JOB_CPU_CONCURRENCY,
+    JOB_IO_CONCURRENCY,
+    JOB_MAX_QUEUE,
+    JOB_WORKERS,
+)
+
+# Lower value is served first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be queued; retry_after is a suggested delay in seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    """Bounded priority queue drained by a fixed pool of asyncio workers.
+
+    Jobs are coroutine functions. Inside a job, CPU-heavy stages (rendering, DOCX
+    conversion, text extraction) are wrapped in ``cpu_stage()`` and Azure calls in
+    ``io_stage()`` so each kind of work has its own concurrency limit. The queue lives in
+    memory only: a job's ``on_abandon`` callback is called with its args when stop()
+    cancels it mid-run or drops it from the queue, so its owner can record that it never finished.
+    """
+
+    def __init__(self, max_queue: int, workers: int, cpu_limit: int, io_limit: int):
+        self.max_queue = max_queue
+        self.workers = workers
+        self.cpu_limit = cpu_limit
+        self.io_limit = io_limit
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._worker_tasks = []
+        self._abandoned = []
+        self._cpu = asyncio.Semaphore(cpu_limit)
+        self._io = asyncio.Semaphore(io_limit)
+        self._seq = itertools.count()
+        self.running = 0
+        self.cpu_in_use = 0
+        self.io_in_use = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+
+    async def start(self) -> None:
+        if self._worker_tasks:
+            return
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_queue)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        print(f"Job scheduler started: {self.workers} workers, queue {self.max_queue}, "
+              f"cpu limit {self.cpu_limit}, io limit {self.io_limit}")
+
+    async def stop(self) -> None:
+        """Cancel running jobs, drop queued ones, and call on_abandon for each of them"""
+        for worker in self._worker_tasks:
+            worker.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        abandoned, self._abandoned = self._abandoned, []
+        while self._queue is not None and not self._queue.empty():
+            _, _, _, _, args, on_abandon = self._queue.get_nowait()
+            abandoned.append((on_abandon, args))
+        for on_abandon, args in abandoned:
+            if on_abandon is None:
+                continue
+            try:
+                on_abandon(*args)
+            except Exception:
+                traceback.print_exc()
+        if abandoned:
+            print(f"Job scheduler stopped: {len(abandoned)} unfinished jobs abandoned")
+
+    def free_slots(self) -> int:
+        depth = self._queue.qsize() if self._queue else 0
+        return self.max_queue - depth
+
+    def retry_after(self) -> int:
+        """Estimate how long until a queue slot frees up, from the average job run time"""
+        avg_run = self._total_run / self.completed if self.completed else 30.0
+        depth = self._queue.qsize() if self._queue else 0
+        return max(1, math.ceil(avg_run * max(depth, 1) / self.workers))
+
+    def ensure_capacity(self, count: int = 1) -> None:
+        """Raise QueueFullError unless `count` more jobs fit in the queue"""
+        if self._queue is None:
+            raise RuntimeError("Job scheduler is not running")
+        if self.free_slots() < count:
+            self.rejected += count
+            raise QueueFullError(self.retry_after())
+
+    def submit(
+        self,
+        job: Callable[..., Awaitable],
+        *args,
+        priority: str = "normal",
+        on_abandon: Optional[Callable[..., None]] = None
+    ) -> None:
+        self.ensure_capacity()
+        self._queue.put_nowait((PRIORITIES[priority], next(self._seq), time.monotonic(), job, args, on_abandon))
+        self.submitted += 1
+
+    def cpu_stage(self):
+        return _TrackedSemaphore(self, self._cpu, "cpu_in_use")
+
+    def io_stage(self):
+        return _TrackedSemaphore(self, self._io, "io_in_use")
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            _, _, queued_at, job, args, on_abandon = await self._queue.get()
+            started = time.monotonic()
+            self._total_wait += started - queued_at
+            self.running += 1
+            try:
+                await job(*args)
+                self.completed += 1
+            except asyncio.CancelledError:
+                self._abandoned.append((on_abandon, args))
+                raise
+            except Exception:
+                self.failed += 1
+                traceback.print_exc()
+            finally:
+                self.running -= 1
+                self._total_run += time.monotonic() - started
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "workers": self.workers,
+            "cpu_in_use": self.cpu_in_use,
+            "cpu_limit": self.cpu_limit,
+            "io_in_use": self.io_in_use,
+            "io_limit": self.io_limit,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_wait_seconds": self._total_wait / finished if finished else 0.0,
+            "avg_run_seconds": self._total_run / finished if finished else 0.0,
+        }
+
+
+class _TrackedSemaphore:
+    """Async context manager around a stage semaphore that keeps the in-use gauge current"""
+
+    def __init__(self, scheduler: JobScheduler, semaphore: asyncio.Semaphore, gauge: str):
+        self._scheduler = scheduler
+        self._semaphore = semaphore
+        self._gauge = gauge
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        setattr(self._scheduler, self._gauge, getattr(self._scheduler, self._gauge) + 1)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        setattr(self._scheduler, self._gauge, getattr(self._scheduler, self._gauge) - 1)
+        self._semaphore.release()
+
+
+scheduler = JobScheduler(JOB_MAX_QUEUE, JOB_WORKERS, JOB_CPU_CONCURRENCY, JOB_IO_CONCURRENCY)
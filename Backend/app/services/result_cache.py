@@ -0,0 +1,146 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from app.config import (
+    RESULT_CACHE_ENABLED,
+    RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_PATH,
+    RESULT_CACHE_TTL_SECONDS,
+)
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(content_hash: str, mode: str, prompt_version: str) -> str:
+    """Build the cache key from the file hash, processing mode (vision/text) and prompt version"""
+    return f"{content_hash}:{mode}:{prompt_version}"
+
+
+class ResultCache:
+    """Persistent SQLite cache of parsed resume JSON with a size bound and LRU/TTL eviction"""
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache ("
+                " key TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_accessed REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_result_cache_last_accessed"
+                " ON result_cache (last_accessed)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT data, created_at FROM result_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            data, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+                conn.commit()
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            conn.execute(
+                "UPDATE result_cache SET last_accessed = ? WHERE key = ?", (now, key)
+            )
+            conn.commit()
+            self.hits += 1
+        return json.loads(data)
+
+    def put(self, key: str, data: dict) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO result_cache (key, data, created_at, last_accessed)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(data), now, now),
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then the least recently used ones beyond max_entries"""
+        if self.ttl_seconds:
+            cursor = conn.execute(
+                "DELETE FROM result_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+            self.evictions += cursor.rowcount
+
+        (count,) = conn.execute("SELECT COUNT(*) FROM result_cache").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            cursor = conn.execute(
+                "DELETE FROM result_cache WHERE key IN ("
+                " SELECT key FROM result_cache ORDER BY last_accessed ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM result_cache")
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._connect().execute("SELECT COUNT(*) FROM result_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": RESULT_CACHE_ENABLED,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+result_cache = ResultCache(RESULT_CACHE_PATH, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL_SECONDS)
@@ -0,0 +1,97 @@
+import json
+import re
+from typing import List
+
+SCALAR_FIELDS = ("name", "email", "mobile", "professional_experience")
+
+
+def _normalize(value) -> str:
+    """Comparison key for de-duplication: case-folded, whitespace-collapsed JSON/text"""
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True)
+    return re.sub(r"\s+", " ", value).strip().casefold()
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _merge_unique(lists: List[list]) -> list:
+    merged, seen = [], set()
+    for items in lists:
+        for item in items or []:
+            key = _normalize(item)
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(item)
+    return merged
+
+
+def merge_skills(skill_lists: List[list]) -> list:
+    """Merge [{category: [skills]}] lists, joining categories case-insensitively"""
+    categories = {}
+    order = []
+    for skills in skill_lists:
+        for group in skills or []:
+            if not isinstance(group, dict):
+                continue
+            for category, values in group.items():
+                key = _normalize(category)
+                if key not in categories:
+                    categories[key] = (category, [])
+                    order.append(key)
+                values = values if isinstance(values, list) else [values]
+                categories[key][1].append(values)
+    return [
+        {categories[key][0]: _merge_unique(categories[key][1])}
+        for key in order
+    ]
+
+
+def _experience_key(entry: dict) -> tuple:
+    return tuple(_normalize(entry.get(field) or "") for field in ("company", "role", "startDate"))
+
+
+def merge_experience(experience_lists: List[list]) -> list:
+    """Concatenate experience entries in page order, folding duplicates of the same job together.
+
+    A table row split across a page boundary can come back from both chunks; the copies are
+    merged field by field and their responsibilities unioned.
+    """
+    merged = []
+    index = {}
+    for entries in experience_lists:
+        for entry in entries or []:
+            if not isinstance(entry, dict):
+                continue
+            key = _experience_key(entry)
+            if key not in index or not any(key):
+                index[key] = len(merged)
+                merged.append(dict(entry))
+                continue
+            existing = merged[index[key]]
+            for field, value in entry.items():
+                if field == "responsibilities":
+                    existing[field] = _merge_unique([existing.get(field) or [], value or []])
+                elif _is_empty(existing.get(field)):
+                    existing[field] = value
+    return merged
+
+
+def merge_resume_results(results: List[dict]) -> dict:
+    """Reduce per-chunk extraction results (in page order) into one resume"""
+    merged = {}
+    for field in SCALAR_FIELDS:
+        merged[field] = next((r[field] for r in results if not _is_empty(r.get(field))), "")
+
+    merged["skills"] = merge_skills([r.get("skills") for r in results])
+    merged["education"] = _merge_unique([r.get("education") for r in results])
+    merged["certifications"] = _merge_unique([r.get("certifications") for r in results])
+    merged["experience_data"] = merge_experience([r.get("experience_data") for r in results])
+
+    # Keep any extra keys the model returned, first non-empty value wins
+    for result in results:
+        for field, value in result.items():
+            if field not in merged and not _is_empty(value):
+                merged[field] = value
+    return merged
@@ -1,22 +1,159 @@
 import json
 import re
-import PyPDF2
+import fitz  # PyMuPDF
 from docx import Document
-import subprocess
+import importlib.util
 import platform
-import tempfile
 import os
+from app.config import DOCX_CONVERTER_ORDER
+from app.services.docx_conversion import HAS_UNO, docx_converter, unique_pdf_path
+
+
+def _clean_cell(cell) -> str:
+    return " ".join((cell or "").split())
+
+
+def _inside(block_rect, table_rects) -> bool:
+    """True when most of a text block lies within one of the page's tables"""
+    area = block_rect.get_area()
+    return any(area and (block_rect & rect).get_area() / area > 0.5 for rect in table_rects)
+
+
+# A ruled table needs at least two horizontal and two vertical rulings (a box counts as both)
+MIN_TABLE_RULINGS = 2
+# Strokes thinner than this (in points) are rulings rather than boxes
+RULING_THICKNESS = 2
+
+
+def _has_grid(rects: list) -> bool:
+    horizontal = vertical = 0
+    for x0, y0, x1, y1 in rects:
+        wide, tall = x1 - x0 > RULING_THICKNESS, y1 - y0 > RULING_THICKNESS
+        if wide and tall:
+            horizontal += 2
+            vertical += 2
+        elif wide:
+            horizontal += 1
+        elif tall:
+            vertical += 1
+    return horizontal >= MIN_TABLE_RULINGS and vertical >= MIN_TABLE_RULINGS
+
+
+def _find_ruled_tables(page) -> list:
+    """Run PyMuPDF table detection only where the page has a grid of ruling lines.
+
+    find_tables' default strategy builds tables from vector lines, so pages without a grid
+    (plain text, or only section underlines) are skipped outright and the search is clipped
+    to the ruled area.
+    """
+    rects = [drawing["rect"] for drawing in page.get_cdrawings()]
+    if not _has_grid(rects):
+        return []
+    x0, y0, x1, y1 = zip(*rects)
+    clip = fitz.Rect(min(x0) - 1, min(y0) - 1, max(x1) + 1, max(y1) + 1) & page.rect
+    try:
+        return page.find_tables(clip=clip).tables
+    except Exception as e:
+        print(f"Table detection failed on page {page.number + 1}: {str(e)}")
+        return []
+
+
+def _render_table(parts: list, table_idx: int, table: dict) -> None:
+    parts.append(f"\n--- EXPERIENCE TABLE {table_idx} START ---\n")
+    parts.append("HEADERS: " + " | ".join(table["headers"]) + "\n")
+    parts.append(f"TOTAL_EXPERIENCE_ROWS: {len(table['rows'])}\n")
+    for row_idx, row_data in enumerate(table["rows"], 1):
+        parts.append(f"EXPERIENCE_ROW_{row_idx}: " + " | ".join(row_data) + "\n")
+    parts.append(f"--- EXPERIENCE TABLE {table_idx} END ---\n\n")
 
 
 def extract_text_from_pdf(file_path: str) -> str:
-    """Legacy function to extract text from PDF - kept for backward compatibility"""
-    with open(file_path, "rb") as file:
-        reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
+    """Extract text from PDF using PyMuPDF in one pass, keeping table structure
+
+    Tables found by PyMuPDF are emitted with the same EXPERIENCE TABLE / TOTAL_EXPERIENCE_ROWS /
+    EXPERIENCE_ROW_X markers as extract_text_from_docx, in reading order with the surrounding
+    text. A table continued at the top of the next page (same columns) is joined to the previous one.
+    Pages are separated by a form feed so repeated page headers/footers can be found later.
+
+    Trade-off: pages without a ruled grid cost about 2 ms, close to a plain text dump, but
+    find_tables takes roughly 50 ms on each page that has one. That is kept because the
+    table rows are what lets these resumes stay on the text path instead of falling back
+    to a vision request; see benchmarks/pdf_extraction.py.
+    """
+    try:
+        # Parts are strings, or table dicts rendered once all their rows are known
+        parts = []
+        last_table = None
+        with fitz.open(file_path) as pdf_document:
+            for page in pdf_document:
+                tables = _find_ruled_tables(page)
+                table_rects = [fitz.Rect(table.bbox) for table in tables]
+
+                items = []
+                for x0, y0, x1, y1, block_text, _, block_type in page.get_text("blocks", sort=True):
+                    if block_type != 0 or not block_text.strip():
+                        continue
+                    if _inside(fitz.Rect(x0, y0, x1, y1), table_rects):
+                        continue
+                    items.append((y0, x0, "text", block_text))
+                for table in tables:
+                    items.append((table.bbox[1], table.bbox[0], "table", table))
+                items.sort(key=lambda item: (item[0], item[1]))
+
+                for index, (_, _, kind, item) in enumerate(items):
+                    if kind == "text":
+                        parts.append(item.rstrip() + "\n")
+                        # Only a table that ends its page can continue onto the next one
+                        last_table = None
+                        continue
+
+                    rows = [[_clean_cell(cell) for cell in row] for row in item.extract()]
+                    headers = [_clean_cell(name) for name in item.header.names]
+                    if not item.header.external and rows:
+                        rows = rows[1:]
+                    rows = [[cell for cell in row if cell] for row in rows]
+                    rows = [row for row in rows if row]
+
+                    continues = (
+                        last_table is not None and index == 0
+                        and len(headers) == last_table["columns"]
+                    )
+                    if continues:
+                        # A repeated header row is dropped; otherwise the "header" is really a data row
+                        if headers != last_table["headers"]:
+                            rows.insert(0, [name for name in headers if name])
+                        last_table["rows"].extend(rows)
+                    else:
+                        last_table = {"headers": headers, "columns": len(headers), "rows": rows}
+                        parts.append(last_table)
+                parts.append("\f")
+
+        buffer = []
+        table_idx = 0
+        for part in parts:
+            if isinstance(part, dict):
+                table_idx += 1
+                _render_table(buffer, table_idx, part)
+                print(f"Extracted PDF table {table_idx}: {len(part['rows'])} rows")
+            else:
+                buffer.append(part)
+        text = "".join(buffer).strip()
+        print(f"Layout-aware PDF extraction completed: {len(text)} characters, {table_idx} tables")
         return text
 
+    except Exception as e:
+        print(f"Error extracting text from PDF: {str(e)}")
+        raise RuntimeError(f"Failed to extract text from PDF file: {str(e)}")
+
+
+def _distinct_cells(row) -> list:
+    """python-docx repeats a horizontally merged cell once per grid column it spans; keep one"""
+    cells = []
+    for cell in row.cells:
+        if not cells or cell._tc is not cells[-1]._tc:
+            cells.append(cell)
+    return cells
+
 
 def extract_text_from_docx(file_path: str) -> str:
     """Extract text from DOCX files using python-docx with enhanced table parsing"""
@@ -36,7 +173,7 @@ def extract_text_from_docx(file_path: str) -> str:
             if table.rows:
                 header_row = table.rows[0]
                 headers = []
-                for cell in header_row.cells:
+                for cell in _distinct_cells(header_row):
                     headers.append(cell.text.strip())
                 text += "HEADERS: " + " | ".join(headers) + "\n"
                 
@@ -46,7 +183,7 @@ def extract_text_from_docx(file_path: str) -> str:
                 
                 for row_idx, row in enumerate(table.rows[1:], 1):
                     row_data = []
-                    for cell in row.cells:
+                    for cell in _distinct_cells(row):
                         cell_text = cell.text.strip().replace('\n', ' ').replace('\r', ' ')
                         if cell_text:  # Only add non-empty cells
                             row_data.append(cell_text)
@@ -79,146 +216,137 @@ def extract_text_from_docx(file_path: str) -> str:
         raise RuntimeError(f"Failed to extract text from DOCX file: {str(e)}")
 
 
-def convert_docx_to_pdf(docx_path: str) -> str:
-    """Convert DOCX to PDF using Aspose.Words library with enhanced error handling"""
+def _convert_with_aspose(docx_path: str) -> str:
+    """Convert DOCX to PDF in-process using Aspose.Words"""
+    import aspose.words as aw
+
+    # Create a temporary PDF file path
+    pdf_path = unique_pdf_path(docx_path)
+
+    print(f"Converting DOCX to PDF using Aspose.Words...")
+
+    # Load the DOCX document
+    doc = aw.Document(docx_path)
+
+    # Save as PDF with high quality settings
+    pdf_save_options = aw.saving.PdfSaveOptions()
+    pdf_save_options.compliance = aw.saving.PdfCompliance.PDF17
+    pdf_save_options.image_compression = aw.saving.PdfImageCompression.JPEG
+    pdf_save_options.jpeg_quality = 90
+    pdf_save_options.text_compression = aw.saving.PdfTextCompression.FLATE
+    pdf_save_options.optimize_output = True
+
+    # Save the document as PDF
+    doc.save(pdf_path, pdf_save_options)
+
+    if os.path.exists(pdf_path) and os.path.getsize(pdf_path) > 0:
+        print(f"Successfully converted DOCX to PDF using Aspose.Words: {pdf_path}")
+        return pdf_path
+    raise Exception("PDF file was not created or is empty")
+
+
+def _convert_with_word(docx_path: str) -> str:
+    """Convert DOCX to PDF through Microsoft Word COM automation (Windows only)"""
+    import pythoncom
+    import win32com.client
+    from win32com.client import constants
+
+    pdf_path = unique_pdf_path(docx_path)
+    pythoncom.CoInitialize()
+
     try:
-        import aspose.words as aw
-        
-        # Create a temporary PDF file path
-        temp_dir = tempfile.gettempdir()
-        base_name = os.path.splitext(os.path.basename(docx_path))[0]
-        pdf_path = os.path.join(temp_dir, f"{base_name}_converted.pdf")
-        
-        print(f"Converting DOCX to PDF using Aspose.Words...")
-        
+        word_app = win32com.client.Dispatch("Word.Application")
+        word_app.Visible = False
+        word_app.DisplayAlerts = 0
+
         try:
-            # Load the DOCX document
-            doc = aw.Document(docx_path)
-            
-            # Save as PDF with high quality settings
-            pdf_save_options = aw.saving.PdfSaveOptions()
-            pdf_save_options.compliance = aw.saving.PdfCompliance.PDF17
-            pdf_save_options.image_compression = aw.saving.PdfImageCompression.JPEG
-            pdf_save_options.jpeg_quality = 90
-            pdf_save_options.text_compression = aw.saving.PdfTextCompression.FLATE
-            pdf_save_options.optimize_output = True
-            
-            # Save the document as PDF
-            doc.save(pdf_path, pdf_save_options)
-            
-            if os.path.exists(pdf_path) and os.path.getsize(pdf_path) > 0:
-                print(f"Successfully converted DOCX to PDF using Aspose.Words: {pdf_path}")
-                return pdf_path
-            else:
-                raise Exception("PDF file was not created or is empty")
-                
-        except Exception as aspose_error:
-            print(f"Aspose.Words conversion failed: {str(aspose_error)}")
-            raise Exception(f"Aspose.Words conversion error: {str(aspose_error)}")
-            
-    except ImportError:
-        print("Aspose.Words not available, trying alternative methods...")
-        
-        # Fallback to system-specific methods
-        system = platform.system().lower()
-        temp_dir = tempfile.gettempdir()
-        base_name = os.path.splitext(os.path.basename(docx_path))[0]
-        pdf_path = os.path.join(temp_dir, f"{base_name}_converted.pdf")
-        
-        if system == "windows":
-            # Try Windows COM as fallback
+            doc = word_app.Documents.Open(docx_path)
+            doc.ExportAsFixedFormat(
+                OutputFileName=pdf_path,
+                ExportFormat=constants.wdExportFormatPDF,
+                OpenAfterExport=False,
+                OptimizeFor=constants.wdExportOptimizeForMinSize,
+                Range=constants.wdExportAllDocument,
+                Item=constants.wdExportDocumentContents,
+                IncludeDocProps=True,
+                KeepIRM=True,
+                CreateBookmarks=constants.wdExportCreateNoBookmarks,
+                DocStructureTags=True,
+                BitmapMissingFonts=True,
+                UseDocumentImageResolution=False
+            )
+
+            print(f"Successfully converted DOCX to PDF using Word COM: {pdf_path}")
+            return pdf_path
+
+        finally:
             try:
-                import pythoncom
-                import win32com.client
-                from win32com.client import constants
-                
-                pythoncom.CoInitialize()
-                
-                try:
-                    word_app = win32com.client.Dispatch("Word.Application")
-                    word_app.Visible = False
-                    word_app.DisplayAlerts = 0
-                    
-                    try:
-                        doc = word_app.Documents.Open(docx_path)
-                        doc.ExportAsFixedFormat(
-                            OutputFileName=pdf_path,
-                            ExportFormat=constants.wdExportFormatPDF,
-                            OpenAfterExport=False,
-                            OptimizeFor=constants.wdExportOptimizeForMinSize,
-                            Range=constants.wdExportAllDocument,
-                            Item=constants.wdExportDocumentContents,
-                            IncludeDocProps=True,
-                            KeepIRM=True,
-                            CreateBookmarks=constants.wdExportCreateNoBookmarks,
-                            DocStructureTags=True,
-                            BitmapMissingFonts=True,
-                            UseDocumentImageResolution=False
-                        )
-                        
-                        print(f"Successfully converted DOCX to PDF using Word COM: {pdf_path}")
-                        return pdf_path
-                        
-                    finally:
-                        try:
-                            if 'doc' in locals():
-                                doc.Close(SaveChanges=False)
-                        except:
-                            pass
-                        
-                        try:
-                            word_app.Quit()
-                        except:
-                            pass
-                            
-                finally:
-                    pythoncom.CoUninitialize()
-                    
-            except ImportError:
-                print("pywin32 not available")
-                raise Exception("Neither Aspose.Words nor pywin32 are available on Windows")
-            except Exception as e:
-                print(f"Windows COM conversion failed: {str(e)}")
-                raise Exception(f"All Windows conversion methods failed: {str(e)}")
-                
-        elif system in ["darwin", "linux"]:  # macOS or Linux
+                if 'doc' in locals():
+                    doc.Close(SaveChanges=False)
+            except:
+                pass
+
             try:
-                # Check if LibreOffice is available
-                result = subprocess.run(['libreoffice', '--version'], 
-                                      capture_output=True, text=True, timeout=10)
-                if result.returncode != 0:
-                    raise Exception("LibreOffice not found")
-                
-                # Convert using LibreOffice headless mode
-                cmd = [
-                    'libreoffice',
-                    '--headless',
-                    '--convert-to', 'pdf',
-                    '--outdir', temp_dir,
-                    docx_path
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-                
-                if result.returncode == 0 and os.path.exists(pdf_path):
-                    print(f"Successfully converted DOCX to PDF using LibreOffice: {pdf_path}")
-                    return pdf_path
-                else:
-                    raise Exception(f"LibreOffice conversion failed: {result.stderr}")
-                    
-            except subprocess.TimeoutExpired:
-                raise Exception("LibreOffice conversion timed out")
-            except FileNotFoundError:
-                raise Exception("LibreOffice not found in system PATH")
-            except Exception as e:
-                print(f"LibreOffice conversion failed: {str(e)}")
-                raise Exception(f"LibreOffice conversion failed: {str(e)}")
-        else:
-            raise Exception(f"Unsupported operating system: {system}")
-            
-    except Exception as e:
-        print(f"DOCX to PDF conversion failed: {str(e)}")
-        raise RuntimeError(f"Failed to convert DOCX to PDF: {str(e)}")
+                word_app.Quit()
+            except:
+                pass
+
+    finally:
+        pythoncom.CoUninitialize()
+
+
+# name -> (available, convert); tried in docx_converter_order()
+DOCX_CONVERTERS = {
+    # Long-lived LibreOffice workers instead of a cold soffice start per upload
+    "libreoffice": (docx_converter.available, docx_converter.convert),
+    "aspose": (lambda: importlib.util.find_spec("aspose") is not None, _convert_with_aspose),
+    "word": (
+        lambda: platform.system().lower() == "windows" and importlib.util.find_spec("win32com") is not None,
+        _convert_with_word
+    ),
+}
+
+
+def docx_converter_order() -> list:
+    """Converters to try, in order, from DOCX_CONVERTER_ORDER.
+
+    "auto" puts the LibreOffice pool first when it can keep soffice running (UNO bindings
+    installed); without UNO every LibreOffice conversion is a fresh soffice process, so the
+    in-process Aspose.Words converter goes first and LibreOffice is the fallback.
+    """
+    if DOCX_CONVERTER_ORDER != "auto":
+        order = [name.strip() for name in DOCX_CONVERTER_ORDER.split(",") if name.strip()]
+        unknown = [name for name in order if name not in DOCX_CONVERTERS]
+        if unknown:
+            raise ValueError(f"Unknown DOCX converter {unknown[0]!r}, expected auto or some of {list(DOCX_CONVERTERS)}")
+        return order
+    if HAS_UNO:
+        return ["libreoffice", "aspose", "word"]
+    return ["aspose", "libreoffice", "word"]
+
+
+def convert_docx_to_pdf(docx_path: str) -> str:
+    """Convert DOCX to PDF with the first available converter, falling back to the next on failure"""
+    errors = []
+    for name in docx_converter_order():
+        available, convert = DOCX_CONVERTERS[name]
+        if not available():
+            continue
+        try:
+            return convert(docx_path)
+        except Exception as e:
+            print(f"{name} DOCX conversion failed: {str(e)}")
+            errors.append(f"{name}: {str(e)}")
+
+    if not errors:
+        print("DOCX to PDF conversion failed: no converter available")
+        raise RuntimeError(
+            f"Failed to convert DOCX to PDF: none of {', '.join(docx_converter_order())} is available"
+        )
+    print(f"DOCX to PDF conversion failed: {'; '.join(errors)}")
+    raise RuntimeError(f"Failed to convert DOCX to PDF: {'; '.join(errors)}")
+
+
 def clean_json_string(raw: str):
     # Remove triple backticks and language hint (```json)
     cleaned = re.sub(r"^```json\s*|\s*```$", "", raw.strip(), flags=re.MULTILINE)
@@ -0,0 +1,407 @@
+import asyncio
+import gc
+import os
+import time
+from typing import Callable, List, Optional
+
+import fitz  # PyMuPDF
+
+from app.config import (
+    DOCX_VISION_MODE,
+    RESULT_CACHE_ENABLED,
+    ROUTING_MODE,
+    VISION_MAP_REDUCE,
+    VISION_PAGES_PER_CHUNK,
+    VISION_RENDER_MODE,
+)
+from app.services.azure_clients import (
+    PROMPT_VERSION,
+    extract_resume_details_with_azure_async,
+    extract_resume_details_with_azure_images_async,
+    extract_resume_details_with_azure_vision_async,
+)
+from app.services.azure_resilience import azure_guard
+from app.services.document_routing import ROUTE_HYBRID, ROUTE_TEXT, format_route, route_document
+from app.services.image_processors import extract_docx_images, iter_encoded_pages
+from app.services.job_scheduler import scheduler
+from app.services.resume_parser import clean_json_string, convert_docx_to_pdf, extract_text_from_docx, extract_text_from_pdf
+from app.services.result_cache import hash_file, make_cache_key, result_cache
+from app.services.result_merge import merge_resume_results
+from app.services.stream_json import IncrementalJSONParser
+from app.services.text_budget import text_budget
+from app.services.vision_mapreduce import extract_resume_details_map_reduce
+from utils.memory import PeakRSSTracker
+
+# Streamed completions rarely need their full max_tokens; progress is scaled against this estimate
+EXPECTED_COMPLETION_TOKENS = 4000
+
+# progress(**fields) receives the stage, progress (0-100) and other task fields as the pipeline moves
+ProgressCallback = Callable[..., None]
+
+
+def _ignore_progress(**fields) -> None:
+    pass
+
+
+def azure_progress_callback(progress: ProgressCallback):
+    """Map Azure client events onto the stage progress (encode 0-30, sent 35, tokens 35-99)"""
+    last = {"progress": None}
+
+    def callback(event: str, done: int, total: int):
+        fields = {}
+        if event == "encoding":
+            fields["progress"] = int(done * 30 / total)
+        elif event == "request_sent":
+            fields["progress"] = 35
+        elif event == "tokens":
+            fields["tokens_received"] = done
+            fields["progress"] = 35 + int(64 * min(done / EXPECTED_COMPLETION_TOKENS, 1.0))
+        elif event == "chunks":
+            fields["progress"] = 35 + int(64 * done / total)
+        # Only report when the visible progress moves
+        if fields and fields["progress"] != last["progress"]:
+            last["progress"] = fields["progress"]
+            progress(**fields)
+    return callback
+
+
+def partial_result_callback(progress: ProgressCallback):
+    """Parse the streamed completion and report finished fields as partial_data"""
+    parser = IncrementalJSONParser(array_fields=("experience_data",))
+    partial = {}
+
+    def callback(delta: str):
+        events = parser.feed(delta)
+        if not events:
+            return
+        for kind, key, value in events:
+            if kind == "item":
+                partial.setdefault(key, []).append(value)
+            else:
+                partial[key] = value
+        progress(partial_data=partial)
+    return callback
+
+
+def render_progress_callback(progress: ProgressCallback, memory: Optional[PeakRSSTracker] = None):
+    def callback(done: int, total: int):
+        if memory:
+            memory.sample()
+        progress(progress=int(done * 100 / total))
+    return callback
+
+
+async def extract_with_text(
+    progress: ProgressCallback,
+    file_path: str,
+    file_extension: str,
+    include_images: bool = False
+) -> dict:
+    """Text-layer extraction followed by the streamed Azure text completion
+
+    With include_images a DOCX's embedded images go along with its text in the same request
+    (DOCX-native vision); their count is reported as docx_images.
+    """
+    progress(stage="enhanced_text_extraction_with_tables", progress=0)
+
+    print("Starting enhanced text-based extraction with comprehensive table parsing...")
+
+    image_urls = []
+    async with scheduler.cpu_stage():
+        if file_extension == '.pdf':
+            text = await asyncio.to_thread(extract_text_from_pdf, file_path)
+            print(f"Extracted {len(text)} characters from PDF")
+        elif file_extension in ['.doc', '.docx']:
+            text = await asyncio.to_thread(extract_text_from_docx, file_path)
+            print(f"Enhanced DOCX extraction: {len(text)} characters with comprehensive table parsing")
+            if include_images:
+                image_urls = await asyncio.to_thread(extract_docx_images, file_path)
+                progress(docx_images=len(image_urls))
+        else:
+            raise Exception(f"Unsupported file type: {file_extension}")
+        budget = await asyncio.to_thread(text_budget.prepare, text)
+        text = budget["text"]
+        print(f"Prompt budget: {budget['original_tokens']} -> {budget['input_tokens']} tokens "
+              f"({budget['tokenizer']}), max_tokens {budget['max_tokens']}")
+
+    progress(progress=100)
+
+    progress(stage="comprehensive_parsing_analysis", progress=0)
+
+    print("Starting comprehensive parsing with enhanced table and certification extraction...")
+
+    started = time.perf_counter()
+    async with scheduler.io_stage():
+        if image_urls:
+            extracted = await extract_resume_details_with_azure_images_async(
+                text, image_urls, azure_progress_callback(progress), partial_result_callback(progress),
+                max_tokens=budget["max_tokens"]
+            )
+        else:
+            extracted = await extract_resume_details_with_azure_async(
+                text, azure_progress_callback(progress), partial_result_callback(progress),
+                max_tokens=budget["max_tokens"]
+            )
+    progress(token_budget=text_budget.record(budget, extracted, time.perf_counter() - started))
+    parsed = clean_json_string(extracted)
+    progress(progress=100)
+
+    # Enhanced logging for verification
+    experience_data = parsed.get('experience_data', [])
+    certifications = parsed.get('certifications', [])
+    print(f"Enhanced text processing complete: {len(experience_data)} experience entries, {len(certifications)} certifications")
+
+    # Debug: Print experience entries to verify all rows were captured
+    for i, exp in enumerate(experience_data):
+        print(f"Experience {i+1}: Company={exp.get('company', 'N/A')}, Role={exp.get('role', 'N/A')}")
+
+    # Debug: Print all certifications found
+    for i, cert in enumerate(certifications):
+        print(f"Certification {i+1}: {cert}")
+    return parsed
+
+
+async def extract_with_vision(
+    progress: ProgressCallback,
+    pdf_path: str,
+    memory: Optional[PeakRSSTracker] = None,
+    page_nums: Optional[List[int]] = None,
+    report: bool = True
+) -> tuple:
+    """Render PDF pages (all, or the 0-based page_nums) and run vision extraction.
+
+    Returns (parsed, processing_method). With report=False the stage and progress are left
+    to the caller, for vision running alongside the text path.
+    """
+    if report:
+        progress(stage="high_quality_image_conversion", progress=0)
+
+    print("Converting pages to high-quality images for certification logo detection...")
+
+    # Pages are rendered, encoded and freed one at a time; only the encoded payload is kept
+    pages = iter_encoded_pages(
+        pdf_path, 400,  # Higher DPI for better text recognition
+        payload_budget=VISION_RENDER_MODE == "budget",
+        progress_callback=render_progress_callback(progress, memory) if report else None,
+        page_nums=page_nums
+    )
+    async with scheduler.cpu_stage():
+        image_urls = await asyncio.to_thread(list, pages)
+    print(f"Converted {len(image_urls)} pages to high-quality images for certification detection")
+
+    if report:
+        progress(progress=100)
+        progress(stage="comprehensive_vision_analysis", progress=0)
+
+    print("Starting comprehensive vision analysis with certification logo detection...")
+
+    async with scheduler.io_stage():
+        if page_nums is not None:
+            with fitz.open(pdf_path) as pdf_document:
+                total_pages = len(pdf_document)
+            extracted = await extract_resume_details_with_azure_vision_async(
+                image_urls,
+                page_numbers=[page_num + 1 for page_num in page_nums],
+                total_pages=total_pages
+            )
+            parsed = clean_json_string(extracted)
+            vision_method = "enhanced_vision"
+        elif VISION_MAP_REDUCE and len(image_urls) > VISION_PAGES_PER_CHUNK:
+            # Long resumes: concurrent page-group requests merged into one result
+            parsed = await extract_resume_details_map_reduce(
+                image_urls,
+                progress_callback=azure_progress_callback(progress),
+                partial_callback=lambda partial: progress(partial_data=partial)
+            )
+            vision_method = "vision_mapreduce"
+        else:
+            extracted = await extract_resume_details_with_azure_vision_async(
+                image_urls, azure_progress_callback(progress), partial_result_callback(progress)
+            )
+            parsed = clean_json_string(extracted)
+            vision_method = "enhanced_vision"
+    del image_urls
+
+    if report:
+        progress(progress=100)
+    return parsed, vision_method
+
+
+async def run_resume_pipeline(
+    file_path: str,
+    file_extension: str,
+    use_vision: bool = True,
+    content_hash: Optional[str] = None,
+    progress: ProgressCallback = _ignore_progress,
+    memory: Optional[PeakRSSTracker] = None,
+    label: Optional[str] = None
+) -> dict:
+    """Parse one resume file the way an upload is processed; the upload task and cli.ingest share it.
+
+    Covers the result cache, the degraded (vision circuits open) path, DOCX-native vision,
+    DOC/DOCX->PDF conversion, text/vision/hybrid routing and the fallbacks to the text path.
+    progress(**fields) gets the stage and progress as they move, plus routing, docx_images,
+    token_budget, tokens_received and partial_data. Returns {"data", "processing_method",
+    "content_hash"}; a cache hit has processing_method "cached".
+    """
+    label = label or os.path.basename(file_path)
+    text_path, text_extension = file_path, file_extension
+    converted_pdf_path = None
+    degraded = False
+    # Set when vision was requested but a text result is returned instead
+    fell_back = False
+
+    try:
+        # Re-uploads of an identical file are served from the result cache without touching Azure
+        if RESULT_CACHE_ENABLED:
+            # Uploads are hashed while they stream to disk; other callers fall back to reading the file
+            content_hash = content_hash or await asyncio.to_thread(hash_file, file_path)
+            # Keyed on the requested mode; routing is deterministic for the same file
+            cache_key = make_cache_key(content_hash, "vision" if use_vision else "text", PROMPT_VERSION)
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            if cached is not None:
+                print(f"Result cache hit for {label} ({cache_key})")
+                return {"data": cached, "processing_method": "cached", "content_hash": content_hash}
+
+        # While every vision deployment is failing, skip rendering and go straight to the text path
+        degraded = use_vision and not azure_guard.available("vision")
+        if degraded:
+            print(f"Azure vision circuits are open, processing {label} with the text path")
+            use_vision = False
+
+        # DOCX-native: the document's own text and embedded images replace convert-and-render
+        docx_native = file_extension == '.docx' and use_vision and DOCX_VISION_MODE == "native"
+
+        # For DOC/DOCX files, try conversion to PDF for vision processing with enhanced error handling
+        if file_extension in ['.doc', '.docx'] and use_vision and not docx_native:
+            try:
+                progress(stage="converting_docx_to_pdf_with_aspose", progress=20)
+
+                print(f"Attempting to convert {file_extension} to PDF using Aspose.Words for enhanced vision processing...")
+
+                # Force garbage collection before conversion to free memory
+                gc.collect()
+
+                async with scheduler.cpu_stage():
+                    converted_pdf_path = await asyncio.to_thread(convert_docx_to_pdf, file_path)
+
+                if os.path.exists(converted_pdf_path):
+                    file_extension = '.pdf'
+                    file_path = converted_pdf_path
+                    progress(progress=100)
+                    print(f"Successfully converted to PDF using Aspose.Words for certification detection: {converted_pdf_path}")
+                else:
+                    raise Exception("PDF file was not created")
+
+            except Exception as e:
+                print(f"DOCX to PDF conversion with Aspose.Words failed: {str(e)}")
+                print("Falling back to enhanced text-based processing for certification extraction...")
+                use_vision = False
+                fell_back = True
+                progress(progress=0)
+
+                # Force cleanup of any partial conversion attempts
+                if converted_pdf_path and os.path.exists(converted_pdf_path):
+                    try:
+                        os.remove(converted_pdf_path)
+                        converted_pdf_path = None
+                    except:
+                        pass
+
+                # Force garbage collection after failed conversion
+                gc.collect()
+
+        # Born-digital PDFs go through the cheap text path; only pages it cannot cover are rendered
+        processing_method = "text"
+        routing = None
+
+        if use_vision and file_extension == '.pdf' and ROUTING_MODE == "auto":
+            progress(stage="document_routing", progress=0)
+            async with scheduler.cpu_stage():
+                routing = await asyncio.to_thread(route_document, file_path)
+            print(f"Routing {label}: {routing['route']}, vision pages {routing['vision_pages']} "
+                  f"of {routing['page_count']} in {routing['elapsed_ms']} ms {routing['reasons']}")
+            progress(progress=100, routing={
+                key: routing[key] for key in ("route", "vision_pages", "page_count", "elapsed_ms")
+            })
+            if routing["route"] == ROUTE_TEXT:
+                use_vision = False
+
+        if docx_native:
+            docx_images = {"count": 0}
+
+            def native_progress(**fields):
+                docx_images["count"] = fields.get("docx_images", docx_images["count"])
+                progress(**fields)
+
+            try:
+                parsed = await extract_with_text(native_progress, file_path, file_extension, include_images=True)
+                processing_method = f"docx_native:{docx_images['count']}img"
+            except Exception as e:
+                print(f"DOCX-native processing failed: {str(e)}")
+                print("Falling back to enhanced text-based processing...")
+                use_vision = False
+                fell_back = True
+
+        if use_vision and file_extension == '.pdf':
+            try:
+                if routing and routing["route"] == ROUTE_HYBRID:
+                    # Text for the whole document and vision for the flagged pages run side by side
+                    text_result, vision_result = await asyncio.gather(
+                        extract_with_text(progress, text_path, text_extension),
+                        extract_with_vision(
+                            progress, file_path, memory,
+                            page_nums=routing["vision_pages"], report=False
+                        ),
+                        return_exceptions=True
+                    )
+                    if isinstance(text_result, Exception):
+                        raise text_result
+                    if isinstance(vision_result, Exception):
+                        print(f"Vision for pages {routing['vision_pages']} failed, keeping the text result: {vision_result}")
+                        parsed = text_result
+                        routing["route"] += "_fallback"
+                        fell_back = True
+                    else:
+                        parsed = merge_resume_results([text_result, vision_result[0]])
+                    processing_method = "hybrid"
+                else:
+                    parsed, processing_method = await extract_with_vision(progress, file_path, memory)
+
+                experience_data = parsed.get('experience_data', [])
+                certifications = parsed.get('certifications', [])
+                print(f"Vision processing complete: {len(experience_data)} experience entries, {len(certifications)} certifications extracted")
+
+                # Log certification details for verification
+                for cert in certifications:
+                    print(f"Certification detected: {cert}")
+
+            except Exception as e:
+                print(f"Enhanced vision processing failed: {str(e)}")
+                print("Falling back to enhanced text-based processing...")
+                use_vision = False
+                fell_back = True
+                if routing:
+                    routing["route"] += "_fallback"
+
+        # Enhanced text-based processing with improved table and certification extraction
+        if not use_vision:
+            parsed = await extract_with_text(progress, text_path, text_extension)
+            processing_method = "enhanced_text_comprehensive"
+
+        if routing:
+            # Keep the extractor that ran and add the route, e.g. vision_mapreduce@vision:12/12p:140ms
+            processing_method = f"{processing_method}@{format_route(routing)}"
+        if degraded:
+            processing_method += "_degraded"
+
+        # A degraded or fallback result is not what the requested mode would produce; do not cache it under that key
+        if RESULT_CACHE_ENABLED and not degraded and not fell_back:
+            await asyncio.to_thread(result_cache.put, cache_key, parsed)
+        return {"data": parsed, "processing_method": processing_method, "content_hash": content_hash}
+    finally:
+        try:
+            if converted_pdf_path and os.path.exists(converted_pdf_path):
+                os.remove(converted_pdf_path)
+        except Exception as e:
+            print(f"Error cleaning up converted PDF: {e}")
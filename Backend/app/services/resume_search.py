@@ -0,0 +1,268 @@
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import column, delete, desc, exists, func, insert, literal, literal_column, or_, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import IS_SQLITE
+from app import models
+from app.models import ResumeFacet, ResumeHistory
+
+FACET_KINDS = ("skill", "certification", "company", "role")
+FTS_TABLE = "resume_search_fts"
+# bm25 weights per FTS column: name, skills, certifications, companies, roles
+FTS_WEIGHTS = (1.0, 3.0, 3.0, 2.0, 2.0)
+REBUILD_CHUNK = 500
+# Facet counts cover at most this many of the best matches, so broad queries stay cheap
+FACET_SAMPLE = 2000
+
+
+def _sqlite_has_fts5() -> bool:
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+# Other databases match words against facet values instead of ranking full text
+FTS_ENABLED = IS_SQLITE and _sqlite_has_fts5()
+
+fts = table(FTS_TABLE, column("rowid"), column("name"), column("skills"),
+            column("certifications"), column("companies"), column("roles"))
+
+
+def normalize_term(value: str) -> str:
+    return re.sub(r"\s+", " ", value).strip().casefold()[:255]
+
+
+def _strings(value) -> List[str]:
+    """Plain strings out of a list entry that may be a string or a small object"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [item for entry in value for item in _strings(entry)]
+    if isinstance(value, dict):
+        for key in ("name", "title", "certification"):
+            if isinstance(value.get(key), str):
+                return [value[key]]
+    return []
+
+
+def extract_terms(resume_data: dict) -> Dict[str, List[str]]:
+    """Facet labels per kind from a parsed resume: skills, certifications, companies and roles"""
+    raw = {kind: [] for kind in FACET_KINDS}
+    for group in resume_data.get("skills") or []:
+        if isinstance(group, dict):
+            for values in group.values():
+                raw["skill"].extend(_strings(values))
+        else:
+            raw["skill"].extend(_strings(group))
+    raw["certification"].extend(_strings(resume_data.get("certifications") or []))
+    for entry in resume_data.get("experience_data") or []:
+        if isinstance(entry, dict):
+            raw["company"].extend(_strings(entry.get("company")))
+            raw["role"].extend(_strings(entry.get("role")))
+
+    terms = {}
+    for kind, labels in raw.items():
+        seen = set()
+        terms[kind] = []
+        for label in labels:
+            key = normalize_term(label)
+            if key and key not in seen:
+                seen.add(key)
+                terms[kind].append(label.strip()[:255])
+    return terms
+
+
+def _index_rows(rows: Iterable[Tuple[int, Optional[dict]]]) -> Tuple[list, list]:
+    """Facet and FTS insert parameters for (history_id, resume_data) pairs; empty results are skipped"""
+    facet_rows, fts_rows = [], []
+    for history_id, resume_data in rows:
+        if not isinstance(resume_data, dict) or not resume_data:
+            continue
+        terms = extract_terms(resume_data)
+        for kind, labels in terms.items():
+            facet_rows.extend(
+                {"history_id": history_id, "kind": kind, "value": normalize_term(label), "label": label}
+                for label in labels
+            )
+        name = resume_data.get("name")
+        fts_rows.append({
+            "rowid": history_id,
+            "name": name if isinstance(name, str) else "",
+            "skills": " ; ".join(terms["skill"]),
+            "certifications": " ; ".join(terms["certification"]),
+            "companies": " ; ".join(terms["company"]),
+            "roles": " ; ".join(terms["role"]),
+        })
+    return facet_rows, fts_rows
+
+
+async def index_resumes(db: AsyncSession, rows: Iterable[Tuple[int, Optional[dict]]]) -> None:
+    """Add newly saved history rows to the search index inside the caller's transaction"""
+    facet_rows, fts_rows = _index_rows(rows)
+    if facet_rows:
+        await db.execute(insert(ResumeFacet), facet_rows)
+    if FTS_ENABLED and fts_rows:
+        await db.execute(insert(fts), fts_rows)
+
+
+async def remove_resumes(db: AsyncSession, history_ids: List[int]) -> None:
+    await db.execute(delete(ResumeFacet).where(ResumeFacet.history_id.in_(history_ids)))
+    if FTS_ENABLED:
+        await db.execute(delete(fts).where(fts.c.rowid.in_(history_ids)))
+
+
+def ensure_fts_table(connection) -> bool:
+    """Create the FTS5 table if it is missing; True when it was just created and needs filling"""
+    if not FTS_ENABLED:
+        return False
+    exists_already = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first()
+    if exists_already:
+        return False
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        "name, skills, certifications, companies, roles, tokenize = 'unicode61 remove_diacritics 2')"
+    ))
+    return True
+
+
+def rebuild_search_index(connection) -> int:
+    """Re-index every completed history row from resume_data, in chunks; returns rows indexed"""
+    connection.execute(delete(ResumeFacet))
+    if FTS_ENABLED:
+        connection.execute(delete(fts))
+    indexed = 0
+    last_id = 0
+    while True:
+        chunk = connection.execute(
+            select(ResumeHistory.id, ResumeHistory.resume_data)
+            .where(ResumeHistory.id > last_id, ResumeHistory.status == "completed")
+            .order_by(ResumeHistory.id)
+            .limit(REBUILD_CHUNK)
+        ).all()
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        facet_rows, fts_rows = _index_rows(chunk)
+        if facet_rows:
+            connection.execute(insert(ResumeFacet), facet_rows)
+        if FTS_ENABLED and fts_rows:
+            connection.execute(insert(fts), fts_rows)
+        indexed += len(fts_rows)
+    print(f"Search index rebuilt: {indexed} resumes")
+    return indexed
+
+
+def fts_match_expression(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match, as a prefix, in some column"""
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+def _matched_ids(query: Optional[str], filters: Dict[str, str]):
+    """Select of (history_id, score) for rows matching the text query and every facet filter"""
+    match = fts_match_expression(query) if query else None
+    if match and FTS_ENABLED:
+        score = -func.bm25(literal_column(FTS_TABLE), *FTS_WEIGHTS)
+        matched = select(fts.c.rowid.label("history_id"), score.label("score")).where(
+            literal_column(FTS_TABLE).op("MATCH")(match)
+        )
+        # rowid + 0 keeps SQLite from pushing the filters below into FTS5 as one
+        # MATCH re-evaluation per candidate id
+        id_column = fts.c.rowid + 0
+    else:
+        matched = select(ResumeHistory.id.label("history_id"), literal(None).label("score")).where(
+            ResumeHistory.status == "completed"
+        )
+        id_column = ResumeHistory.id
+        for word in (re.findall(r"\w+", query) if match else []):
+            word = word.casefold()
+            matched = matched.where(exists().where(
+                ResumeFacet.history_id == ResumeHistory.id,
+                or_(ResumeFacet.value.like(f"{word}%"), ResumeFacet.value.like(f"% {word}%"))
+            ))
+    for kind, value in filters.items():
+        matched = matched.where(id_column.in_(
+            select(ResumeFacet.history_id).where(ResumeFacet.kind == kind, ResumeFacet.value == normalize_term(value))
+        ))
+    return matched.subquery("matched")
+
+
+async def search_resumes(
+    db: AsyncSession,
+    query: Optional[str] = None,
+    filters: Optional[Dict[str, str]] = None,
+    limit: int = 20,
+    offset: int = 0,
+    facet_limit: int = 10
+) -> dict:
+    """Ranked history rows matching a text query and exact facet filters, with facet counts.
+
+    Results come back best match first (bm25 over the FTS5 index; newest first without a
+    query). There is no exact total: "has_more" says whether another page follows. Facet
+    counts give the top facet_limit values per kind among the best FACET_SAMPLE matches;
+    "facets_sampled" says whether that was fewer than all of them.
+    """
+    matched = _matched_ids(query, filters or {})
+    ranked = bool(query and FTS_ENABLED and fts_match_expression(query))
+
+    # Rank once; the requested page and the facet sample both come from these ids, and the
+    # one extra row tells whether more follow. Without a query, id order stands in for newest first
+    order = [desc(matched.c.score)] if ranked else []
+    top = (await db.execute(
+        select(matched.c.history_id, matched.c.score)
+        .order_by(*order, desc(matched.c.history_id))
+        .limit(max(FACET_SAMPLE, offset + limit) + 1)
+    )).all()
+    page = top[offset:offset + limit]
+    scores = {history_id: score for history_id, score in page}
+
+    columns = [
+        ResumeHistory.id, ResumeHistory.filename, ResumeHistory.processed_at, ResumeHistory.file_size,
+        ResumeHistory.status, ResumeHistory.original_file_type
+    ]
+    if models.HAS_PROCESSING_METHOD_COLUMN:
+        columns.append(ResumeHistory.processing_method)
+    rows = {
+        row["id"]: row
+        for row in (await db.execute(select(*columns).where(ResumeHistory.id.in_(scores)))).mappings()
+    }
+    results = [
+        {**rows[history_id], "processing_method": rows[history_id].get("processing_method", "text"), "score": score}
+        for history_id, score in scores.items()
+        if history_id in rows
+    ]
+
+    facets = {kind: [] for kind in FACET_KINDS}
+    sample = [history_id for history_id, _ in top[:FACET_SAMPLE]]
+    if sample and facet_limit > 0:
+        count = func.count().label("count")
+        grouped = (
+            select(
+                ResumeFacet.kind, func.min(ResumeFacet.label).label("label"), count,
+                func.row_number().over(partition_by=ResumeFacet.kind, order_by=desc(count)).label("position")
+            )
+            .where(ResumeFacet.history_id.in_(sample))
+            .group_by(ResumeFacet.kind, ResumeFacet.value)
+            .subquery()
+        )
+        facet_rows = (await db.execute(
+            select(grouped.c.kind, grouped.c.label, grouped.c.count)
+            .where(grouped.c.position <= facet_limit)
+            .order_by(grouped.c.kind, desc(grouped.c.count), grouped.c.label)
+        )).all()
+        for kind, label, facet_count in facet_rows:
+            facets[kind].append({"value": label, "count": facet_count})
+
+    return {
+        "has_more": len(top) > offset + limit,
+        "results": results,
+        "facets": facets,
+        "facets_sampled": len(top) > FACET_SAMPLE,
+    }
@@ -0,0 +1,172 @@
+import json
+from bisect import bisect_right
+from typing import Iterable, List, Tuple
+
+
+class IncrementalJSONParser:
+    """Incrementally parse a streamed JSON object and report values as soon as they are complete.
+
+    feed() returns events:
+      ("field", key, value) once a top-level field's value is complete
+      ("item", key, value)  for each completed element of a top-level array listed in array_fields
+
+    Anything before the first "{" (such as a ```json fence) is ignored. Values that fail to
+    parse are skipped; the caller still parses the full completion at the end.
+
+    Chunks are kept as a list and each is scanned once; only the text of values still
+    being read is kept, so a long completion costs linear time rather than a string
+    copy per chunk.
+    """
+
+    def __init__(self, array_fields: Iterable[str] = ("experience_data",)):
+        self.array_fields = set(array_fields)
+        self._chunks: List[str] = []
+        self._chunk_starts: List[int] = []  # Absolute offset of each kept chunk
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._state = None  # "key", "colon" or "value" while inside the top-level object
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+        self._tracking_items = False
+        self._item_start = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, object]]:
+        events = []
+        if self.done or not chunk:
+            return events
+        base = self._pos
+        self._chunks.append(chunk)
+        self._chunk_starts.append(base)
+
+        for j, c in enumerate(chunk):
+            i = base + j
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._state == "key":
+                        self._key = self._loads(self._slice(self._key_start, i + 1))
+                        self._key_start = None
+                        self._state = "colon"
+                    elif self._depth == 1 and self._state == "value":
+                        self._emit_field(events, self._slice(self._value_start, i + 1))
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._state == "key":
+                    self._key_start = i
+                else:
+                    self._mark_value_start(i)
+                continue
+
+            if c.isspace():
+                continue
+
+            if self._depth == 0:
+                if c == "{":
+                    self._depth = 1
+                    self._state = "key"
+                continue
+
+            if c in "{[":
+                self._mark_value_start(i)
+                if self._depth == 1 and c == "[" and self._key in self.array_fields:
+                    self._tracking_items = True
+                    self._item_start = None
+                self._depth += 1
+                continue
+
+            if c in "}]":
+                self._depth -= 1
+                if self._tracking_items and self._depth == 1:
+                    # The tracked array itself just closed
+                    if self._item_start is not None:
+                        self._emit_item(events, self._slice(self._item_start, i))
+                    self._tracking_items = False
+                if self._depth == 1:
+                    self._emit_field(events, self._slice(self._value_start, i + 1))
+                elif self._depth == 0:
+                    if self._value_start is not None:
+                        self._emit_field(events, self._slice(self._value_start, i))
+                    self.done = True
+                    self._pos = i + 1
+                    self._chunks, self._chunk_starts = [], []
+                    return events
+                continue
+
+            if c == ",":
+                if self._depth == 1:
+                    if self._value_start is not None:
+                        self._emit_field(events, self._slice(self._value_start, i))
+                    self._state = "key"
+                elif self._depth == 2 and self._tracking_items and self._item_start is not None:
+                    self._emit_item(events, self._slice(self._item_start, i))
+                continue
+
+            if c == ":" and self._depth == 1 and self._state == "colon":
+                self._state = "value"
+                continue
+
+            # Start of a number, true, false or null
+            self._mark_value_start(i)
+
+        self._pos = base + len(chunk)
+        self._trim()
+        return events
+
+    def _slice(self, start: int, end: int) -> str:
+        """Text between two absolute offsets, joined from the kept chunks it spans"""
+        first = bisect_right(self._chunk_starts, start) - 1
+        last = bisect_right(self._chunk_starts, end - 1, lo=first)
+        text = "".join(self._chunks[first:last])
+        offset = self._chunk_starts[first]
+        return text[start - offset:end - offset]
+
+    def _trim(self) -> None:
+        """Drop chunks that end before the earliest value still being read"""
+        pending = [s for s in (self._key_start, self._value_start, self._item_start) if s is not None]
+        if not pending:
+            self._chunks, self._chunk_starts = [], []
+            return
+        drop = bisect_right(self._chunk_starts, min(pending)) - 1
+        if drop > 0:
+            del self._chunks[:drop]
+            del self._chunk_starts[:drop]
+
+    def _mark_value_start(self, i: int) -> None:
+        if self._depth == 1 and self._state == "value" and self._value_start is None:
+            self._value_start = i
+        elif self._depth == 2 and self._tracking_items and self._item_start is None:
+            self._item_start = i
+
+    def _emit_field(self, events: list, raw: str) -> None:
+        value = self._loads(raw)
+        if value is not _INVALID and self._key is not None:
+            events.append(("field", self._key, value))
+        self._value_start = None
+        self._state = None
+
+    def _emit_item(self, events: list, raw: str) -> None:
+        value = self._loads(raw)
+        if value is not _INVALID:
+            events.append(("item", self._key, value))
+        self._item_start = None
+
+    @staticmethod
+    def _loads(raw: str):
+        try:
+            return json.loads(raw.strip())
+        except ValueError:
+            return _INVALID
+
+
+_INVALID = object()
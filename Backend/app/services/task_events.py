@@ -0,0 +1,53 @@
+import asyncio
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+from app.services.task_store import task_store
+
+
+class TaskEventBus:
+    """Wakes push-channel subscribers when a task (or any task in a batch) changes.
+
+    Only changes made in this process are signalled; subscribers also re-read the task
+    store on a timeout so updates from other uvicorn workers still arrive.
+    """
+
+    def __init__(self):
+        self._waiters: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, task_id: str, task: dict) -> None:
+        # Called from worker threads as well as the event loop
+        keys = [task_id]
+        if task.get("batch_id"):
+            keys.append(task["batch_id"])
+        with self._lock:
+            waiters = [waiter for key in keys for waiter in self._waiters.get(key, ())]
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    async def wait(self, key: str, timeout: float) -> bool:
+        """Wait until `key` changes or the timeout passes; returns True if woken by a change"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.setdefault(key, set()).add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(key)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[key]
+
+
+def format_sse(event: str, data: Optional[str] = None) -> str:
+    return f"event: {event}\ndata: {data or '{}'}\n\n"
+
+
+task_events = TaskEventBus()
+task_store.add_listener(task_events.publish)
@@ -0,0 +1,345 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import (
+    TASK_MAX_AGE_SECONDS,
+    TASK_STORE_BACKEND,
+    TASK_STORE_PATH,
+    TASK_TTL_SECONDS,
+)
+
+FINISHED_STATUSES = ("completed", "failed")
+
+
+def _expiry_for(task: dict, now: float) -> float:
+    """Finished tasks live for TASK_TTL_SECONDS; unfinished ones are dropped after TASK_MAX_AGE_SECONDS"""
+    if task.get("status") in FINISHED_STATUSES:
+        return now + TASK_TTL_SECONDS
+    return task.get("expires_at") or now + TASK_MAX_AGE_SECONDS
+
+
+class TaskStore(ABC):
+    """Task-state backend shared by the upload, progress and worker code paths"""
+
+    def __init__(self):
+        self._listeners: List[Callable[[str, dict], None]] = []
+
+    def add_listener(self, listener: Callable[[str, dict], None]) -> None:
+        """Call listener(task_id, task) after every create/update made through this instance"""
+        self._listeners.append(listener)
+
+    def _notify(self, task_id: str, task: dict) -> None:
+        for listener in self._listeners:
+            try:
+                listener(task_id, task)
+            except Exception as e:
+                print(f"Task listener failed: {e}")
+
+    @abstractmethod
+    def create(self, task_id: str, task: dict) -> None: ...
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    def update(self, task_id: str, **fields) -> None: ...
+
+    @abstractmethod
+    def delete(self, task_id: str) -> None: ...
+
+    @abstractmethod
+    def batch(self, batch_id: str) -> Dict[str, dict]: ...
+
+    @abstractmethod
+    def evict_expired(self) -> int: ...
+
+    def flush(self) -> None:
+        """Wait until queued writes have reached the backend"""
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryTaskStore(TaskStore):
+    """Single-process store, mainly for tests and one-worker development servers"""
+
+    def __init__(self):
+        super().__init__()
+        self._tasks: Dict[str, dict] = {}
+        self._batches: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def create(self, task_id: str, task: dict) -> None:
+        with self._lock:
+            task = dict(task)
+            task["expires_at"] = _expiry_for(task, time.time())
+            self._tasks[task_id] = task
+            if task.get("batch_id"):
+                self._batches.setdefault(task["batch_id"], set()).add(task_id)
+        self._notify(task_id, task)
+
+    def get(self, task_id: str) -> Optional[dict]:
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None or task["expires_at"] < time.time():
+                return None
+            return dict(task)
+
+    def update(self, task_id: str, **fields) -> None:
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return
+            task.update(fields)
+            task["expires_at"] = _expiry_for(task, time.time())
+            task = dict(task)
+        self._notify(task_id, task)
+
+    def delete(self, task_id: str) -> None:
+        with self._lock:
+            self._remove(task_id)
+
+    def batch(self, batch_id: str) -> Dict[str, dict]:
+        now = time.time()
+        with self._lock:
+            return {
+                task_id: dict(self._tasks[task_id])
+                for task_id in self._batches.get(batch_id, ())
+                if task_id in self._tasks and self._tasks[task_id]["expires_at"] >= now
+            }
+
+    def evict_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [task_id for task_id, task in self._tasks.items() if task["expires_at"] < now]
+            for task_id in expired:
+                self._remove(task_id)
+        return len(expired)
+
+    def _remove(self, task_id: str) -> None:
+        task = self._tasks.pop(task_id, None)
+        if task and task.get("batch_id"):
+            members = self._batches.get(task["batch_id"])
+            if members is not None:
+                members.discard(task_id)
+                if not members:
+                    del self._batches[task["batch_id"]]
+
+
+def _apply(task: Optional[dict], op: Tuple[str, Optional[dict]]) -> Optional[dict]:
+    """A task as seen after one queued write: ("create", task), ("update", fields) or ("delete", None)"""
+    kind, value = op
+    if kind == "delete":
+        return None
+    if kind == "create":
+        return dict(value)
+    return {**task, **value} if task is not None else None
+
+
+def _coalesce(previous: Optional[Tuple[str, Optional[dict]]], op: Tuple[str, Optional[dict]]) -> tuple:
+    """Fold a new write into the one already queued for the same task"""
+    if previous is None or op[0] != "update" or previous[0] == "delete":
+        return op
+    return previous[0], {**previous[1], **op[1]}
+
+
+class SQLiteTaskStore(TaskStore):
+    """SQLite (WAL) store so every uvicorn worker sees the same task state.
+
+    Progress and partial-result updates arrive from callbacks on the event loop, so update()
+    and delete() only queue the change: a writer thread commits everything queued in one
+    transaction and notifies listeners afterwards. Writes to the same task are coalesced,
+    and get()/batch() in this process overlay the queued changes, so callers still read
+    their own writes. create() commits before it returns, so other workers can find a new
+    task straight away. create(), get() and batch() block on SQLite and the store's locks;
+    call them off the event loop.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._write_conn = self._connect()
+        self._write_conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " task_id TEXT PRIMARY KEY,"
+            " batch_id TEXT,"
+            " expires_at REAL NOT NULL,"
+            " data TEXT NOT NULL)"
+        )
+        self._write_conn.execute("CREATE INDEX IF NOT EXISTS ix_tasks_batch_id ON tasks (batch_id)")
+        self._write_conn.execute("CREATE INDEX IF NOT EXISTS ix_tasks_expires_at ON tasks (expires_at)")
+        self._write_conn.commit()
+        # WAL readers never wait for the write lock, so reads get their own connection
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._pending: Dict[str, tuple] = {}
+        self._inflight: Dict[str, tuple] = {}
+        self._closing = False
+        self._writer = threading.Thread(target=self._run_writer, name="task-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _queue(self, task_id: str, op: tuple) -> None:
+        with self._changed:
+            self._pending[task_id] = _coalesce(self._pending.get(task_id), op)
+            self._changed.notify_all()
+
+    def _queued(self) -> Tuple[Dict[str, tuple], Dict[str, tuple]]:
+        """Snapshot of the queued writes, taken before reading rows: a write committed between the
+        snapshot and the read is applied twice, which is harmless, but never missed"""
+        with self._changed:
+            return dict(self._inflight), dict(self._pending)
+
+    @staticmethod
+    def _overlay(queued: tuple, task_id: str, task: Optional[dict]) -> Optional[dict]:
+        for layer in queued:
+            if task_id in layer:
+                task = _apply(task, layer[task_id])
+        return task
+
+    def _run_writer(self) -> None:
+        while True:
+            with self._changed:
+                while not self._pending and not self._closing:
+                    self._changed.wait()
+                if not self._pending:
+                    return
+                self._inflight, self._pending = self._pending, {}
+            try:
+                written = self._write(self._inflight)
+            except Exception as e:
+                print(f"Task store write of {len(self._inflight)} tasks failed: {e}")
+                written = {}
+            with self._changed:
+                self._inflight = {}
+                self._changed.notify_all()
+            for task_id, task in written.items():
+                self._notify(task_id, task)
+
+    def _write(self, ops: Dict[str, tuple]) -> Dict[str, dict]:
+        """Apply queued writes in one transaction; returns the tasks as written, for listeners"""
+        written = {}
+        now = time.time()
+        with self._write_lock:
+            # BEGIN IMMEDIATE takes the write lock up front so concurrent workers cannot interleave
+            self._write_conn.execute("BEGIN IMMEDIATE")
+            try:
+                for task_id, op in ops.items():
+                    if op[0] == "delete":
+                        self._write_conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+                        continue
+                    task = None
+                    if op[0] == "update":
+                        row = self._write_conn.execute(
+                            "SELECT data FROM tasks WHERE task_id = ?", (task_id,)
+                        ).fetchone()
+                        task = json.loads(row[0]) if row else None
+                    task = _apply(task, op)
+                    if task is None:
+                        continue
+                    task["expires_at"] = _expiry_for(task, now)
+                    self._write_conn.execute(
+                        "INSERT OR REPLACE INTO tasks (task_id, batch_id, expires_at, data) VALUES (?, ?, ?, ?)",
+                        (task_id, task.get("batch_id"), task["expires_at"], json.dumps(task)),
+                    )
+                    written[task_id] = task
+                self._write_conn.commit()
+            except Exception:
+                self._write_conn.rollback()
+                raise
+        return written
+
+    def create(self, task_id: str, task: dict) -> None:
+        task = dict(task)
+        task["expires_at"] = _expiry_for(task, time.time())
+        with self._write_lock:
+            self._write_conn.execute(
+                "INSERT OR REPLACE INTO tasks (task_id, batch_id, expires_at, data) VALUES (?, ?, ?, ?)",
+                (task_id, task.get("batch_id"), task["expires_at"], json.dumps(task)),
+            )
+            self._write_conn.commit()
+        self._notify(task_id, task)
+
+    def get(self, task_id: str) -> Optional[dict]:
+        queued = self._queued()
+        with self._read_lock:
+            row = self._read_conn.execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        task = self._overlay(queued, task_id, json.loads(row[0]) if row else None)
+        if task is None or task["expires_at"] < time.time():
+            return None
+        return task
+
+    def update(self, task_id: str, **fields) -> None:
+        self._queue(task_id, ("update", fields))
+
+    def delete(self, task_id: str) -> None:
+        self._queue(task_id, ("delete", None))
+
+    def batch(self, batch_id: str) -> Dict[str, dict]:
+        queued = self._queued()
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                "SELECT task_id, data FROM tasks WHERE batch_id = ?", (batch_id,)
+            ).fetchall()
+        tasks = {}
+        now = time.time()
+        for task_id, data in rows:
+            task = self._overlay(queued, task_id, json.loads(data))
+            if task is not None and task["expires_at"] >= now:
+                tasks[task_id] = task
+        return tasks
+
+    def evict_expired(self) -> int:
+        with self._write_lock:
+            cursor = self._write_conn.execute("DELETE FROM tasks WHERE expires_at < ?", (time.time(),))
+            self._write_conn.commit()
+        return cursor.rowcount
+
+    def flush(self) -> None:
+        with self._changed:
+            while self._pending or self._inflight:
+                self._changed.wait()
+
+    def close(self) -> None:
+        with self._changed:
+            self._closing = True
+            self._changed.notify_all()
+        self._writer.join()
+        with self._write_lock, self._read_lock:
+            self._write_conn.close()
+            self._read_conn.close()
+
+
+def create_task_store(backend: str = TASK_STORE_BACKEND) -> TaskStore:
+    if backend == "memory":
+        return InMemoryTaskStore()
+    if backend == "sqlite":
+        return SQLiteTaskStore(TASK_STORE_PATH)
+    raise ValueError(f"Unknown TASK_STORE_BACKEND: {backend}")
+
+
+async def run_eviction_loop(store: TaskStore, interval: float) -> None:
+    """Periodically drop expired tasks; started from the app startup hook"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            evicted = await asyncio.to_thread(store.evict_expired)
+            if evicted:
+                print(f"Evicted {evicted} expired tasks")
+        except Exception as e:
+            print(f"Task eviction failed: {e}")
+
+
+task_store = create_task_store()
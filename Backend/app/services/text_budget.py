@@ -0,0 +1,208 @@
+import math
+import re
+from collections import Counter
+from typing import List
+
+from app.config import (
+    TEXT_BUDGET_ENABLED,
+    TEXT_COMPLETION_TOKENS_BASE,
+    TEXT_COMPLETION_TOKENS_RATIO,
+    TEXT_MAX_COMPLETION_TOKENS,
+    TEXT_MIN_COMPLETION_TOKENS,
+    TOKENIZER_ENCODING,
+)
+
+try:
+    import tiktoken
+    HAS_TIKTOKEN = True
+except ImportError:
+    HAS_TIKTOKEN = False
+
+# A line is a page header/footer candidate within this many non-empty lines of a page edge
+EDGE_LINES = 3
+# ...and repeated when it sits at the edge of at least this share of pages
+REPEATED_PAGE_SHARE = 0.5
+
+# "Page 3", "Page 3 of 5", "3 of 5", "3/5", "- 3 -"; only dropped as a page's first or last line,
+# so bare numbers (phone numbers, years) are never taken for page numbers
+PAGE_NUMBER = re.compile(
+    r"^(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*(of|/)\s*\d+|[-–]\s*\d+\s*[-–])$", re.IGNORECASE
+)
+SEPARATOR_LINE = re.compile(r"^[\s\-_=*•·.~]{4,}$")
+DOCX_SECTION_MARKER = re.compile(r"(\n--- (?:HEADER|FOOTER) SECTION ---\n)")
+# Table markers must survive even when every page starts with a table
+STRUCTURE_LINE = re.compile(r"^(experience_row_\d+: |headers: |total_experience_rows: |--- )")
+PAGE_REFERENCE = re.compile(r"\bpage\s*\d+(\s*(of|/)\s*\d+)?")
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    """tiktoken encoding, loaded once; None when tiktoken is missing or its BPE file cannot be fetched"""
+    global _encoding, _encoding_failed
+    if _encoding is None and HAS_TIKTOKEN and not _encoding_failed:
+        try:
+            _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except Exception as e:
+            _encoding_failed = True
+            print(f"tiktoken encoding {TOKENIZER_ENCODING} unavailable, estimating tokens as chars/4: {e}")
+    return _encoding
+
+
+def tokenizer_name() -> str:
+    return TOKENIZER_ENCODING if _get_encoding() else "chars/4"
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def _line_key(line: str) -> str:
+    """Case/space-insensitive; page numbers vary between otherwise identical header/footer lines"""
+    return PAGE_REFERENCE.sub("page #", " ".join(line.split()).casefold())
+
+
+def _normalize_lines(text: str) -> List[str]:
+    lines = []
+    for line in text.split("\n"):
+        line = re.sub(r"[ \t\u00a0\u2000-\u200b]+", " ", line).strip()
+        if SEPARATOR_LINE.match(line):
+            continue
+        lines.append(line)
+    filled = [index for index, line in enumerate(lines) if line]
+    page_numbers = {index for index in filled[:1] + filled[-1:] if PAGE_NUMBER.match(lines[index])}
+    return [line for index, line in enumerate(lines) if index not in page_numbers]
+
+
+def _drop_repeated_page_edges(pages: List[List[str]]) -> List[List[str]]:
+    """Keep the first copy of lines repeated at the top or bottom of most pages"""
+    if len(pages) < 2:
+        return pages
+
+    def edge_positions(lines: List[str]) -> set:
+        filled = [index for index, line in enumerate(lines) if line]
+        return set(filled[:EDGE_LINES] + filled[-EDGE_LINES:])
+
+    counts = Counter()
+    for lines in pages:
+        counts.update({_line_key(lines[index]) for index in edge_positions(lines)})
+    threshold = max(2, math.ceil(len(pages) * REPEATED_PAGE_SHARE))
+    repeated = {key for key, count in counts.items() if count >= threshold and not STRUCTURE_LINE.match(key)}
+
+    seen = set()
+    result = []
+    for lines in pages:
+        edges = edge_positions(lines)
+        kept = []
+        for index, line in enumerate(lines):
+            key = _line_key(line)
+            if index in edges and key in repeated:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(line)
+        result.append(kept)
+    return result
+
+
+def _dedupe_docx_sections(text: str) -> str:
+    """Every DOCX section repeats its header/footer; keep one copy of each distinct one"""
+    pieces = DOCX_SECTION_MARKER.split(text)
+    kept = [pieces[0]]
+    seen = set()
+    for marker, content in zip(pieces[1::2], pieces[2::2]):
+        key = (marker, _line_key(content))
+        if not content.strip() or key in seen:
+            continue
+        seen.add(key)
+        kept.extend([marker, content])
+    return "".join(kept)
+
+
+def compact_text(text: str) -> str:
+    """Strip what costs prompt tokens without carrying resume content: repeated page
+    headers/footers and DOCX section headers/footers, page numbers, separator rules and
+    runs of whitespace/blank lines. Table cells are left alone: equal neighbours such as
+    "2021 | 2021" are real data, and merged DOCX cells are already emitted once"""
+    text = _dedupe_docx_sections(text)
+    pages = [_normalize_lines(page) for page in text.split("\f")]
+    pages = _drop_repeated_page_edges(pages)
+    compacted = "\n".join(line for lines in pages for line in lines)
+    return re.sub(r"\n{3,}", "\n\n", compacted).strip()
+
+
+def completion_budget(input_tokens: int) -> int:
+    """max_tokens for a text-path completion: the JSON restates most of the resume, so it
+    grows with the input, within [TEXT_MIN_COMPLETION_TOKENS, TEXT_MAX_COMPLETION_TOKENS]"""
+    estimate = TEXT_COMPLETION_TOKENS_BASE + int(input_tokens * TEXT_COMPLETION_TOKENS_RATIO)
+    return max(TEXT_MIN_COMPLETION_TOKENS, min(TEXT_MAX_COMPLETION_TOKENS, estimate))
+
+
+class TextBudget:
+    """Compacts text-path prompts, sizes their max_tokens and keeps running token totals"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.requests = 0
+        self.original_tokens = 0
+        self.input_tokens = 0
+        self.max_tokens = 0
+        self.completion_tokens = 0
+        self.completion_seconds = 0.0
+
+    def prepare(self, text: str) -> dict:
+        """Returns {"text", "original_tokens", "input_tokens", "max_tokens", "tokenizer", ...}"""
+        original_tokens = count_tokens(text)
+        if not self.enabled:
+            return {
+                "text": text, "original_tokens": original_tokens, "input_tokens": original_tokens,
+                "max_tokens": TEXT_MAX_COMPLETION_TOKENS, "tokenizer": tokenizer_name(),
+            }
+        compacted = compact_text(text)
+        input_tokens = count_tokens(compacted)
+        return {
+            "text": compacted,
+            "original_chars": len(text),
+            "chars": len(compacted),
+            "original_tokens": original_tokens,
+            "input_tokens": input_tokens,
+            "max_tokens": completion_budget(input_tokens),
+            "tokenizer": tokenizer_name(),
+        }
+
+    def record(self, budget: dict, completion: str, seconds: float) -> dict:
+        """Add one finished request to the totals; returns its metrics for the task record"""
+        completion_tokens = count_tokens(completion)
+        self.requests += 1
+        self.original_tokens += budget["original_tokens"]
+        self.input_tokens += budget["input_tokens"]
+        self.max_tokens += budget["max_tokens"]
+        self.completion_tokens += completion_tokens
+        self.completion_seconds += seconds
+        return {
+            **{key: value for key, value in budget.items() if key != "text"},
+            "completion_tokens": completion_tokens,
+            "completion_seconds": round(seconds, 2),
+        }
+
+    def stats(self) -> dict:
+        saved = self.original_tokens - self.input_tokens
+        return {
+            "enabled": self.enabled,
+            "tokenizer": tokenizer_name(),
+            "requests": self.requests,
+            "original_tokens": self.original_tokens,
+            "input_tokens": self.input_tokens,
+            "tokens_saved": saved,
+            "saved_ratio": round(saved / self.original_tokens, 3) if self.original_tokens else 0.0,
+            "avg_max_tokens": round(self.max_tokens / self.requests) if self.requests else 0,
+            "avg_completion_tokens": round(self.completion_tokens / self.requests) if self.requests else 0,
+            "avg_completion_seconds": round(self.completion_seconds / self.requests, 2) if self.requests else 0.0,
+        }
+
+
+text_budget = TextBudget(TEXT_BUDGET_ENABLED)
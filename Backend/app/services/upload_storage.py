@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from app.config import UPLOAD_CHUNK_BYTES, UPLOAD_MAX_BYTES
+
+# Leading bytes of each accepted format; a PDF header may follow up to 1 KB of junk
+PDF_MAGIC = b"%PDF-"
+ZIP_MAGIC = b"PK\x03\x04"  # DOCX is an OOXML zip package
+OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"  # legacy binary DOC
+
+
+def matches_magic(file_extension: str, head: bytes) -> bool:
+    """Check the first bytes of an upload against the format its extension claims"""
+    if file_extension == ".pdf":
+        return PDF_MAGIC in head[:1024]
+    if file_extension == ".docx":
+        return head.startswith(ZIP_MAGIC)
+    if file_extension == ".doc":
+        # Word also opens .doc files that are really DOCX
+        return head.startswith(OLE_MAGIC) or head.startswith(ZIP_MAGIC)
+    return False
+
+
+class RequestSizeLimitMiddleware:
+    """ASGI middleware capping request bodies at max_bytes before the multipart parser spools them.
+
+    A declared Content-Length over the limit is refused without reading the body; chunked
+    bodies (no Content-Length) are counted as they arrive and cut off with 413 once they pass it.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            await JSONResponse(status_code=413, content={"detail": "Request body too large"})(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI re-raises HTTPException from body parsing, so this becomes the response
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        async def tracked_send(message):
+            nonlocal response_started
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except HTTPException as e:
+            # Raised outside a route (another middleware reading the body)
+            if e.status_code != 413 or response_started:
+                raise
+            await JSONResponse(status_code=413, content={"detail": e.detail})(scope, receive, send)
+
+
+def _write_chunk(tmp, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    tmp.write(chunk)
+
+
+async def save_upload(
+    file: UploadFile,
+    file_extension: str,
+    max_bytes: int = UPLOAD_MAX_BYTES,
+    chunk_size: int = UPLOAD_CHUNK_BYTES
+) -> dict:
+    """Stream an upload to a temporary file chunk by chunk, hashing as it goes.
+
+    Returns {"path", "size", "sha256"}; the digest is the same one hash_file computes, so it
+    doubles as the result-cache content hash. Raises HTTPException 400 when the leading bytes
+    do not match the extension and 413 once the upload passes max_bytes; the partial file is removed.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=file_extension)
+    try:
+        with tmp:
+            first = True
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                if first:
+                    first = False
+                    if not matches_magic(file_extension, chunk):
+                        raise HTTPException(
+                            status_code=400,
+                            detail=f"File {file.filename}: content is not a valid {file_extension[1:].upper()} file."
+                        )
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File {file.filename} exceeds the {max_bytes / (1024 * 1024):.3g} MB upload limit."
+                    )
+                await asyncio.to_thread(_write_chunk, tmp, digest, chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail=f"File {file.filename} is empty.")
+    except BaseException:
+        os.remove(tmp.name)
+        raise
+    finally:
+        await file.close()
+    return {"path": tmp.name, "size": size, "sha256": digest.hexdigest()}
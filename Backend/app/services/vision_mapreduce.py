@@ -0,0 +1,82 @@
+import asyncio
+from typing import Callable, List, Optional
+
+from app.config import (
+    VISION_CHUNK_RETRIES,
+    VISION_MAX_PARALLEL_CHUNKS,
+    VISION_PAGES_PER_CHUNK,
+)
+from app.services.azure_clients import extract_resume_details_with_azure_vision_async
+from app.services.resume_parser import clean_json_string
+from app.services.result_merge import merge_resume_results
+
+
+def chunk_pages(image_urls: list, pages_per_chunk: int) -> List[tuple]:
+    """Split pages into (first_page, last_page, urls) groups, 1-based page numbers"""
+    return [
+        (start + 1, min(start + pages_per_chunk, len(image_urls)), image_urls[start:start + pages_per_chunk])
+        for start in range(0, len(image_urls), pages_per_chunk)
+    ]
+
+
+async def extract_resume_details_map_reduce(
+    image_urls: list,
+    pages_per_chunk: int = VISION_PAGES_PER_CHUNK,
+    max_parallel: int = VISION_MAX_PARALLEL_CHUNKS,
+    retries: int = VISION_CHUNK_RETRIES,
+    progress_callback: Optional[Callable[[str, int, int], None]] = None,
+    partial_callback: Optional[Callable[[dict], None]] = None
+) -> dict:
+    """Extract a resume by sending page groups as concurrent vision requests and merging the results.
+
+    Transient Azure errors are retried by azure_guard inside each request; here a chunk is only
+    asked again when its completion is not valid JSON. Wall-clock time follows the slowest chunk
+    rather than the page count. progress_callback receives
+    ("chunks", done, total); partial_callback receives the merge of the chunks finished so far.
+    """
+    chunks = chunk_pages(image_urls, pages_per_chunk)
+    total_pages = len(image_urls)
+    semaphore = asyncio.Semaphore(max_parallel)
+    results: List[Optional[dict]] = [None] * len(chunks)
+    done = 0
+    print(f"Map-reduce vision: {total_pages} pages in {len(chunks)} chunks of up to {pages_per_chunk}")
+
+    async def run_chunk(index: int, first_page: int, last_page: int, urls: list):
+        nonlocal done
+        for attempt in range(retries + 1):
+            try:
+                async with semaphore:
+                    extracted = await extract_resume_details_with_azure_vision_async(
+                        urls,
+                        page_numbers=list(range(first_page, last_page + 1)),
+                        total_pages=total_pages
+                    )
+                results[index] = clean_json_string(extracted)
+                break
+            except ValueError as e:
+                if attempt == retries:
+                    raise RuntimeError(
+                        f"Vision chunk pages {first_page}-{last_page} returned invalid JSON "
+                        f"after {retries + 1} attempts: {e}"
+                    )
+                print(f"Vision chunk pages {first_page}-{last_page} returned invalid JSON "
+                      f"(attempt {attempt + 1}), asking again: {e}")
+
+        done += 1
+        if progress_callback:
+            progress_callback("chunks", done, len(chunks))
+        if partial_callback:
+            partial_callback(merge_resume_results([r for r in results if r is not None]))
+
+    tasks = [
+        asyncio.create_task(run_chunk(index, first_page, last_page, urls))
+        for index, (first_page, last_page, urls) in enumerate(chunks)
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    return merge_resume_results(results)
@@ -1,31 +1,35 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from auth.auth_models import UserCreate, UserLogin, TokenResponse
 from auth.auth import create_access_token
 from app.models import User
-from app.database import get_db
+from app.database import get_async_db
 from utils.logger import logger
 from passlib.context import CryptContext
 
 router = APIRouter()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is deliberately slow, so hashing and verifying run off the event loop
+
 @router.post("/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     logger.info(f"Register attempt for user: {user.username}")
-    existing_user = db.query(User).filter(User.username == user.username).first()
+    existing_user = await db.scalar(select(User).where(User.username == user.username))
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = await asyncio.to_thread(pwd_context.hash, user.password)
     new_user = User(username=user.username, hashed_password=hashed_password)
     db.add(new_user)
-    db.commit()
+    await db.commit()
     return {"message": "User registered successfully"}
 
 @router.post("/login", response_model=TokenResponse)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.username == user.username).first()
-    if not db_user or not pwd_context.verify(user.password, db_user.hashed_password):
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.scalar(select(User).where(User.username == user.username))
+    if not db_user or not await asyncio.to_thread(pwd_context.verify, user.password, db_user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     token = create_access_token({"sub": user.username})
     return TokenResponse(access_token=token)
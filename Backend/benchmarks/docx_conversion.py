@@ -0,0 +1,144 @@
+"""Benchmark DOCX->PDF throughput: one cold LibreOffice run per file vs the persistent pool
+(and Aspose.Words in-process, when installed), to pick DOCX_CONVERTER_ORDER.
+
+Usage (from the Backend directory; whichever of LibreOffice and Aspose.Words is installed is timed):
+    python -m benchmarks.docx_conversion path/to/docx [--concurrency 4]
+    python -m benchmarks.docx_conversion --synthetic 20 --concurrency 4
+
+"cold" reproduces the old behaviour: a `libreoffice --convert-to` per file, run one at a
+time since concurrent runs fight over the shared profile. "pool" submits every file to
+docx_converter from `concurrency` threads, the way batch uploads reach it; "aspose" does
+the same through Aspose.Words.
+"""
+import argparse
+import glob
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from docx import Document
+
+from app.services.docx_conversion import docx_converter
+from app.services.resume_parser import DOCX_CONVERTERS, _convert_with_aspose
+
+
+def make_synthetic_corpus(directory: str, count: int) -> list:
+    """Resume-like DOCX files with paragraphs and an experience table"""
+    paths = []
+    for n in range(count):
+        doc = Document()
+        doc.add_heading(f"Candidate {n}", level=1)
+        for _ in range(8):
+            doc.add_paragraph("Delivered cloud migration and data platform projects for enterprise clients. " * 4)
+        table = doc.add_table(rows=1, cols=4)
+        for cell, header in zip(table.rows[0].cells, ["Role", "Company", "Duration", "Domain"]):
+            cell.text = header
+        for r in range(15):
+            for cell, value in zip(table.add_row().cells, [f"Engineer {r}", f"Company {r}", "2019-2021", "Banking"]):
+                cell.text = value
+        path = os.path.join(directory, f"synthetic_{n:03d}.docx")
+        doc.save(path)
+        paths.append(path)
+    return paths
+
+
+def convert_cold(docx_path: str, out_dir: str) -> float:
+    started = time.perf_counter()
+    subprocess.run(
+        [docx_converter.binary, "--headless", "--convert-to", "pdf", "--outdir", out_dir, docx_path],
+        capture_output=True, timeout=120, check=True,
+    )
+    return time.perf_counter() - started
+
+
+def convert_pooled(docx_path: str) -> float:
+    started = time.perf_counter()
+    pdf_path = docx_converter.convert(docx_path)
+    elapsed = time.perf_counter() - started
+    os.remove(pdf_path)
+    return elapsed
+
+
+def convert_aspose(docx_path: str) -> float:
+    started = time.perf_counter()
+    pdf_path = _convert_with_aspose(docx_path)
+    elapsed = time.perf_counter() - started
+    os.remove(pdf_path)
+    return elapsed
+
+
+def report(label: str, latencies: list, wall: float) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label:<6} {len(latencies)} files in {wall:7.2f}s  "
+          f"{len(latencies) / wall * 60:7.1f} files/min  "
+          f"p50 {statistics.median(latencies):5.2f}s  p95 {p95:5.2f}s")
+
+
+def run(paths: list, concurrency: int) -> None:
+    if docx_converter.available():
+        run_libreoffice(paths, concurrency)
+    else:
+        print("LibreOffice (soffice/libreoffice) not found: skipping cold and pool")
+
+    aspose_available, _ = DOCX_CONVERTERS["aspose"]
+    if aspose_available():
+        convert_aspose(paths[0])  # library load
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            aspose = list(executor.map(convert_aspose, paths))
+        report("aspose", aspose, time.perf_counter() - started)
+    else:
+        print("Aspose.Words not installed: skipping aspose")
+
+
+def run_libreoffice(paths: list, concurrency: int) -> None:
+    out_dir = tempfile.mkdtemp(prefix="bench_cold_")
+    try:
+        started = time.perf_counter()
+        cold = [convert_cold(path, out_dir) for path in paths]
+        report("cold", cold, time.perf_counter() - started)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    # First conversion per worker pays the start-up; measure it separately from steady state
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(convert_pooled, paths[:docx_converter.size]))
+    print(f"pool warm-up ({docx_converter.size} workers) {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        pooled = list(executor.map(convert_pooled, paths))
+    report("pool", pooled, time.perf_counter() - started)
+    print(docx_converter.stats())
+    docx_converter.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="?", help="Directory of DOCX files")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate this many synthetic DOCX files instead")
+    parser.add_argument("--concurrency", type=int, default=4, help="Threads submitting to the pool")
+    args = parser.parse_args()
+
+    if not docx_converter.available() and not DOCX_CONVERTERS["aspose"][0]():
+        parser.error("Neither LibreOffice (set LIBREOFFICE_BINARY) nor Aspose.Words is installed")
+    if args.synthetic:
+        with tempfile.TemporaryDirectory() as directory:
+            run(make_synthetic_corpus(directory, args.synthetic), args.concurrency)
+    elif args.corpus:
+        paths = sorted(glob.glob(os.path.join(args.corpus, "**", "*.docx"), recursive=True))
+        if not paths:
+            parser.error(f"No DOCX files found under {args.corpus}")
+        run(paths, args.concurrency)
+    else:
+        parser.error("Give a corpus directory or --synthetic N")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark the PyMuPDF layout-aware PDF extractor against a plain PyMuPDF text dump.
+
+Usage (from the Backend directory):
+    python -m benchmarks.pdf_extraction path/to/pdfs [--repeat 3]
+    python -m benchmarks.pdf_extraction --synthetic 20 --pages 6 --table-pages 2
+
+Reports per-file and total wall time for both extractors, output size and how many
+EXPERIENCE TABLE / EXPERIENCE_ROW markers each produced. The difference is the price of
+keeping table structure (find_tables on pages with a ruled grid).
+"""
+import argparse
+import glob
+import os
+import statistics
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from app.services.resume_parser import extract_text_from_pdf
+
+
+def extract_plain_text(file_path: str) -> str:
+    """Text without table detection or reordering, the floor for any PyMuPDF extraction"""
+    with fitz.open(file_path) as pdf_document:
+        return "\f".join(page.get_text() for page in pdf_document)
+
+
+EXTRACTORS = {
+    "plain": extract_plain_text,
+    "layout": extract_text_from_pdf,
+}
+
+
+def make_synthetic_corpus(directory: str, count: int, pages: int, table_pages: int) -> list:
+    """Resume-like PDFs: underlined text pages, the first table_pages of which carry a ruled experience table instead"""
+    paths = []
+    paragraph = "Delivered cloud migration and data platform projects for enterprise clients. " * 6
+    for n in range(count):
+        doc = fitz.open()
+        for page_num in range(pages):
+            page = doc.new_page()
+            if page_num >= table_pages:
+                page.insert_textbox(fitz.Rect(50, 40, 550, 800), f"Candidate {n} page {page_num + 1}\n{paragraph * 4}", fontsize=9)
+                # Section underlines: vector strokes that do not form a table
+                for y in (36, 300, 560):
+                    page.draw_line((50, y), (550, y))
+                continue
+            page.insert_textbox(fitz.Rect(50, 40, 550, 200), f"Candidate {n} page {page_num + 1}\n{paragraph}", fontsize=9)
+            columns = [50, 170, 290, 410, 550]
+            headers = ["Role", "Company", "Duration", "Domain"]
+            rows = [headers] + [
+                [f"Engineer {r}", f"Company {n}-{page_num}-{r}", f"20{10 + r}-20{11 + r}", "Banking"]
+                for r in range(12)
+            ]
+            top, height = 220, 22
+            for r, row in enumerate(rows):
+                y = top + r * height
+                for c, cell in enumerate(row):
+                    page.insert_text((columns[c] + 4, y + 15), cell, fontsize=8)
+            for r in range(len(rows) + 1):
+                page.draw_line((columns[0], top + r * height), (columns[-1], top + r * height))
+            for x in columns:
+                page.draw_line((x, top), (x, top + len(rows) * height))
+        path = os.path.join(directory, f"synthetic_{n:03d}.pdf")
+        doc.save(path)
+        doc.close()
+        paths.append(path)
+    return paths
+
+
+def run(paths: list, repeat: int) -> None:
+    totals = {name: [] for name in EXTRACTORS}
+    print(f"{'file':<32} {'extractor':<8} {'ms (median)':>12} {'chars':>8} {'tables':>7} {'rows':>6}")
+    for path in paths:
+        for name, extractor in EXTRACTORS.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                text = extractor(path)
+                timings.append((time.perf_counter() - started) * 1000)
+            median = statistics.median(timings)
+            totals[name].append(median)
+            tables = text.count("EXPERIENCE TABLE") // 2
+            rows = text.count("EXPERIENCE_ROW_")
+            print(f"{os.path.basename(path)[:32]:<32} {name:<8} {median:>12.1f} {len(text):>8} {tables:>7} {rows:>6}")
+
+    print()
+    for name, timings in totals.items():
+        print(f"{name:<8} total {sum(timings):9.1f} ms  mean {statistics.mean(timings):8.1f} ms/file")
+    if totals["plain"] and sum(totals["plain"]):
+        print(f"layout cost  {sum(totals['layout']) / sum(totals['plain']):.2f}x plain")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="?", help="Directory of PDFs")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate this many synthetic PDFs instead")
+    parser.add_argument("--pages", type=int, default=4, help="Pages per synthetic PDF")
+    parser.add_argument("--table-pages", type=int, default=1, help="Synthetic pages carrying a table")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        with tempfile.TemporaryDirectory() as directory:
+            run(make_synthetic_corpus(directory, args.synthetic, args.pages, args.table_pages), args.repeat)
+    elif args.corpus:
+        paths = sorted(glob.glob(os.path.join(args.corpus, "**", "*.pdf"), recursive=True))
+        if not paths:
+            parser.error(f"No PDFs found under {args.corpus}")
+        run(paths, args.repeat)
+    else:
+        parser.error("Give a corpus directory or --synthetic N")
+
+
+if __name__ == "__main__":
+    main()
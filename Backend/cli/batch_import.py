@@ -0,0 +1,63 @@
+"""Import a directory of resumes into resume history through the Azure OpenAI Batch API.
+
+Usage (from the Backend directory):
+    python -m cli.batch_import path/to/resumes --work-dir imports/2025-archive
+    python -m cli.batch_import path/to/resumes --work-dir imports/2025-archive --no-wait
+    python -m cli.batch_import --work-dir imports/2025-archive --retry-failed
+
+Files are extracted and rendered locally, written to JSONL input files and submitted as
+batch jobs to AZURE_BATCH_DEPLOYMENT (a Global-Batch deployment: its own enqueued-token
+quota, half the per-token price, results within 24 hours). Progress is checkpointed in
+<work-dir>/manifest.db; run the same command again to carry on after an interruption,
+or with --no-wait to submit now and collect the results on a later run.
+"""
+import argparse
+import glob
+import json
+import os
+
+from app.config import AZURE_BATCH_POLL_SECONDS
+from app.database import init_db
+from app.services.azure_batch import SUPPORTED_EXTENSIONS, BatchImport, default_batch_client
+
+
+def find_resumes(directory: str) -> list:
+    return sorted(
+        path for path in glob.glob(os.path.join(directory, "**", "*"), recursive=True)
+        if os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", help="Directory of PDF/DOC/DOCX resumes (searched recursively)")
+    parser.add_argument("--work-dir", required=True, help="Manifest, JSONL input and output files for this import")
+    parser.add_argument("--mode", choices=("auto", "text"), default="auto",
+                        help="auto: route like uploads with vision on; text: text layer only")
+    parser.add_argument("--user-id", help="user_id stored on the imported history rows")
+    parser.add_argument("--no-wait", action="store_true", help="Submit and collect what is ready, then exit")
+    parser.add_argument("--poll-seconds", type=float, default=AZURE_BATCH_POLL_SECONDS)
+    parser.add_argument("--retry-failed", action="store_true", help="Prepare previously failed files again")
+    args = parser.parse_args()
+
+    paths = []
+    if args.directory:
+        paths = find_resumes(args.directory)
+        if not paths:
+            parser.error(f"No resumes found under {args.directory}")
+
+    init_db()
+    client = default_batch_client()
+    batch_import = BatchImport(args.work_dir, client, mode=args.mode, user_id=args.user_id)
+    try:
+        if args.retry_failed:
+            print(f"{batch_import.retry_failed()} failed files queued again")
+        summary = batch_import.run(paths, wait=not args.no_wait, poll_seconds=args.poll_seconds)
+    finally:
+        batch_import.close()
+        client.close()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
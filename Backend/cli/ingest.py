@@ -0,0 +1,336 @@
+"""Run the resume pipeline over a directory with a process pool, into resume history or a JSONL file.
+
+Usage (from the Backend directory):
+    python -m cli.ingest path/to/resumes --concurrency 8
+    python -m cli.ingest path/to/resumes --output jsonl --jsonl-path parsed.jsonl --mode text
+
+Each worker process runs one file at a time through run_resume_pipeline, the same code uploads
+go through: result cache, DOCX->PDF conversion, routing, text extraction, page rendering, the
+Azure completion and JSON parsing. Finished files are recorded in the manifest (--manifest), so re-running the command after a
+crash or Ctrl+C skips them; --retry-failed also re-runs the ones that failed. History rows are
+saved under a per-file import key, so a file whose row was committed just before the crash is
+marked done on the rerun rather than saved twice. The summary gives files per minute and the
+p50/p95 seconds spent in every stage.
+
+AZURE_REQUESTS_PER_MINUTE / AZURE_TOKENS_PER_MINUTE are enforced per worker process, so set
+them to the deployment quota divided by --concurrency.
+"""
+import os
+
+# The pool below is the parallelism: each worker renders its own pages in-process
+os.environ.setdefault("RENDER_WORKERS", "1")
+
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import sqlite3
+import statistics
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from app.database import async_engine, init_db
+from app import models
+from app.services.history_writer import find_imported, history_writer
+from app.services.result_cache import hash_file
+from app.services.resume_pipeline import run_resume_pipeline
+from cli.batch_import import find_resumes
+
+MANIFEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT,
+    status TEXT NOT NULL,
+    processing_method TEXT,
+    history_id INTEGER,
+    error TEXT,
+    stages TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Each worker keeps one event loop for its lifetime, so the pooled Azure client and the
+# deployment guard's buckets and breakers carry over from one file to the next
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_worker() -> None:
+    global _loop
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+
+
+class StageTimer:
+    """Seconds spent per pipeline stage for one file, taken from the stage changes it reports"""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self._stage: Optional[str] = None
+        self._started = 0.0
+
+    def progress(self, stage: Optional[str] = None, **fields) -> None:
+        if stage is not None and stage != self._stage:
+            self.finish()
+            self._stage, self._started = stage, time.perf_counter()
+
+    def finish(self) -> None:
+        if self._stage is not None:
+            self.seconds[self._stage] = self.seconds.get(self._stage, 0.0) + time.perf_counter() - self._started
+            self._stage = None
+
+
+def process_file(path: str, mode: str) -> dict:
+    """Run one resume through run_resume_pipeline in a worker process.
+
+    Returns {"path", "status", "content_hash", "resume_data", "processing_method", "stages",
+    "error"}; nothing is written to the database here, the parent saves the result.
+    """
+    timer = StageTimer()
+    result = {"path": path, "status": "failed", "content_hash": None, "resume_data": None,
+              "processing_method": None, "stages": timer.seconds, "error": None}
+    try:
+        # Hashed here even with the result cache off: the manifest records it
+        timer.progress(stage="hash")
+        content_hash = result["content_hash"] = hash_file(path)
+        outcome = _loop.run_until_complete(run_resume_pipeline(
+            path, os.path.splitext(path)[1].lower(), use_vision=mode == "vision",
+            content_hash=content_hash, progress=timer.progress
+        ))
+        result.update(status="completed", resume_data=outcome["data"], processing_method=outcome["processing_method"])
+    except Exception as e:
+        traceback.print_exc()
+        result["error"] = str(e)[:2000]
+    finally:
+        timer.finish()
+    return result
+
+
+def percentiles(values: list) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50": round(statistics.median(values), 3),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+    }
+
+
+class Ingest:
+    """Feeds files to the worker pool and records each result in the output and the manifest"""
+
+    def __init__(self, manifest_path: str, output: str, jsonl_path: Optional[str], user_id: Optional[str]):
+        self.output = output
+        self.jsonl_path = jsonl_path
+        self.user_id = user_id
+        self.conn = sqlite3.connect(manifest_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(MANIFEST_SCHEMA)
+        self.conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('ingest_id', ?)", (uuid.uuid4().hex,))
+        self.conn.commit()
+        # Names this manifest's history rows, so a rerun can tell which ones it already saved
+        self.ingest_id = self.conn.execute("SELECT value FROM meta WHERE name = 'ingest_id'").fetchone()[0]
+        self.jsonl = None
+        self.stage_seconds: Dict[str, list] = {}
+        self.counts = {"completed": 0, "failed": 0}
+        if output == "jsonl":
+            self._recover_jsonl()
+            self.jsonl = open(jsonl_path, "a", encoding="utf-8")
+
+    def _recover_jsonl(self) -> None:
+        """Lines written just before a crash may be missing from the manifest; mark them done"""
+        if not os.path.exists(self.jsonl_path):
+            return
+        with open(self.jsonl_path, encoding="utf-8") as f, self.conn:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut off mid-write; its file runs again
+                self.conn.execute(
+                    "INSERT INTO files (path, content_hash, status, processing_method, updated_at)"
+                    " VALUES (?, ?, 'done', ?, ?) ON CONFLICT (path) DO UPDATE SET status = 'done'",
+                    (record["path"], record.get("content_hash"), record.get("processing_method"), time.time())
+                )
+
+    def _import_key(self, path: str) -> str:
+        return f"ingest:{self.ingest_id}:{hashlib.sha256(path.encode()).hexdigest()[:32]}"
+
+    async def recover_saving(self) -> None:
+        """Files a stopped run left saving: done if their history row was committed, otherwise run again"""
+        saving = [path for path, in self.conn.execute("SELECT path FROM files WHERE status = 'saving'").fetchall()]
+        if not saving:
+            return
+        found = await find_imported([self._import_key(path) for path in saving])
+        with self.conn:
+            for path in saving:
+                history_id = found.get(self._import_key(path))
+                if history_id:
+                    self.conn.execute(
+                        "UPDATE files SET status = 'done', history_id = ?, updated_at = ? WHERE path = ?",
+                        (history_id, time.time(), path)
+                    )
+                else:
+                    self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def close(self) -> None:
+        if self.jsonl:
+            self.jsonl.close()
+        self.conn.close()
+
+    def todo(self, paths: list, retry_failed: bool) -> list:
+        skip = ("done", "failed") if not retry_failed else ("done",)
+        finished = {
+            path for path, status in self.conn.execute("SELECT path, status FROM files").fetchall()
+            if status in skip
+        }
+        return [path for path in paths if path not in finished]
+
+    async def record(self, result: dict) -> None:
+        history_id = None
+        if result["status"] == "completed":
+            started = time.perf_counter()
+            try:
+                history_id = await self._write(result)
+            except Exception as e:
+                result.update(status="failed", error=f"save: {e}")
+            result["stages"]["save"] = time.perf_counter() - started
+        for stage, seconds in result["stages"].items():
+            self.stage_seconds.setdefault(stage, []).append(seconds)
+        self.counts[result["status"]] += 1
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (path, content_hash, status, processing_method, history_id, error,"
+                " stages, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (result["path"], result["content_hash"], "done" if result["status"] == "completed" else "failed",
+                 result["processing_method"], history_id, result["error"],
+                 json.dumps({stage: round(seconds, 3) for stage, seconds in result["stages"].items()}), time.time())
+            )
+
+    async def _write(self, result: dict) -> Optional[int]:
+        path = result["path"]
+        if self.output == "jsonl":
+            self.jsonl.write(json.dumps({
+                "path": path,
+                "filename": os.path.basename(path),
+                "content_hash": result["content_hash"],
+                "processing_method": result["processing_method"],
+                "resume_data": result["resume_data"],
+            }) + "\n")
+            self.jsonl.flush()
+            return None
+        fields = dict(
+            filename=os.path.basename(path),
+            resume_data=result["resume_data"],
+            file_size=os.path.getsize(path),
+            original_file_type=os.path.splitext(path)[1].lstrip(".").lower(),
+            user_id=self.user_id,
+            status="completed"
+        )
+        if models.HAS_PROCESSING_METHOD_COLUMN:
+            fields["processing_method"] = result["processing_method"]
+        # Recorded before the insert: a crash after it leaves the row findable by its import key
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (path, content_hash, status, processing_method, updated_at)"
+                " VALUES (?, ?, 'saving', ?, ?)",
+                (path, result["content_hash"], result["processing_method"], time.time())
+            )
+        return await history_writer.save(fields, self._import_key(path))
+
+    async def run(self, paths: list, mode: str, concurrency: int) -> dict:
+        started = time.perf_counter()
+        pending = iter(paths)
+        done = 0
+        # spawn: workers must not inherit the parent's event loop, database pools or sqlite handles
+        context = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=concurrency, mp_context=context, initializer=_init_worker)
+        loop = asyncio.get_running_loop()
+
+        async def feed():
+            nonlocal pool, done
+            for path in pending:
+                current = pool
+                try:
+                    result = await loop.run_in_executor(current, process_file, path, mode)
+                except BrokenProcessPool as e:
+                    # A worker died (out of memory, killed): the files in flight are failed, later ones get a new pool
+                    result = {"path": path, "status": "failed", "content_hash": None, "resume_data": None,
+                              "processing_method": None, "stages": {}, "error": f"worker died: {e}"}
+                    if pool is current:
+                        current.shutdown(wait=False)
+                        pool = ProcessPoolExecutor(max_workers=concurrency, mp_context=context, initializer=_init_worker)
+                await self.record(result)
+                done += 1
+                seconds = sum(result["stages"].values())
+                print(f"[{done}/{len(paths)}] {os.path.basename(path)}: {result['status']} "
+                      f"{result['processing_method'] or result['error']} in {seconds:.1f}s")
+
+        try:
+            await asyncio.gather(*(feed() for _ in range(concurrency)))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        elapsed = time.perf_counter() - started
+        return {
+            "files": done,
+            "completed": self.counts["completed"],
+            "failed": self.counts["failed"],
+            "elapsed_seconds": round(elapsed, 1),
+            "files_per_minute": round(done * 60 / elapsed, 1) if elapsed else 0.0,
+            "stages": {stage: percentiles(seconds) for stage, seconds in self.stage_seconds.items()},
+        }
+
+
+async def ingest(args, paths: list) -> dict:
+    ingest_run = Ingest(args.manifest, args.output, args.jsonl_path, args.user_id)
+    try:
+        if args.output == "db":
+            await ingest_run.recover_saving()
+        todo = ingest_run.todo(paths, args.retry_failed)
+        print(f"{len(paths)} resumes found, {len(paths) - len(todo)} already in the manifest, {len(todo)} to process")
+        if args.output == "db":
+            await history_writer.start()
+        try:
+            return await ingest_run.run(todo, args.mode, args.concurrency)
+        finally:
+            if args.output == "db":
+                await history_writer.stop()
+                await async_engine.dispose()
+    finally:
+        ingest_run.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="Directory of PDF/DOC/DOCX resumes (searched recursively)")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--mode", choices=("vision", "text"), default="vision",
+                        help="vision: same routing as uploads with use_vision on; text: text path only")
+    parser.add_argument("--output", choices=("db", "jsonl"), default="db",
+                        help="db: ResumeHistory rows in DATABASE_URL; jsonl: one parsed resume per line")
+    parser.add_argument("--jsonl-path", help="Output file for --output jsonl (appended to)")
+    parser.add_argument("--manifest", default="ingest_manifest.db", help="Progress manifest used to resume a run")
+    parser.add_argument("--user-id", help="user_id stored on the history rows")
+    parser.add_argument("--retry-failed", action="store_true", help="Process files that failed in an earlier run")
+    args = parser.parse_args()
+
+    if args.output == "jsonl" and not args.jsonl_path:
+        parser.error("--output jsonl needs --jsonl-path")
+    paths = [os.path.abspath(path) for path in find_resumes(args.directory)]
+    if not paths:
+        parser.error(f"No resumes found under {args.directory}")
+    if args.output == "db":
+        init_db()
+    summary = asyncio.run(ingest(args, paths))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,58 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from auth.user_routes import router as auth_router
 from utils.logger import logger
-from app.database import init_db
+from app.database import async_engine, init_db
 from app.resume_router import router as resume_router
+from app.services.azure_clients import close_async_client
+from app.services.docx_conversion import docx_converter
+from app.services.history_writer import history_writer
+from app.services.job_scheduler import scheduler
+from app.services.image_processors import shutdown_render_pool
+from app.services.task_store import run_eviction_loop, task_store
+from app.services.upload_storage import RequestSizeLimitMiddleware
+from app.config import TASK_EVICT_INTERVAL_SECONDS, UPLOAD_MAX_BYTES
+
+# Largest request body accepted: a full 10-file batch at the per-file limit plus multipart overhead
+MAX_REQUEST_BYTES = 10 * UPLOAD_MAX_BYTES + 1024 * 1024
 
 app = FastAPI()
 
+
+# Added before CORS, so CORS wraps it and the 413 still carries CORS headers. It counts the raw
+# body, so chunked uploads without a Content-Length are cut off too
+app.add_middleware(RequestSizeLimitMiddleware, max_bytes=MAX_REQUEST_BYTES)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],  # or ["*"] for development
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After"],
 )
+
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    await history_writer.start()
+    await scheduler.start()
+    app.state.eviction_task = asyncio.create_task(
+        run_eviction_loop(task_store, TASK_EVICT_INTERVAL_SECONDS)
+    )
     logger.info("Server started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    app.state.eviction_task.cancel()
+    await scheduler.stop()
+    await history_writer.stop()
+    await async_engine.dispose()
+    await close_async_client()
+    shutdown_render_pool()
+    await asyncio.to_thread(docx_converter.shutdown)
+    task_store.close()
     logger.info("Server shutting down")
 
 app.include_router(auth_router, prefix="/auth")
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Settings are read at import time: point every database the app opens at a scratch directory
+_scratch = tempfile.mkdtemp(prefix="resume-formatter-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_scratch, 'resume.db')}")
+os.environ.setdefault("RESULT_CACHE_PATH", os.path.join(_scratch, "result_cache.db"))
+os.environ.setdefault("TASK_STORE_PATH", os.path.join(_scratch, "tasks.db"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
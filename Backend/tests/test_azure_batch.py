@@ -0,0 +1,228 @@
+import asyncio
+import json
+import sqlite3
+
+import fitz
+import httpx
+import pytest
+
+from app.database import init_db
+from app.services import azure_batch
+from app.services.azure_batch import AzureBatchClient, BatchImport
+from app.services.azure_resilience import AzureHTTPError
+from app.services.result_cache import hash_file, result_cache
+
+RESUME = {"name": "Jane Doe", "email": "jane@example.com", "skills": [{"Cloud": ["AWS"]}],
+          "experience_data": [{"company": "Acme", "role": "Engineer"}]}
+
+
+class FakeAzure:
+    """Files and batches routes of an Azure OpenAI resource, kept in memory.
+
+    A job reports in_progress on its first poll and finishes on the next. With expire_first
+    the first job to finish expires before running its last line; with fail_next_create the
+    next job is created but the response is a 500, as when the reply is lost.
+    """
+
+    def __init__(self, expire_first: bool = False, fail_next_create: bool = False):
+        self.files = {}
+        self.batches = {}
+        self.polls = {}
+        self.expire_first = expire_first
+        self.fail_next_create = fail_next_create
+        self._ids = 0
+
+    def _new_id(self, prefix: str) -> str:
+        self._ids += 1
+        return f"{prefix}-{self._ids}"
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "POST" and path.endswith("/openai/files"):
+            body = request.content.decode()
+            file_id = self._new_id("file")
+            self.files[file_id] = [json.loads(line) for line in body.splitlines() if line.startswith('{"custom_id"')]
+            return httpx.Response(200, json={"id": file_id, "status": "processed"})
+        if request.method == "POST" and path.endswith("/openai/batches"):
+            batch_id = self._new_id("batch")
+            self.batches[batch_id] = {
+                "id": batch_id, "input_file_id": json.loads(request.content)["input_file_id"], "status": "validating"
+            }
+            self.polls[batch_id] = 0
+            if self.fail_next_create:
+                self.fail_next_create = False
+                return httpx.Response(500, text="upstream reset")
+            return httpx.Response(200, json=self.batches[batch_id])
+        if request.method == "GET" and path.endswith("/openai/batches"):
+            return httpx.Response(200, json={"data": list(self.batches.values())[::-1], "has_more": False})
+        if request.method == "GET" and "/openai/batches/" in path:
+            batch = self.batches[path.rsplit("/", 1)[1]]
+            self.polls[batch["id"]] += 1
+            if self.polls[batch["id"]] == 1:
+                batch["status"] = "in_progress"
+            elif batch["status"] == "in_progress":
+                self._finish(batch)
+            return httpx.Response(200, json=batch)
+        if request.method == "GET" and path.endswith("/content"):
+            lines = self.files[path.split("/")[-2]]
+            return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines).encode())
+        return httpx.Response(404)
+
+    def _finish(self, batch: dict) -> None:
+        lines = self.files[batch["input_file_id"]]
+        expire, self.expire_first = self.expire_first, False
+        if expire:
+            lines = lines[:-1]
+        output = []
+        for line in lines:
+            assert line["url"] == "/chat/completions" and line["body"]["model"] == "gpt-4o-batch"
+            content = dict(RESUME, name=f"Person {line['custom_id']}")
+            output.append({"custom_id": line["custom_id"], "error": None, "response": {"status_code": 200, "body": {
+                "choices": [{"finish_reason": "stop", "message": {"content": "```json\n" + json.dumps(content) + "\n```"}}],
+                "usage": {"prompt_tokens": 900, "completion_tokens": 300},
+            }}})
+        output_file_id = self._new_id("file")
+        self.files[output_file_id] = output
+        batch.update(status="expired" if expire else "completed", output_file_id=output_file_id)
+
+
+@pytest.fixture(autouse=True)
+def batch_settings(monkeypatch):
+    init_db()
+    monkeypatch.setattr(azure_batch, "batch_deployment", lambda: "gpt-4o-batch")
+    monkeypatch.setattr(azure_batch, "RESULT_CACHE_ENABLED", False)
+
+
+def make_client(fake: FakeAzure) -> AzureBatchClient:
+    client = AzureBatchClient("https://fake.openai.azure.com", "key", max_retries=2, backoff_base=0, backoff_max=0)
+    client._client = httpx.Client(transport=httpx.MockTransport(fake.handler))
+    return client
+
+
+def make_resumes(directory, count: int) -> list:
+    paths = []
+    for n in range(count):
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), f"Resume {n} in {directory.name}\nSkills: AWS, Python", fontsize=11)
+        path = directory / f"resume_{n}.pdf"
+        doc.save(str(path))
+        doc.close()
+        paths.append(str(path))
+    return paths
+
+
+def file_rows(work_dir) -> list:
+    with sqlite3.connect(str(work_dir / "manifest.db")) as conn:
+        return conn.execute("SELECT status, history_id FROM files ORDER BY id").fetchall()
+
+
+def test_expired_lines_are_requeued_until_every_file_is_saved(tmp_path):
+    fake = FakeAzure(expire_first=True)
+    batch_import = BatchImport(str(tmp_path / "work"), make_client(fake), mode="text", max_requests=2)
+    paths = make_resumes(tmp_path, 3)
+
+    assert batch_import.scan(paths) == 3
+    assert batch_import.prepare() == 3
+    assert batch_import.submit() == 2
+    assert batch_import.poll() == 2
+    assert batch_import.poll() == 0
+    assert batch_import.ingest() == 2
+    assert batch_import.stats()["files"] == {"done": 2, "pending": 1}
+
+    summary = batch_import.run(paths, poll_seconds=0)
+    batch_import.close()
+
+    assert summary["files"] == {"done": 3}
+    assert summary["batches"] == {"expired": 1, "completed": 2}
+    assert summary["prompt_tokens"] == 3 * 900
+    assert all(history_id for _, history_id in file_rows(tmp_path / "work"))
+
+
+def test_job_created_before_a_lost_reply_is_not_created_again(tmp_path):
+    fake = FakeAzure(fail_next_create=True)
+    client = make_client(fake)
+    batch_import = BatchImport(str(tmp_path / "work"), client, mode="text")
+    batch_import.scan(make_resumes(tmp_path, 2))
+    batch_import.prepare()
+    with pytest.raises(AzureHTTPError):
+        batch_import.submit()
+    batch_import.close()
+    assert len(fake.batches) == 1
+
+    rerun = BatchImport(str(tmp_path / "work"), client, mode="text")
+    assert rerun.submit() == 1
+    assert len(fake.batches) == 1
+    assert rerun.stats()["batches"] == {"submitted": 1}
+    rerun.close()
+
+
+def test_cached_files_survive_a_stop_before_they_are_saved(tmp_path, monkeypatch):
+    monkeypatch.setattr(azure_batch, "RESULT_CACHE_ENABLED", True)
+    kept, evicted = make_resumes(tmp_path, 2)
+    batch_import = BatchImport(str(tmp_path / "work"), None, mode="text")
+    result_cache.put(batch_import._cache_key(hash_file(kept)), RESUME)
+    result_cache.put(batch_import._cache_key(hash_file(evicted)), RESUME)
+    batch_import.scan([kept, evicted])
+    batch_import.close()  # stopped before ingest
+    result_cache.clear()  # ...and one entry is evicted meanwhile
+    result_cache.put(batch_import._cache_key(hash_file(kept)), RESUME)
+
+    rerun = BatchImport(str(tmp_path / "work"), None, mode="text")
+    assert rerun.ingest() == 1
+    assert [status for status, _ in file_rows(tmp_path / "work")] == ["done", "pending"]
+    rerun.close()
+
+
+def test_hybrid_text_fallback_is_saved_but_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(azure_batch, "RESULT_CACHE_ENABLED", True)
+    path, = make_resumes(tmp_path, 1)
+    batch_import = BatchImport(str(tmp_path / "work"), None, mode="auto")
+    content_hash = hash_file(path)
+    with batch_import.conn:
+        cursor = batch_import.conn.execute(
+            "INSERT INTO files (path, content_hash, file_size, status, processing_method, parts, updated_at)"
+            " VALUES (?, ?, 1, 'submitted', 'hybrid:1/2p:3ms', 2, 0)",
+            (path, content_hash)
+        )
+        file_id = cursor.lastrowid
+        batch_import.conn.executemany(
+            "INSERT INTO requests (custom_id, file_id, part, chunk, content, error) VALUES (?, ?, ?, 'b', ?, ?)",
+            [(f"{file_id}-0", file_id, 0, json.dumps(RESUME), None),
+             (f"{file_id}-1", file_id, 1, None, '{"code": "content_filter"}')]
+        )
+
+    assert batch_import.ingest() == 1
+    assert file_rows(tmp_path / "work")[0][0] == "done"
+    assert result_cache.get(batch_import._cache_key(content_hash)) is None
+    batch_import.close()
+
+
+def test_files_saved_before_a_crash_are_not_saved_again(tmp_path, monkeypatch):
+    fake = FakeAzure()
+    batch_import = BatchImport(str(tmp_path / "work"), make_client(fake), mode="text")
+    batch_import.scan(make_resumes(tmp_path, 2))
+    batch_import.prepare()
+    batch_import.submit()
+    batch_import.poll()
+    batch_import.poll()
+
+    save_history = azure_batch._save_history
+
+    async def crash_after_insert(rows):
+        await save_history(rows)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(azure_batch, "_save_history", crash_after_insert)
+    with pytest.raises(KeyboardInterrupt):
+        batch_import.ingest()
+    batch_import.close()
+    assert [status for status, _ in file_rows(tmp_path / "work")] == ["saving", "saving"]
+    monkeypatch.setattr(azure_batch, "_save_history", save_history)
+
+    rerun = BatchImport(str(tmp_path / "work"), make_client(fake), mode="text")
+    assert rerun.ingest() == 0
+    rows = file_rows(tmp_path / "work")
+    assert [status for status, _ in rows] == ["done", "done"]
+    keys = [rerun._import_key(file_id) for file_id in (1, 2)]
+    assert sorted(asyncio.run(azure_batch._find_imported(keys)).values()) == sorted(h for _, h in rows)
+    rerun.close()
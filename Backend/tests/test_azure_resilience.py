@@ -0,0 +1,265 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services import azure_resilience
+from app.services.azure_resilience import (
+    AzureGuard,
+    AzureHTTPError,
+    AzureUnavailableError,
+    CircuitBreaker,
+    Deployment,
+    TokenBucket,
+    parse_retry_after,
+)
+
+PAYLOAD = {"messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 100}
+
+
+class FakeClock:
+    """Stands in for time.monotonic and asyncio.sleep: sleeping advances the clock at once"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += max(seconds, 0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(azure_resilience, "time", SimpleNamespace(monotonic=clock.monotonic, time=time.time))
+    monkeypatch.setattr(azure_resilience, "asyncio", SimpleNamespace(
+        sleep=clock.sleep, Lock=asyncio.Lock, CancelledError=asyncio.CancelledError
+    ))
+    return clock
+
+
+def make_deployment(name: str, kinds=("text", "vision"), rpm: int = 0, tpm: int = 0) -> Deployment:
+    return Deployment(name, f"https://{name}.example", "key", kinds, rpm, tpm, 5, 30)
+
+
+def make_guard(*deployments, max_retries: int = 3) -> AzureGuard:
+    return AzureGuard(list(deployments), "least_tokens", max_retries, 0.5, 8)
+
+
+class Script:
+    """An attempt callable that answers from a per-deployment list of results or exceptions"""
+
+    def __init__(self, **outcomes):
+        self.outcomes = {name: list(results) for name, results in outcomes.items()}
+        self.calls = []
+
+    async def __call__(self, deployment: Deployment) -> str:
+        self.calls.append(deployment.name)
+        outcome = self.outcomes[deployment.name].pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+# TokenBucket
+
+def test_bucket_admits_up_to_capacity_then_waits_for_refill(clock):
+    bucket = TokenBucket(60)  # one per second
+
+    async def take(count):
+        return [await bucket.acquire(1) for _ in range(count)]
+
+    assert asyncio.run(take(60)) == [0.0] * 60
+    assert asyncio.run(take(1)) == [pytest.approx(1.0)]
+    assert bucket.waited_seconds == pytest.approx(1.0)
+
+
+def test_bucket_caps_large_requests_at_capacity(clock):
+    bucket = TokenBucket(1000)
+    assert asyncio.run(bucket.acquire(5000)) == 0.0
+    assert bucket.tokens == 0
+    assert asyncio.run(bucket.acquire(500)) == pytest.approx(30.0)
+
+
+def test_bucket_pause_holds_callers_back(clock):
+    bucket = TokenBucket(600)
+    bucket.pause(2.5)
+    assert bucket.paused()
+    assert asyncio.run(bucket.acquire(1)) == pytest.approx(2.5)
+    assert not bucket.paused()
+
+
+def test_disabled_bucket_never_waits(clock):
+    bucket = TokenBucket(0)
+    assert asyncio.run(bucket.acquire(10 ** 9)) == 0.0
+    assert clock.sleeps == []
+
+
+# CircuitBreaker
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("d/text", failure_threshold=3, cooldown=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.available()
+    with pytest.raises(AzureUnavailableError):
+        breaker.before_call()
+
+
+def test_half_open_breaker_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("d/text", failure_threshold=1, cooldown=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    assert not breaker.available()
+    with pytest.raises(AzureUnavailableError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.available()
+
+
+def test_failed_probe_reopens_for_a_full_cooldown(clock):
+    breaker = CircuitBreaker("d/text", failure_threshold=2, cooldown=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 31
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.retry_in() == pytest.approx(30)
+    assert breaker.times_opened == 2
+
+
+def test_cancelled_probe_is_released(clock):
+    breaker = CircuitBreaker("d/text", failure_threshold=1, cooldown=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.release_probe()
+    assert breaker.available()
+
+
+# AzureGuard.call
+
+def test_retryable_failure_fails_over_to_another_deployment(clock):
+    first, second = make_deployment("east"), make_deployment("west")
+    guard = make_guard(first, second)
+    attempt = Script(east=[AzureHTTPError(503, "busy")], west=["ok"])
+
+    assert asyncio.run(guard.call("text", PAYLOAD, attempt)) == "ok"
+    assert attempt.calls == ["east", "west"]
+    assert guard.failovers == 1
+    assert clock.sleeps == []
+    assert first.breaker("text").failures == 1
+    assert first.outstanding_tokens == second.outstanding_tokens == 0
+
+
+def test_throttled_deployment_is_paused_not_tripped(clock):
+    first, second = make_deployment("east"), make_deployment("west")
+    guard = make_guard(first, second)
+    attempt = Script(east=[AzureHTTPError(429, "slow down", retry_after=7)], west=["ok"])
+
+    assert asyncio.run(guard.call("text", PAYLOAD, attempt)) == "ok"
+    assert guard.throttled == 1
+    assert first.breaker("text").failures == 0
+    assert first.paused()
+    # The paused deployment ranks last while its Retry-After runs
+    assert guard.pick("text") is second
+
+
+def test_single_deployment_honours_retry_after(clock):
+    only = make_deployment("only")
+    guard = make_guard(only)
+    attempt = Script(only=[AzureHTTPError(429, "slow down", retry_after=4), "ok"])
+
+    assert asyncio.run(guard.call("text", PAYLOAD, attempt)) == "ok"
+    # The backoff honours Retry-After (plus jitter), and the paused buckets hold the retry too
+    assert clock.sleeps and clock.sleeps[0] >= 4
+    assert clock.now - 1000.0 >= 4
+
+
+def test_retry_after_header_forms():
+    assert parse_retry_after(httpx.Headers({"retry-after-ms": "1500"})) == 1.5
+    assert parse_retry_after(httpx.Headers({"retry-after": "3"})) == 3.0
+    assert parse_retry_after(httpx.Headers({})) is None
+
+
+def test_bad_request_is_not_retried(clock):
+    only = make_deployment("only")
+    guard = make_guard(only)
+    attempt = Script(only=[AzureHTTPError(400, "content filter")])
+
+    with pytest.raises(AzureHTTPError):
+        asyncio.run(guard.call("text", PAYLOAD, attempt))
+    assert attempt.calls == ["only"]
+    assert only.breaker("text").state == "closed"
+
+
+def test_gives_up_after_max_retries(clock):
+    only = make_deployment("only")
+    guard = make_guard(only, max_retries=2)
+    attempt = Script(only=[httpx.ReadTimeout("slow")] * 3)
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(guard.call("text", PAYLOAD, attempt))
+    assert len(attempt.calls) == 3
+    assert guard.failed == 1
+
+
+def test_repeated_failures_open_the_circuit_mid_call(clock):
+    only = make_deployment("only")
+    guard = make_guard(only, max_retries=10)
+    attempt = Script(only=[AzureHTTPError(502, "bad gateway")] * 5)
+
+    with pytest.raises(AzureUnavailableError):
+        asyncio.run(guard.call("text", PAYLOAD, attempt))
+    assert len(attempt.calls) == 5
+    assert only.breaker("text").state == "open"
+
+
+def test_no_retry_once_content_was_streamed(clock):
+    first, second = make_deployment("east"), make_deployment("west")
+    guard = make_guard(first, second)
+    attempt = Script(east=[httpx.ReadError("reset")], west=["ok"])
+
+    with pytest.raises(httpx.ReadError):
+        asyncio.run(guard.call("text", PAYLOAD, attempt, can_retry=lambda: False))
+    assert attempt.calls == ["east"]
+
+
+def test_open_circuits_on_every_deployment_fail_fast(clock):
+    first, second = make_deployment("east"), make_deployment("west")
+    guard = make_guard(first, second)
+    for deployment in (first, second):
+        for _ in range(5):
+            deployment.breaker("vision").record_failure()
+    attempt = Script(east=["ok"], west=["ok"])
+
+    with pytest.raises(AzureUnavailableError):
+        asyncio.run(guard.call("vision", PAYLOAD, attempt))
+    assert attempt.calls == []
+    # Circuits are per kind: text still goes through
+    assert asyncio.run(guard.call("text", PAYLOAD, attempt)) == "ok"
+
+
+def test_kind_goes_only_to_deployments_serving_it(clock):
+    text_only, vision = make_deployment("text-only", kinds=("text",)), make_deployment("vision")
+    guard = make_guard(text_only, vision)
+    attempt = Script(vision=["ok"])
+    assert asyncio.run(guard.call("vision", PAYLOAD, attempt)) == "ok"
+    assert attempt.calls == ["vision"]
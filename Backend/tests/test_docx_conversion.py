@@ -0,0 +1,60 @@
+import pytest
+
+from app.services import resume_parser
+
+
+@pytest.fixture
+def converters(monkeypatch):
+    calls = []
+
+    def converter(name, available=True, fails=False):
+        def convert(path):
+            calls.append(name)
+            if fails:
+                raise RuntimeError(f"{name} broke")
+            return f"{path}.{name}.pdf"
+        return lambda: available, convert
+
+    def install(order, **specs):
+        monkeypatch.setattr(resume_parser, "DOCX_CONVERTER_ORDER", order)
+        monkeypatch.setattr(resume_parser, "DOCX_CONVERTERS", {
+            name: converter(name, **spec) for name, spec in specs.items()
+        })
+        return calls
+
+    return install
+
+
+def test_auto_order_follows_uno(monkeypatch):
+    monkeypatch.setattr(resume_parser, "DOCX_CONVERTER_ORDER", "auto")
+    monkeypatch.setattr(resume_parser, "HAS_UNO", True)
+    assert resume_parser.docx_converter_order()[0] == "libreoffice"
+    monkeypatch.setattr(resume_parser, "HAS_UNO", False)
+    assert resume_parser.docx_converter_order()[0] == "aspose"
+
+
+def test_configured_order_is_used(converters):
+    calls = converters("libreoffice, aspose", aspose={}, libreoffice={})
+    assert resume_parser.convert_docx_to_pdf("cv.docx") == "cv.docx.libreoffice.pdf"
+    assert calls == ["libreoffice"]
+
+
+def test_unavailable_and_failing_converters_fall_through(converters):
+    calls = converters(
+        "aspose,libreoffice,word",
+        aspose={"available": False}, libreoffice={"fails": True}, word={},
+    )
+    assert resume_parser.convert_docx_to_pdf("cv.docx") == "cv.docx.word.pdf"
+    assert calls == ["libreoffice", "word"]
+
+
+def test_errors_from_every_converter_are_reported(converters):
+    converters("aspose,libreoffice", aspose={"fails": True}, libreoffice={"fails": True})
+    with pytest.raises(RuntimeError, match="aspose: aspose broke; libreoffice: libreoffice broke"):
+        resume_parser.convert_docx_to_pdf("cv.docx")
+
+
+def test_unknown_converter_is_rejected(converters):
+    converters("libreoffice,pandoc", libreoffice={})
+    with pytest.raises(ValueError, match="pandoc"):
+        resume_parser.convert_docx_to_pdf("cv.docx")
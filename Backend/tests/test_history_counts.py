@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models import Base, HistoryCount
+from app.services.history_counts import (
+    ALL_SCOPE,
+    apply_count_deltas,
+    count_deltas,
+    get_history_count,
+)
+
+
+def run_with_session(tmp_path, *steps):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'counts.db'}")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all, tables=[HistoryCount.__table__])
+        results = []
+        for step in steps:
+            async with AsyncSession(engine) as db:
+                results.append(await step(db))
+                await db.commit()
+        await engine.dispose()
+        return results
+
+    return asyncio.run(main())
+
+
+def test_counts_are_created_then_adjusted(tmp_path):
+    async def insert_two(db):
+        await apply_count_deltas(db, count_deltas(["u1", None]))
+
+    async def delete_one(db):
+        await apply_count_deltas(db, count_deltas(["u1"], sign=-1))
+
+    async def read(db):
+        return await get_history_count(db), await get_history_count(db, "u1")
+
+    results = run_with_session(tmp_path, insert_two, read, insert_two, delete_one, read)
+    assert results[1] == (2, 1)
+    assert results[4] == (3, 1)
+
+
+def test_new_scope_never_starts_negative(tmp_path):
+    async def delete_unknown(db):
+        await apply_count_deltas(db, {ALL_SCOPE: -1})
+        return await get_history_count(db)
+
+    assert run_with_session(tmp_path, delete_unknown) == [0]
+
+
+def test_postgresql_uses_one_upsert_per_scope():
+    class RecordingSession:
+        def __init__(self):
+            self.statements = []
+
+        def get_bind(self):
+            return SimpleNamespace(dialect=postgresql.dialect())
+
+        async def execute(self, statement):
+            self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+
+    db = RecordingSession()
+    asyncio.run(apply_count_deltas(db, count_deltas(["u1"])))
+    assert len(db.statements) == 2
+    for sql in db.statements:
+        assert sql.startswith("INSERT INTO resume_history_counts")
+        assert "ON CONFLICT (scope) DO UPDATE SET count = (resume_history_counts.count +" in sql
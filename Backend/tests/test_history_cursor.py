@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import delete
+
+from app.database import AsyncSessionLocal, async_engine, init_db
+from app.models import ResumeHistory
+from app.resume_router import get_resume_history
+from app.services.history_writer import history_writer
+
+
+def page(db, user_id, cursor=None):
+    response = Response()
+    return response, get_resume_history(response, db=db, limit=2, skip=0, cursor=cursor, user_id=user_id)
+
+
+def test_cursor_survives_deleting_the_row_it_came_from():
+    init_db()
+
+    async def main():
+        for index in range(5):
+            await history_writer.save({
+                "filename": f"{index}.pdf", "file_size": 1, "status": "completed",
+                "original_file_type": "pdf", "resume_data": {}, "user_id": "cursor-test",
+            })
+        try:
+            async with AsyncSessionLocal() as db:
+                response, rows = page(db, "cursor-test")
+                first = [row.filename for row in await rows]
+                cursor = response.headers["X-Next-Cursor"]
+                await db.execute(delete(ResumeHistory).where(ResumeHistory.filename == first[-1]))
+                await db.commit()
+                response, rows = page(db, "cursor-test", cursor)
+                second = [row.filename for row in await rows]
+                with pytest.raises(HTTPException):
+                    await page(db, "cursor-test", "not-a-cursor")[1]
+            return first, second
+        finally:
+            await async_engine.dispose()
+
+    first, second = asyncio.run(main())
+    assert first == ["4.pdf", "3.pdf"]
+    assert second == ["2.pdf", "1.pdf"]
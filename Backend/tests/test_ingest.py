@@ -0,0 +1,90 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.database import async_engine, init_db
+from app.services import history_writer as history_writer_module
+from app.services.history_writer import find_imported
+from cli.ingest import Ingest
+
+RESUME = {"name": "Jane Doe", "skills": [{"Cloud": ["AWS"]}]}
+
+
+def completed(path) -> dict:
+    return {"path": str(path), "status": "completed", "content_hash": "abc", "resume_data": RESUME,
+            "processing_method": "enhanced_text_comprehensive", "stages": {"azure": 1.0}, "error": None}
+
+
+def manifest_rows(manifest) -> list:
+    with sqlite3.connect(str(manifest)) as conn:
+        return conn.execute("SELECT path, status, history_id FROM files").fetchall()
+
+
+async def record(manifest, result) -> None:
+    ingest_run = Ingest(str(manifest), "db", None, None)
+    try:
+        await ingest_run.recover_saving()
+        await ingest_run.record(result)
+    finally:
+        ingest_run.close()
+        await async_engine.dispose()
+
+
+def test_row_saved_before_a_crash_is_marked_done_on_rerun(tmp_path, monkeypatch):
+    init_db()
+    resume = tmp_path / "resume.pdf"
+    resume.write_bytes(b"%PDF-1.4")
+    manifest = tmp_path / "manifest.db"
+    save = history_writer_module.history_writer.save
+
+    async def crash_after_insert(fields, import_key=None):
+        await save(fields, import_key)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(history_writer_module.history_writer, "save", crash_after_insert)
+    with pytest.raises(KeyboardInterrupt):
+        asyncio.run(record(manifest, completed(resume)))
+    assert [status for _, status, _ in manifest_rows(manifest)] == ["saving"]
+    monkeypatch.undo()
+
+    async def rerun():
+        ingest_run = Ingest(str(manifest), "db", None, None)
+        try:
+            await ingest_run.recover_saving()
+            return ingest_run.todo([str(resume)], retry_failed=False), ingest_run._import_key(str(resume))
+        finally:
+            ingest_run.close()
+            await async_engine.dispose()
+
+    todo, key = asyncio.run(rerun())
+    assert todo == []
+    (_, status, history_id), = manifest_rows(manifest)
+    assert status == "done"
+
+    async def lookup():
+        try:
+            return await find_imported([key])
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(lookup()) == {key: history_id}
+
+
+def test_file_not_saved_before_a_crash_runs_again(tmp_path, monkeypatch):
+    init_db()
+    resume = tmp_path / "resume.pdf"
+    resume.write_bytes(b"%PDF-1.4")
+    manifest = tmp_path / "manifest.db"
+
+    async def crash_before_insert(fields, import_key=None):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(history_writer_module.history_writer, "save", crash_before_insert)
+    with pytest.raises(KeyboardInterrupt):
+        asyncio.run(record(manifest, completed(resume)))
+    monkeypatch.undo()
+
+    asyncio.run(record(manifest, completed(resume)))
+    (_, status, history_id), = manifest_rows(manifest)
+    assert status == "done" and history_id
@@ -0,0 +1,29 @@
+import asyncio
+
+from app.services.job_scheduler import JobScheduler
+
+
+def test_stop_reports_running_and_queued_jobs_as_abandoned():
+    abandoned = []
+    finished = []
+
+    async def job(name):
+        await asyncio.sleep(0 if name == "quick" else 60)
+        finished.append(name)
+
+    async def main():
+        scheduler = JobScheduler(max_queue=10, workers=1, cpu_limit=1, io_limit=1)
+        await scheduler.start()
+        scheduler.submit(job, "quick", on_abandon=abandoned.append)
+        scheduler.submit(job, "slow", on_abandon=abandoned.append)
+        scheduler.submit(job, "queued", on_abandon=abandoned.append)
+        scheduler.submit(job, "untracked")
+        while scheduler.running == 0 or not finished:
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return scheduler.stats()
+
+    stats = asyncio.run(main())
+    assert finished == ["quick"]
+    assert abandoned == ["slow", "queued"]
+    assert stats["completed"] == 1 and stats["running"] == 0
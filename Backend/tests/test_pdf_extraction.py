@@ -0,0 +1,72 @@
+import fitz
+import pytest
+
+from app.services import resume_parser
+from app.services.resume_parser import extract_text_from_pdf
+
+
+def write_pdf(path, draw):
+    doc = fitz.open()
+    draw(doc.new_page())
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def underlined_page(page):
+    page.insert_textbox(fitz.Rect(50, 40, 550, 400), "Jane Doe\nSummary\nBuilt data platforms.", fontsize=10)
+    for y in (60, 120, 180):
+        page.draw_line((50, y), (550, y))
+
+
+def table_page(page):
+    columns, top, height = [50, 200, 350, 500], 100, 22
+    rows = [["Role", "Company", "Duration"], ["Engineer", "Acme", "2019-2021"], ["Lead", "Globex", "2021-2024"]]
+    for r, row in enumerate(rows):
+        for c, cell in enumerate(row):
+            page.insert_text((columns[c] + 4, top + r * height + 15), cell, fontsize=9)
+    for r in range(len(rows) + 1):
+        page.draw_line((columns[0], top + r * height), (columns[-1], top + r * height))
+    for x in columns:
+        page.draw_line((x, top), (x, top + len(rows) * height))
+
+
+def test_underlines_do_not_run_table_detection(tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        pytest.fail("find_tables ran on a page without a ruled grid")
+
+    monkeypatch.setattr(fitz.Page, "find_tables", fail)
+    text = extract_text_from_pdf(write_pdf(tmp_path / "underlined.pdf", underlined_page))
+    assert "Built data platforms." in text
+    assert "EXPERIENCE TABLE" not in text
+
+
+def test_ruled_table_keeps_its_rows(tmp_path):
+    text = extract_text_from_pdf(write_pdf(tmp_path / "table.pdf", table_page))
+    assert "HEADERS: Role | Company | Duration" in text
+    assert "TOTAL_EXPERIENCE_ROWS: 2" in text
+    assert "EXPERIENCE_ROW_2: Lead | Globex | 2021-2024" in text
+
+
+def test_grid_needs_rulings_both_ways():
+    assert not resume_parser._has_grid([(50, y, 550, y) for y in (60, 120, 180)])
+    assert resume_parser._has_grid([(50, 100, 550, 100), (50, 200, 550, 200), (50, 100, 50, 200), (550, 100, 550, 200)])
+    assert resume_parser._has_grid([(50, 100, 550, 200)])
+
+
+def test_docx_merged_cells_are_emitted_once(tmp_path):
+    from docx import Document
+
+    document = Document()
+    table = document.add_table(rows=2, cols=4)
+    for cell, text in zip(table.rows[0].cells, ["Role", "Company", "From", "To"]):
+        cell.text = text
+    for cell, text in zip(table.rows[1].cells, ["Lead", "", "2021", "2021"]):
+        cell.text = text
+    table.cell(1, 0).merge(table.cell(1, 1)).text = "Lead"
+    path = tmp_path / "resume.docx"
+    document.save(str(path))
+
+    text = resume_parser.extract_text_from_docx(str(path))
+    assert "HEADERS: Role | Company | From | To" in text
+    assert "EXPERIENCE_ROW_1: Lead | 2021 | 2021" in text
@@ -0,0 +1,43 @@
+import threading
+
+import fitz
+
+from app.services import image_processors
+from app.services.image_processors import get_render_pool, shutdown_render_pool
+
+
+def test_concurrent_first_calls_share_one_pool():
+    barrier = threading.Barrier(8)
+    pools = []
+
+    def first_call():
+        barrier.wait()
+        pools.append(get_render_pool())
+
+    threads = [threading.Thread(target=first_call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert len({id(pool) for pool in pools}) == 1
+    finally:
+        shutdown_render_pool()
+    assert image_processors._render_pool is None
+
+
+def test_pool_renders_pages_in_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_processors, "RENDER_WORKERS", 2)
+    doc = fitz.open()
+    for n in range(3):
+        doc.new_page(width=200 + n * 10, height=300)
+    path = str(tmp_path / "pages.pdf")
+    doc.save(path)
+    doc.close()
+    try:
+        sizes = [width for width, _, _ in image_processors._iter_pages(
+            image_processors._render_page, path, [0, 1, 2], 1.0
+        )]
+    finally:
+        shutdown_render_pool()
+    assert sizes == [200, 210, 220]
@@ -0,0 +1,64 @@
+from app.services.result_merge import merge_resume_results
+
+
+def test_first_non_empty_scalar_wins():
+    merged = merge_resume_results([
+        {"name": "", "email": "jane@example.com"},
+        {"name": "Jane Doe", "email": "other@example.com", "mobile": "9876543210"},
+    ])
+    assert merged["name"] == "Jane Doe"
+    assert merged["email"] == "jane@example.com"
+    assert merged["mobile"] == "9876543210"
+    assert merged["professional_experience"] == ""
+
+
+def test_skill_categories_are_joined_case_insensitively():
+    merged = merge_resume_results([
+        {"skills": [{"Cloud": ["AWS", "Azure"]}, {"Languages": ["Python"]}]},
+        {"skills": [{"cloud": ["azure ", "GCP"]}, {"Databases": "PostgreSQL"}]},
+    ])
+    assert merged["skills"] == [
+        {"Cloud": ["AWS", "Azure", "GCP"]},
+        {"Languages": ["Python"]},
+        {"Databases": ["PostgreSQL"]},
+    ]
+
+
+def test_lists_are_unioned_in_page_order():
+    merged = merge_resume_results([
+        {"certifications": ["AZ-900", "AWS SAA"], "education": [{"degree": "B.Tech"}]},
+        {"certifications": ["az-900", "CKA"], "education": [{"degree": "B.Tech"}, {"degree": "M.Tech"}]},
+    ])
+    assert merged["certifications"] == ["AZ-900", "AWS SAA", "CKA"]
+    assert merged["education"] == [{"degree": "B.Tech"}, {"degree": "M.Tech"}]
+
+
+def test_experience_split_across_chunks_is_folded_together():
+    merged = merge_resume_results([
+        {"experience_data": [
+            {"company": "Acme", "role": "Engineer", "startDate": "2019", "responsibilities": ["Built APIs"]},
+            {"company": "Globex", "role": "Lead", "startDate": "2021", "endDate": "", "responsibilities": ["Led team"]},
+        ]},
+        {"experience_data": [
+            {"company": "globex", "role": "Lead", "startDate": "2021", "endDate": "2024",
+             "responsibilities": ["Led team", "Hired engineers"]},
+            {"company": "Initech", "role": "Architect", "startDate": "2024"},
+        ]},
+    ])
+    assert [entry["company"] for entry in merged["experience_data"]] == ["Acme", "Globex", "Initech"]
+    globex = merged["experience_data"][1]
+    assert globex["endDate"] == "2024"
+    assert globex["responsibilities"] == ["Led team", "Hired engineers"]
+
+
+def test_entries_without_identity_are_not_merged():
+    merged = merge_resume_results([
+        {"experience_data": [{"responsibilities": ["A"]}]},
+        {"experience_data": [{"responsibilities": ["B"]}, "not an entry"]},
+    ])
+    assert merged["experience_data"] == [{"responsibilities": ["A"]}, {"responsibilities": ["B"]}]
+
+
+def test_extra_fields_are_kept():
+    merged = merge_resume_results([{"linkedin": ""}, {"linkedin": "linkedin.com/in/jane"}])
+    assert merged["linkedin"] == "linkedin.com/in/jane"
@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+import fitz
+import pytest
+
+from app.services import resume_pipeline
+from app.services.resume_pipeline import run_resume_pipeline
+from app.services.result_cache import result_cache
+
+RESUME = {"name": "Jane Doe", "email": "jane@example.com", "experience_data": [{"company": "Acme"}]}
+
+
+@pytest.fixture
+def resume_pdf(tmp_path):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), f"Jane Doe {tmp_path.name}\nSkills: AWS, Python", fontsize=11)
+    path = tmp_path / "resume.pdf"
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture
+def azure(monkeypatch):
+    """Fake Azure completions: text answers with RESUME, vision raises unless calls["vision_ok"]"""
+    calls = {"text": 0, "vision": 0, "vision_ok": False}
+
+    async def text(text, progress_callback=None, partial_callback=None, max_tokens=None):
+        calls["text"] += 1
+        return "```json\n" + json.dumps(RESUME) + "\n```"
+
+    async def vision(image_urls, progress_callback=None, partial_callback=None, **kwargs):
+        calls["vision"] += 1
+        if not calls["vision_ok"]:
+            raise RuntimeError("vision deployment down")
+        return json.dumps(dict(RESUME, certifications=["AZ-900"]))
+
+    monkeypatch.setattr(resume_pipeline, "extract_resume_details_with_azure_async", text)
+    monkeypatch.setattr(resume_pipeline, "extract_resume_details_with_azure_vision_async", vision)
+    monkeypatch.setattr(resume_pipeline, "route_document", lambda path: {
+        "route": "vision", "vision_pages": [0], "page_count": 1, "reasons": [], "elapsed_ms": 3
+    })
+    return calls
+
+
+def test_text_result_is_cached_and_served_again(resume_pdf, azure):
+    stages = []
+    progress = lambda **fields: "stage" in fields and stages.append(fields["stage"])
+
+    first = asyncio.run(run_resume_pipeline(resume_pdf, ".pdf", use_vision=False, progress=progress))
+    assert first["data"] == RESUME
+    assert first["processing_method"] == "enhanced_text_comprehensive"
+    assert stages == ["enhanced_text_extraction_with_tables", "comprehensive_parsing_analysis"]
+
+    second = asyncio.run(run_resume_pipeline(resume_pdf, ".pdf", use_vision=False))
+    assert second == dict(first, processing_method="cached")
+    assert azure["text"] == 1
+
+
+def test_vision_failure_falls_back_to_text_and_is_not_cached(resume_pdf, azure):
+    result = asyncio.run(run_resume_pipeline(resume_pdf, ".pdf", use_vision=True))
+    assert result["data"] == RESUME
+    assert result["processing_method"].startswith("enhanced_text_comprehensive@vision_fallback:1/1p")
+    assert azure == {"text": 1, "vision": 1, "vision_ok": False}
+    assert result_cache.get(resume_pipeline.make_cache_key(
+        result["content_hash"], "vision", resume_pipeline.PROMPT_VERSION
+    )) is None
+
+
+def test_ingest_worker_runs_the_shared_pipeline(resume_pdf, azure, monkeypatch):
+    from cli import ingest
+
+    monkeypatch.setattr(ingest, "_loop", asyncio.new_event_loop())
+    azure["vision_ok"] = True
+    result = ingest.process_file(resume_pdf, "vision")
+    ingest._loop.close()
+
+    assert result["status"] == "completed", result["error"]
+    assert result["resume_data"]["certifications"] == ["AZ-900"]
+    assert result["processing_method"].startswith("enhanced_vision@vision:1/1p")
+    assert {"hash", "document_routing", "high_quality_image_conversion"} <= set(result["stages"])
@@ -0,0 +1,34 @@
+import asyncio
+
+from app.database import AsyncSessionLocal, async_engine, init_db
+from app.services.history_writer import history_writer
+from app.services.resume_search import search_resumes
+
+
+def resume(name, skill):
+    return {
+        "filename": f"{name}.pdf", "file_size": 1, "status": "completed", "original_file_type": "pdf",
+        "resume_data": {"name": name, "skills": [skill]},
+    }
+
+
+def test_search_pages_with_has_more_instead_of_a_total():
+    init_db()
+
+    async def main():
+        for index in range(5):
+            await history_writer.save(resume(f"zephyr {index}", "Fortran"))
+        async with AsyncSessionLocal() as db:
+            pages = [
+                await search_resumes(db, "zephyr", {"skill": "Fortran"}, limit=2, offset=offset)
+                for offset in (0, 2, 4)
+            ]
+        await async_engine.dispose()
+        return pages
+
+    pages = asyncio.run(main())
+    assert [len(page["results"]) for page in pages] == [2, 2, 1]
+    assert [page["has_more"] for page in pages] == [True, True, False]
+    assert "total" not in pages[0]
+    assert not pages[0]["facets_sampled"]
+    assert pages[0]["facets"]["skill"] == [{"value": "Fortran", "count": 5}]
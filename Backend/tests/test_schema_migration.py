@@ -0,0 +1,46 @@
+import hashlib
+import os
+import sqlite3
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code: str, tmp_path) -> str:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path / 'old.db'}",
+        RESULT_CACHE_PATH=str(tmp_path / "result_cache.db"),
+        TASK_STORE_PATH=str(tmp_path / "tasks.db"),
+    )
+    done = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, env=env, capture_output=True, text=True)
+    assert done.returncode == 0, done.stderr
+    return done.stdout
+
+
+def test_import_is_read_only_and_init_db_adds_the_column(tmp_path):
+    db_path = tmp_path / "old.db"
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute(
+            "CREATE TABLE resume_history (id INTEGER PRIMARY KEY, filename VARCHAR(255) NOT NULL,"
+            " processed_at DATETIME, user_id VARCHAR(255), resume_data JSON NOT NULL, file_size INTEGER,"
+            " status VARCHAR(50), original_file_type VARCHAR(10))"
+        )
+        conn.execute("INSERT INTO resume_history (filename, resume_data) VALUES ('old.pdf', '{}')")
+    before = hashlib.sha256(db_path.read_bytes()).hexdigest()
+
+    out = run("import main, cli.ingest, cli.batch_import\n"
+              "from app import models\n"
+              "print(models.HAS_PROCESSING_METHOD_COLUMN)", tmp_path)
+    assert out.strip().splitlines()[-1] == "False"
+    assert hashlib.sha256(db_path.read_bytes()).hexdigest() == before
+
+    out = run("from app.database import SessionLocal, init_db\n"
+              "from app import models\n"
+              "init_db()\n"
+              "with SessionLocal() as db:\n"
+              "    db.add(models.ResumeHistory(filename='new.pdf', resume_data={}, processing_method='vision'))\n"
+              "    db.commit()\n"
+              "    print(sorted((r.filename, r.processing_method) for r in db.query(models.ResumeHistory)))", tmp_path)
+    assert out.strip().splitlines()[-1] == "[('new.pdf', 'vision'), ('old.pdf', 'text')]"
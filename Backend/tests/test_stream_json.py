@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from app.services.stream_json import IncrementalJSONParser
+
+RESUME = {
+    "name": "Jane \"JD\" Doe",
+    "years": 12.5,
+    "open_to_work": True,
+    "linkedin": None,
+    "skills": [{"Cloud": ["AWS", "Azure"]}],
+    "experience_data": [
+        {"company": "Acme, Inc.", "role": "Engineer [lead]", "summary": "Built {things}, \\ shipped"},
+        {"company": "Globex", "projects": [1, 2, {"name": "}"}]},
+    ],
+    "certifications": ["AZ-900"],
+}
+COMPLETION = "```json\n" + json.dumps(RESUME, indent=2) + "\n```"
+
+
+def feed_all(parser, chunks):
+    return [event for chunk in chunks for event in parser.feed(chunk)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64, len(COMPLETION)])
+def test_events_do_not_depend_on_chunking(size):
+    chunks = [COMPLETION[i:i + size] for i in range(0, len(COMPLETION), size)]
+    parser = IncrementalJSONParser()
+    events = feed_all(parser, chunks)
+
+    assert parser.done
+    assert [e[2] for e in events if e[0] == "item"] == RESUME["experience_data"]
+    assert {e[1]: e[2] for e in events if e[0] == "field"} == RESUME
+
+
+def test_items_are_reported_before_the_array_closes():
+    head = COMPLETION[:COMPLETION.index('"Globex"')]
+    parser = IncrementalJSONParser()
+    events = parser.feed(head)
+    assert ("item", "experience_data", RESUME["experience_data"][0]) in events
+    assert ("field", "name", RESUME["name"]) in events
+    assert not any(e[1] == "experience_data" and e[0] == "field" for e in events)
+
+
+def test_invalid_values_are_skipped():
+    parser = IncrementalJSONParser()
+    events = feed_all(parser, ['{"a": tru, "b": ', '"ok"}'])
+    assert events == [("field", "b", "ok")]
+    assert parser.done
+    assert parser.feed('{"c": 1}') == []
+
+
+def test_only_pending_text_is_kept():
+    parser = IncrementalJSONParser()
+    for chunk in ['{"name": "Jane",', ' "skills": ["a", ', '"b"], ', '"experience_data": [{"c": 1}, ']:
+        parser.feed(chunk)
+    # Earlier fields are complete; only the chunk holding the open array is kept
+    assert parser._chunks == ['"experience_data": [{"c": 1}, ']
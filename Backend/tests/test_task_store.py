@@ -0,0 +1,87 @@
+import pytest
+
+from app.services.task_store import InMemoryTaskStore, SQLiteTaskStore, TaskStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteTaskStore(str(tmp_path / "tasks.db"))
+    yield store
+    store.close()
+
+
+def test_task_store_is_abstract():
+    with pytest.raises(TypeError):
+        TaskStore()
+    InMemoryTaskStore()
+
+
+def test_update_is_visible_before_it_is_written(store):
+    store.create("t1", {"status": "pending", "progress": 0})
+    store.update("t1", progress=40)
+    store.update("t1", stage="render")
+    assert store.get("t1")["progress"] == 40
+    assert store.get("t1")["stage"] == "render"
+
+
+def test_reads_never_miss_a_write_being_committed(store):
+    store.create("t1", {"status": "pending", "progress": 0})
+    for progress in range(1, 300):
+        store.update("t1", progress=progress)
+        assert store.get("t1")["progress"] == progress
+
+
+def test_other_workers_see_flushed_updates(store, tmp_path):
+    other = SQLiteTaskStore(str(tmp_path / "tasks.db"))
+    try:
+        store.create("t1", {"status": "pending", "progress": 0})
+        assert other.get("t1")["progress"] == 0
+        store.update("t1", progress=70, status="completed")
+        store.flush()
+        assert other.get("t1")["progress"] == 70
+        assert other.get("t1")["status"] == "completed"
+    finally:
+        other.close()
+
+
+def test_listeners_run_after_the_write(store):
+    seen = []
+    store.add_listener(lambda task_id, task: seen.append((task_id, task["progress"])))
+    store.create("t1", {"status": "pending", "progress": 0})
+    store.update("t1", progress=10)
+    store.update("t1", progress=20)
+    store.flush()
+    assert seen[0] == ("t1", 0)
+    assert seen[-1] == ("t1", 20)
+
+
+def test_update_of_missing_task_is_ignored(store):
+    store.update("missing", progress=10)
+    store.flush()
+    assert store.get("missing") is None
+
+
+def test_delete_and_batch(store):
+    store.create("a", {"status": "pending", "progress": 0, "batch_id": "b"})
+    store.create("b", {"status": "pending", "progress": 0, "batch_id": "b"})
+    store.update("a", progress=50)
+    store.delete("b")
+    assert store.get("b") is None
+    batch = store.batch("b")
+    assert list(batch) == ["a"]
+    assert batch["a"]["progress"] == 50
+    store.flush()
+    assert list(store.batch("b")) == ["a"]
+
+
+def test_close_writes_queued_updates(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    store = SQLiteTaskStore(path)
+    store.create("t1", {"status": "pending", "progress": 0})
+    store.update("t1", progress=90)
+    store.close()
+    reopened = SQLiteTaskStore(path)
+    try:
+        assert reopened.get("t1")["progress"] == 90
+    finally:
+        reopened.close()
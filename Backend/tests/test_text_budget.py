@@ -0,0 +1,46 @@
+from app.services.text_budget import compact_text, completion_budget
+
+
+def test_phone_numbers_and_years_are_kept():
+    text = "Jane Doe\n9876543210\nEducation\n2016\nB.Tech, 2012\n2019"
+    assert compact_text(text).split("\n") == text.split("\n")
+
+
+def test_page_numbers_are_dropped_at_page_edges_only():
+    pages = [
+        "Page 1 of 3\nJane Doe\nSummary",
+        "- 2 -\nExperience\nAcme 2019-2021\n2 of 3",
+        "Skills\nSee page 3 of the appendix\n3/3",
+    ]
+    compacted = compact_text("\f".join(pages)).split("\n")
+    assert compacted == [
+        "Jane Doe", "Summary", "Experience", "Acme 2019-2021", "Skills", "See page 3 of the appendix",
+    ]
+
+
+def test_repeated_headers_and_footers_are_kept_once():
+    page = "ACME CONSULTING - Confidential\n{body}\nwww.acme.example | Page {n}"
+    bodies = ["Summary: data engineer", "Experience: Acme 2019-2021", "Skills: Python, SQL"]
+    text = "\f".join(page.format(body=body, n=n) for n, body in enumerate(bodies, 1))
+    compacted = compact_text(text).split("\n")
+    assert compacted.count("ACME CONSULTING - Confidential") == 1
+    assert sum(line.startswith("www.acme.example") for line in compacted) == 1
+    assert [line for line in compacted if line in bodies] == bodies
+
+
+def test_table_markers_and_rows_survive():
+    table = (
+        "--- EXPERIENCE TABLE 1 START ---\nHEADERS: Role | Company\nTOTAL_EXPERIENCE_ROWS: 1\n"
+        "EXPERIENCE_ROW_1: Acme | 2021 | 2021\n--- EXPERIENCE TABLE 1 END ---"
+    )
+    compacted = compact_text(f"{table}\f{table}")
+    assert compacted.count("--- EXPERIENCE TABLE 1 START ---") == 2
+    assert compacted.count("EXPERIENCE_ROW_1: Acme | 2021 | 2021") == 2
+
+
+def test_separators_and_blank_runs_are_removed():
+    assert compact_text("Name\n\n\n\n-----------\nSkills\n   \n") == "Name\n\nSkills"
+
+
+def test_completion_budget_is_clamped():
+    assert completion_budget(0) <= completion_budget(5000) <= completion_budget(10 ** 7)
@@ -0,0 +1,49 @@
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.services.upload_storage import RequestSizeLimitMiddleware
+
+LIMIT = 64 * 1024
+
+
+def make_client():
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimitMiddleware, max_bytes=LIMIT)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return TestClient(app)
+
+
+def multipart_chunks(payload_size):
+    yield b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.pdf"\r\n\r\n'
+    for _ in range(payload_size // 1024):
+        yield b"x" * 1024
+    yield b"\r\n--b--\r\n"
+
+
+def post_chunked(client, payload_size):
+    # A generator body goes out with Transfer-Encoding: chunked and no Content-Length
+    return client.post(
+        "/upload", content=multipart_chunks(payload_size),
+        headers={"Content-Type": "multipart/form-data; boundary=b"}
+    )
+
+
+def test_chunked_upload_under_the_limit_passes():
+    response = post_chunked(make_client(), LIMIT // 2)
+    assert response.status_code == 200
+    assert response.json() == {"size": LIMIT // 2}
+
+
+def test_chunked_upload_over_the_limit_is_cut_off():
+    response = post_chunked(make_client(), LIMIT * 4)
+    assert response.status_code == 413
+
+
+def test_declared_oversize_body_is_refused_unread():
+    response = make_client().post("/upload", files={"file": ("a.pdf", b"x" * (LIMIT * 2))})
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body too large"}
@@ -0,0 +1,94 @@
+import os
+from typing import Dict, Optional
+
+try:
+    import psutil
+except ImportError:  # Optional; /proc is used on Linux without it
+    psutil = None
+
+
+def _proc_rss_bytes(pid: str) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None when it cannot be measured"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    return _proc_rss_bytes("self")
+
+
+def child_rss_bytes() -> Dict[int, int]:
+    """RSS of each live child process (render pool workers, LibreOffice) by pid"""
+    if psutil is not None:
+        rss = {}
+        for child in psutil.Process().children(recursive=True):
+            try:
+                rss[child.pid] = child.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss
+    pids = []
+    try:
+        for thread_id in os.listdir("/proc/self/task"):
+            with open(f"/proc/self/task/{thread_id}/children") as f:
+                pids.extend(f.read().split())
+    except OSError:
+        return {}
+    rss = {}
+    for pid in pids:
+        value = _proc_rss_bytes(pid)
+        if value is not None:
+            rss[int(pid)] = value
+    return rss
+
+
+class PeakRSSTracker:
+    """Track the peak RSS seen while a job runs, for this process and its child processes.
+
+    Pages are rendered in pool children when RENDER_WORKERS > 1, so the children's RSS is
+    tracked too: the peak of each child, and the peak of parent plus children sampled
+    together. RSS is process-wide and pool workers are shared, so with several jobs in
+    flight the figures are an upper bound for any single job.
+    """
+
+    def __init__(self):
+        self.baseline = current_rss_bytes()
+        self.peak = self.baseline
+        children = child_rss_bytes()
+        self.children_baseline = sum(children.values())
+        self.child_peaks: Dict[int, int] = dict(children)
+        self.total_peak = None if self.baseline is None else self.baseline + self.children_baseline
+
+    def sample(self) -> None:
+        rss = current_rss_bytes()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+        children = child_rss_bytes()
+        for pid, child_rss in children.items():
+            if child_rss > self.child_peaks.get(pid, 0):
+                self.child_peaks[pid] = child_rss
+        if rss is not None:
+            total = rss + sum(children.values())
+            if self.total_peak is None or total > self.total_peak:
+                self.total_peak = total
+
+    def report(self) -> dict:
+        self.sample()
+        if self.baseline is None or self.peak is None:
+            return {"baseline_rss_mb": None, "peak_rss_mb": None, "peak_rss_delta_mb": None,
+                    "peak_total_rss_mb": None, "peak_child_rss_mb": {}}
+        mb = 1024 * 1024
+        baseline_total = self.baseline + self.children_baseline
+        return {
+            "baseline_rss_mb": round(self.baseline / mb, 1),
+            "peak_rss_mb": round(self.peak / mb, 1),
+            "peak_rss_delta_mb": round((self.peak - self.baseline) / mb, 1),
+            "peak_total_rss_mb": round(self.total_peak / mb, 1),
+            "peak_total_rss_delta_mb": round((self.total_peak - baseline_total) / mb, 1),
+            "peak_child_rss_mb": {pid: round(rss / mb, 1) for pid, rss in sorted(self.child_peaks.items())},
+        }
@@ -51,6 +51,7 @@ import TextFieldsIcon from "@mui/icons-material/TextFields";
 import ExpandMoreIcon from "@mui/icons-material/ExpandMore";
 import PreviewIcon from "@mui/icons-material/Preview";
 import { generateResumeDocx } from "./DocxGenerator";
+import { streamEvents } from "../api/progressStream";
 
 const CustomTabStyle = {
   fontWeight: 600,
@@ -249,6 +250,11 @@ export default function Upload() {
             end: 50,
             label: "Converting document...",
           },
+          document_routing: {
+            start: 40,
+            end: 50,
+            label: "Checking document text...",
+          },
           high_quality_image_conversion: {
             start: 50,
             end: 60,
@@ -274,15 +280,9 @@ export default function Upload() {
 
         let processingComplete = false;
         let resultData = null;
+        let streamError = null;
 
-        while (!processingComplete) {
-          const statusData = await checkProgressStatus(task_id);
-
-          if (!statusData) {
-            await new Promise((resolve) => setTimeout(resolve, 1000));
-            continue;
-          }
-
+        const applyStageProgress = (statusData) => {
           if (statusData.stage && progressStages[statusData.stage]) {
             const stage = progressStages[statusData.stage];
             setProcessingStage(stage.label);
@@ -292,6 +292,38 @@ export default function Upload() {
               stage.start + ((stage.end - stage.start) * stageProgress) / 100;
             setUploadProgress(Math.round(actualProgress));
           }
+        };
+
+        // Prefer the pushed event stream; polling below is the fallback
+        await streamEvents(
+          `http://localhost:8000/resume/events/${task_id}`,
+          token,
+          (event, payload) => {
+            if (event === "progress") {
+              applyStageProgress(payload);
+            } else if (event === "completed") {
+              processingComplete = true;
+              resultData = payload.data;
+              setUploadProgress(100);
+              setProcessingStage("Completed!");
+            } else if (event === "failed") {
+              streamError = payload.error || "Processing failed";
+            }
+          }
+        );
+        if (streamError) {
+          throw new Error(streamError);
+        }
+
+        while (!processingComplete) {
+          const statusData = await checkProgressStatus(task_id);
+
+          if (!statusData) {
+            await new Promise((resolve) => setTimeout(resolve, 1000));
+            continue;
+          }
+
+          applyStageProgress(statusData);
 
           if (statusData.status === "completed") {
             processingComplete = true;
@@ -317,9 +349,28 @@ export default function Upload() {
         );
 
         let batchComplete = false;
+        let streamedBatch = null;
+
+        // Follow the pushed batch stream until every file finishes, then settle
+        // the outcome with the loop below (which polls only if the stream failed)
+        const streamed = await streamEvents(
+          `http://localhost:8000/resume/batch-events/${batch_id}`,
+          token,
+          (event, payload) => {
+            if (event === "batch") {
+              streamedBatch = payload;
+              setBatchProgress(payload);
+              setUploadProgress(Math.round(payload.overall_progress));
+            }
+          }
+        );
 
         while (!batchComplete) {
-          const batchData = await checkBatchProgress(batch_id);
+          const batchData =
+            streamed && streamedBatch
+              ? streamedBatch
+              : await checkBatchProgress(batch_id);
+          streamedBatch = null;
 
           if (!batchData) {
             await new Promise((resolve) => setTimeout(resolve, 1000));
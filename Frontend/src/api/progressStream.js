@@ -0,0 +1,47 @@
+// src/api/progressStream.js
+// Reads a Server-Sent Events stream with fetch so the Authorization header can be sent
+// (EventSource cannot set headers). Resolves true when the server closes the stream
+// normally and false on any failure, so callers can fall back to polling.
+export async function streamEvents(url, token, onEvent) {
+  try {
+    const response = await fetch(url, {
+      headers: {
+        Authorization: `Bearer ${token || ""}`,
+        Accept: "text/event-stream",
+      },
+    });
+    if (!response.ok || !response.body) {
+      return false;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = "message";
+        let data = "";
+        for (const line of rawEvent.split("\n")) {
+          if (line.startsWith("event:")) event = line.slice(6).trim();
+          else if (line.startsWith("data:")) data += line.slice(5).trim();
+        }
+        if (data) {
+          onEvent(event, JSON.parse(data));
+        }
+      }
+    }
+    return true;
+  } catch (error) {
+    console.error("Progress stream failed, falling back to polling:", error);
+    return false;
+  }
+}